@@ -0,0 +1,73 @@
+"""
+Aquecimento do cache de respostas.
+
+As respostas mais pedidas (`API_WARMUP_URLS`) são calculadas antes do
+worker receber tráfego, em `create_app`, e de novo, em segundo plano,
+sempre que o worker percebe uma nova versão dos dados (por exemplo, depois
+que o pipeline publica um CSV novo). Assim o primeiro cliente depois de um
+deploy ou de uma atualização não paga o recálculo.
+"""
+import logging
+import threading
+import time
+
+from api import utils
+from api.catalogo import versao_dados
+
+logger = logging.getLogger(__name__)
+
+
+def _estado(app):
+    return app.extensions.setdefault(
+        'aquecimento', {'versao': None, 'trava': threading.Lock()}
+    )
+
+
+def aquecer_cache(app, urls=None):
+    """
+    Faz GET internamente nas URLs quentes, preenchendo o cache.
+
+    Retorna quantas responderam 200.
+    """
+    if urls is None:
+        urls = app.config.get('API_WARMUP_URLS', ())
+    if not urls:
+        return 0
+
+    _estado(app)['versao'] = versao_dados(utils.CAMINHO_DADOS)
+    inicio = time.perf_counter()
+    aquecidas = 0
+    with app.test_client() as cliente:
+        for url in urls:
+            try:
+                resposta = cliente.get(url)
+            except Exception as e:
+                logger.warning(f"Falha ao aquecer {url}: {e}")
+                continue
+            if resposta.status_code == 200:
+                aquecidas += 1
+            else:
+                logger.warning(
+                    f"Aquecimento de {url} respondeu {resposta.status_code}"
+                )
+    logger.info(
+        f"Cache aquecido: {aquecidas}/{len(urls)} respostas em "
+        f"{time.perf_counter() - inicio:.2f}s"
+    )
+    return aquecidas
+
+
+def versao_observada(app, versao):
+    """Dispara o aquecimento na primeira vez que uma versão é vista."""
+    if not app.config.get('API_WARMUP_URLS'):
+        return
+    estado = _estado(app)
+    if estado['versao'] == versao:
+        return
+    with estado['trava']:
+        if estado['versao'] == versao:
+            return
+        estado['versao'] = versao
+    threading.Thread(
+        target=aquecer_cache, args=(app,), name='aquecimento', daemon=True
+    ).start()
@@ -0,0 +1,309 @@
+"""
+Respostas condicionais e cache das respostas serializadas das rotas GET.
+
+Todo GET leva um `ETag` com a versão das respostas, que combina a versão
+dos dados (ver `api.catalogo`) com `VERSAO_RESPOSTAS`, e um
+`Cache-Control`; um `If-None-Match` com a versão atual recebe 304 sem que
+a rota seja executada. Como a mesma versão entra na chave do cache, um
+deploy que muda o formato das respostas (e incrementa `VERSAO_RESPOSTAS`)
+invalida ETags e entradas antigas mesmo sem dados novos.
+
+As rotas com `resposta_em_cache` guardam no Flask-Caching os bytes do JSON
+já serializado e, para corpos grandes, uma variante gzip, ambos calculados
+uma vez por versão dos dados: um acerto só monta a resposta em cima dos
+bytes, e clientes com `Accept-Encoding: gzip` recebem a variante
+comprimida (com ETag próprio, `<versão>-gzip`). Com `por_conteudo=True`
+o ETag é um hash do corpo em vez da versão: a resposta de um recurso que
+não mudou (um livro pelo seu ID estável) continua valendo para o cliente
+depois de uma nova versão dos dados.
+
+Cada chave é calculada por uma requisição de cada vez (single-flight): as
+demais esperam o resultado em vez de repetir o cálculo. Dentro de um
+processo elas se coordenam por uma trava local; entre os workers do
+gunicorn, quem calcula reserva a chave no próprio cache compartilhado
+(`cache.add` de `<chave>:calculo`, atômico no backend `sqlite`), e os
+outros workers servem a cópia vencida ou consultam o cache até a entrada
+aparecer. Passado o
+`timeout`, a entrada continua guardada por mais API_CACHE_STALE_SECONDS:
+nesse intervalo, quem a encontra vencida a recalcula enquanto as
+requisições simultâneas recebem a cópia antiga (stale-while-revalidate),
+então o fim do TTL não gera um pico de recálculos.
+"""
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, make_response, request
+
+from api import utils
+from api.aquecimento import versao_observada
+from api.catalogo import versao_dados
+from core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Formato das respostas: incrementar ao mudar payloads ou a serialização
+VERSAO_RESPOSTAS = 2
+# Corpos menores que isso não compensam o gzip
+TAMANHO_MINIMO_GZIP = 1024
+NIVEL_GZIP = 6
+SUFIXO_GZIP = '-gzip'
+# Espera máxima pelo cálculo de outra requisição antes de calcular também
+ESPERA_CALCULO = 30
+# Reserva, no cache compartilhado, da chave em cálculo por algum worker
+SUFIXO_CALCULO = ':calculo'
+# Intervalo entre consultas ao cache enquanto outro worker calcula
+INTERVALO_CONSULTA = 0.05
+
+_trava_calculos = threading.Lock()
+_calculos = {}
+
+
+def versao_requisicao():
+    """Versão das respostas (dados e formato) fixada na requisição."""
+    if 'versao_respostas' not in g:
+        dados = versao_dados(utils.CAMINHO_DADOS)
+        versao_observada(current_app._get_current_object(), dados)
+        g.versao_respostas = f"{dados}.{VERSAO_RESPOSTAS}"
+    return g.versao_respostas
+
+
+def chave_cache():
+    """Chave da resposta: versão das respostas, caminho e query string."""
+    parametros = urlencode(sorted(request.args.items(multi=True)))
+    return f"view/{versao_requisicao()}{request.path}?{parametros}"
+
+
+def _marcar(resposta, etag):
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = (
+        f"public, max-age={current_app.config.get('API_CACHE_MAX_AGE', 60)}"
+    )
+    return resposta
+
+
+def _nao_modificada(versao):
+    """Resposta 304 se o cliente já tem alguma variante desta versão."""
+    for etag in (versao, versao + SUFIXO_GZIP):
+        if request.if_none_match.contains_weak(etag):
+            resposta = current_app.response_class(status=304)
+            resposta.vary.add('Accept-Encoding')
+            return _marcar(resposta, etag)
+    return None
+
+
+def resposta_condicional(rota):
+    """Decorator: ETag/Cache-Control nas respostas 200 e 304 quando cabe."""
+    @wraps(rota)
+    def envoltorio(*args, **kwargs):
+        versao = versao_requisicao()
+        if request.if_none_match.contains_weak(versao):
+            return _marcar(current_app.response_class(status=304), versao)
+
+        resposta = make_response(rota(*args, **kwargs))
+        if resposta.status_code == 200:
+            _marcar(resposta, versao)
+        return resposta
+
+    return envoltorio
+
+
+def serializar_resposta(resposta, valida_ate):
+    """Entrada do cache: (mimetype, corpo, gzip, válida até, hash)."""
+    corpo = resposta.get_data()
+    comprimido = None
+    if len(corpo) >= TAMANHO_MINIMO_GZIP:
+        comprimido = gzip.compress(corpo, compresslevel=NIVEL_GZIP, mtime=0)
+        if len(comprimido) >= len(corpo):
+            comprimido = None
+    resumo = hashlib.sha1(corpo).hexdigest()[:16]
+    return resposta.mimetype, corpo, comprimido, valida_ate, resumo
+
+
+def servir_entrada(entrada, versao):
+    """Monta a resposta a partir dos bytes guardados."""
+    mimetype, corpo, comprimido = entrada[:3]
+    etag = versao
+    if comprimido is not None and request.accept_encodings['gzip']:
+        corpo = comprimido
+        etag = versao + SUFIXO_GZIP
+    resposta = current_app.response_class(corpo, mimetype=mimetype)
+    if etag != versao:
+        resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.vary.add('Accept-Encoding')
+    return _marcar(resposta, etag)
+
+
+def _ler_cache(chave):
+    try:
+        return cache.get(chave)
+    except Exception:
+        logger.exception("Falha ao ler o cache de respostas")
+        return None
+
+
+def _gravar_cache(chave, entrada, timeout):
+    try:
+        cache.set(chave, entrada, timeout=timeout)
+    except Exception:
+        logger.exception("Falha ao gravar o cache de respostas")
+
+
+class _Calculo:
+    """Cálculo de uma chave em andamento, aguardado pelas demais."""
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.entrada = None
+
+
+def _assumir_calculo(chave):
+    """Retorna (cálculo da chave, True se esta requisição vai calculá-la)."""
+    with _trava_calculos:
+        calculo = _calculos.get(chave)
+        if calculo is not None:
+            return calculo, False
+        calculo = _calculos[chave] = _Calculo()
+        return calculo, True
+
+
+def _encerrar_calculo(chave, calculo):
+    with _trava_calculos:
+        del _calculos[chave]
+    calculo.pronto.set()
+
+
+def _reservar(reserva):
+    """Reserva a chave para este worker; True se ninguém a tinha."""
+    try:
+        return cache.add(reserva, 1, timeout=ESPERA_CALCULO)
+    except Exception:
+        logger.exception("Falha ao reservar o cálculo no cache")
+        return True
+
+
+def _liberar(reserva):
+    try:
+        cache.delete(reserva)
+    except Exception:
+        logger.exception("Falha ao liberar o cálculo no cache")
+
+
+def _aguardar_outro_worker(chave, reserva):
+    """Entrada calculada por outro worker, ou None se ele desistir."""
+    limite = time.monotonic() + ESPERA_CALCULO
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_CONSULTA)
+        entrada = _ler_cache(chave)
+        if entrada is not None:
+            return entrada
+        try:
+            if not cache.has(reserva):
+                return None
+        except Exception:
+            return None
+    return None
+
+
+def _calcular_entre_workers(rota, args, kwargs, chave, timeout, vencida):
+    """
+    `_calcular`, a menos que outro worker já esteja calculando a chave.
+
+    Nesse caso serve a cópia `vencida` ou, sem ela, espera a entrada do
+    outro worker (retornando `(None, entrada)`).
+    """
+    reserva = chave + SUFIXO_CALCULO
+    if not _reservar(reserva):
+        if vencida is not None:
+            return None, vencida
+        entrada = _aguardar_outro_worker(chave, reserva)
+        if entrada is not None:
+            return None, entrada
+        return _calcular(rota, args, kwargs, chave, timeout)
+    try:
+        return _calcular(rota, args, kwargs, chave, timeout)
+    finally:
+        _liberar(reserva)
+
+
+def _calcular(rota, args, kwargs, chave, timeout):
+    """Executa a rota; guarda e retorna a entrada se a resposta for 200."""
+    resposta = make_response(rota(*args, **kwargs))
+    if resposta.status_code != 200:
+        return resposta, None
+
+    if timeout is None:
+        timeout = current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+    if timeout:
+        tolerancia = current_app.config.get('API_CACHE_STALE_SECONDS', 60)
+        entrada = serializar_resposta(resposta, time.time() + timeout)
+        _gravar_cache(chave, entrada, timeout + tolerancia)
+    else:
+        # Sem expiração: a entrada nunca vence
+        entrada = serializar_resposta(resposta, float('inf'))
+        _gravar_cache(chave, entrada, 0)
+    return resposta, entrada
+
+
+def _responder(entrada, versao, por_conteudo):
+    """Serve a entrada, ou 304 se o cliente já tem o mesmo conteúdo."""
+    if not por_conteudo:
+        return servir_entrada(entrada, versao)
+    resposta = _nao_modificada(entrada[4])
+    if resposta is not None:
+        return resposta
+    return servir_entrada(entrada, entrada[4])
+
+
+def resposta_em_cache(timeout=None, por_conteudo=False):
+    """
+    Decorator: condicional (ETag/304) e cache dos bytes da resposta.
+
+    Só respostas 200 são guardadas; erros são recalculados a cada vez. Com
+    `por_conteudo` o ETag é o hash do corpo, e o 304 é decidido depois de
+    obter a entrada (do cache, na maioria das vezes).
+    """
+    def decorator(rota):
+        @wraps(rota)
+        def envoltorio(*args, **kwargs):
+            versao = versao_requisicao()
+            if not por_conteudo:
+                resposta = _nao_modificada(versao)
+                if resposta is not None:
+                    return resposta
+
+            chave = chave_cache()
+            entrada = _ler_cache(chave)
+            if entrada is not None and entrada[3] > time.time():
+                return _responder(entrada, versao, por_conteudo)
+
+            calculo, responsavel = _assumir_calculo(chave)
+            if not responsavel:
+                # Serve a cópia vencida, se houver; senão espera o cálculo
+                if entrada is None and calculo.pronto.wait(ESPERA_CALCULO):
+                    entrada = calculo.entrada
+                if entrada is not None:
+                    return _responder(entrada, versao, por_conteudo)
+                resposta, entrada = _calcular(
+                    rota, args, kwargs, chave, timeout
+                )
+            else:
+                try:
+                    resposta, entrada = _calcular_entre_workers(
+                        rota, args, kwargs, chave, timeout, entrada
+                    )
+                    calculo.entrada = entrada
+                finally:
+                    _encerrar_calculo(chave, calculo)
+
+            if entrada is None:
+                return resposta
+            return _responder(entrada, versao, por_conteudo)
+
+        return envoltorio
+
+    return decorator
@@ -0,0 +1,120 @@
+"""
+Catálogo de livros residente em memória.
+
+Os dados são lidos uma única vez por processo e compartilhados por todas as
+rotas. A cada acesso apenas o `stat` do CSV e do snapshot binário é
+consultado: o catálogo só é recarregado quando o mtime ou o tamanho de um
+deles mudam. Cada carga tem uma versão (hash dessa assinatura), usada nos
+ETags das respostas.
+"""
+import hashlib
+import logging
+import threading
+from array import array
+from functools import cached_property
+
+from api import utils
+from api.estatisticas import ResumoEstatisticas
+from api.indices import IndiceCategorias, IndicesOrdenados, IndiceTrigramas
+from core.snapshot import caminho_snapshot
+
+logger = logging.getLogger(__name__)
+
+_trava = threading.Lock()
+_catalogo_atual = None
+
+
+class Catalogo:
+    """
+    Uma geração imutável do catálogo carregada do arquivo de dados.
+
+    Os dados ficam em colunas (`core.colunas.ColunasLivros`), e cada livro
+    vira dicionário só quando é servido (`colunas.livro`); os índices só
+    são montados quando alguma rota precisa deles. As estatísticas são
+    materializadas já na carga.
+    """
+
+    def __init__(self, colunas, assinatura):
+        self.colunas = colunas
+        self.assinatura = assinatura
+        self.versao = _versao(assinatura)
+        self.resumo = ResumoEstatisticas(colunas)
+
+    def __len__(self):
+        return len(self.colunas)
+
+    @cached_property
+    def indice_ids(self):
+        """ID estável -> posição, para buscar um livro em O(1)."""
+        indice = {}
+        for posicao, book_id in enumerate(self.colunas.ids):
+            indice.setdefault(book_id, posicao)
+        return indice
+
+    @cached_property
+    def ordem_ids(self):
+        """Posições ordenadas pelo ID estável, a ordem das listagens."""
+        ids = self.colunas.ids
+        return array('I', sorted(range(len(ids)), key=ids.__getitem__))
+
+    @cached_property
+    def indice_titulos(self):
+        """Índice de trigramas dos títulos, montado no primeiro uso."""
+        return IndiceTrigramas(self.colunas.titulos)
+
+    @cached_property
+    def indice_categorias(self):
+        """Índice categoria -> posições, com estatísticas por categoria."""
+        return IndiceCategorias(self.colunas)
+
+    @cached_property
+    def indices_ordenados(self):
+        """Índices ordenados por preço, rating e título."""
+        return IndicesOrdenados(self.colunas)
+
+
+def assinatura_arquivo(caminho):
+    """Identifica a versão do arquivo pelo caminho, mtime e tamanho."""
+    try:
+        info = caminho.stat()
+    except OSError:
+        return (str(caminho), None, None)
+    return (str(caminho), info.st_mtime_ns, info.st_size)
+
+
+def assinatura_dados(caminho_csv):
+    """Assinatura conjunta do CSV e do seu snapshot binário."""
+    return (
+        assinatura_arquivo(caminho_csv),
+        assinatura_arquivo(caminho_snapshot(caminho_csv)),
+    )
+
+
+def _versao(assinatura):
+    return hashlib.sha1(repr(assinatura).encode('utf-8')).hexdigest()[:16]
+
+
+def versao_dados(caminho_csv):
+    """Versão dos dados no disco: muda sempre que o catálogo recarregaria."""
+    return _versao(assinatura_dados(caminho_csv))
+
+
+def obter_catalogo():
+    """Retorna o catálogo atual, recarregando se o arquivo mudou."""
+    global _catalogo_atual
+
+    assinatura = assinatura_dados(utils.CAMINHO_DADOS)
+    catalogo = _catalogo_atual
+    if catalogo is not None and catalogo.assinatura == assinatura:
+        return catalogo
+
+    with _trava:
+        catalogo = _catalogo_atual
+        if catalogo is None or catalogo.assinatura != assinatura:
+            catalogo = Catalogo(utils.carregar_colunas(), assinatura)
+            _catalogo_atual = catalogo
+            logger.info(
+                f"Catálogo carregado: {len(catalogo)} livros "
+                f"de {utils.CAMINHO_DADOS}"
+            )
+        return catalogo
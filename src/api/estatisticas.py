@@ -0,0 +1,117 @@
+"""
+Estatísticas materializadas por geração do catálogo.
+"""
+from core.colunas import RATINGS_VALIDOS
+
+
+def _resumo_precos(total, soma, minimo, maximo):
+    if not total:
+        return {
+            "total_livros": 0,
+            "preco_medio": 0,
+            "preco_minimo": 0,
+            "preco_maximo": 0
+        }
+    return {
+        "total_livros": total,
+        "preco_medio": round(soma / total, 2),
+        "preco_minimo": minimo,
+        "preco_maximo": maximo,
+    }
+
+
+class ResumoEstatisticas:
+    """
+    Todos os agregados servidos por `/stats`, calculados uma única vez.
+
+    Uma passada pelas colunas acumula os totais gerais, a distribuição de
+    ratings e os totais por categoria (no backend SQL, os mesmos agregados
+    vêm de consultas, ver `de_agregados`). As rotas só copiam dicionários
+    prontos, então o custo não depende do tamanho do catálogo nem da
+    expiração do cache HTTP.
+    """
+
+    def __init__(self, colunas):
+        soma = 0.0
+        minimo = maximo = None
+        ratings = dict.fromkeys(RATINGS_VALIDOS, 0)
+        # código da categoria -> [total, soma, mínimo, máximo]
+        por_codigo = {}
+
+        for preco, rating, codigo in zip(
+            colunas.precos, colunas.ratings, colunas.codigos_categoria
+        ):
+            soma += preco
+            if minimo is None or preco < minimo:
+                minimo = preco
+            if maximo is None or preco > maximo:
+                maximo = preco
+            if rating in ratings:
+                ratings[rating] += 1
+
+            acumulado = por_codigo.get(codigo)
+            if acumulado is None:
+                por_codigo[codigo] = [1, preco, preco, preco]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += preco
+                if preco < acumulado[2]:
+                    acumulado[2] = preco
+                if preco > acumulado[3]:
+                    acumulado[3] = preco
+
+        self._definir(
+            (len(colunas), soma, minimo, maximo),
+            ratings,
+            {
+                colunas.categorias[codigo]: acumulado
+                for codigo, acumulado in por_codigo.items()
+            },
+        )
+
+    @classmethod
+    def de_agregados(cls, geral, ratings, categorias):
+        """
+        Resumo a partir de agregados já calculados (ex.: por GROUP BY).
+
+        `geral` e cada valor de `categorias` são (total, soma, mínimo,
+        máximo) de preços; `ratings` é rating -> total de livros.
+        """
+        resumo = cls.__new__(cls)
+        distribuicao = dict.fromkeys(RATINGS_VALIDOS, 0)
+        for rating, total in ratings.items():
+            if rating in distribuicao:
+                distribuicao[rating] = total
+        resumo._definir(geral, distribuicao, categorias)
+        return resumo
+
+    def _definir(self, geral, distribuicao, categorias):
+        self._geral = _resumo_precos(*geral)
+        self._distribuicao = {
+            str(r): total for r, total in distribuicao.items()
+        }
+        self._categorias = {
+            nome: _resumo_precos(*acumulado)
+            for nome, acumulado in categorias.items()
+            if nome
+        }
+
+    def geral(self):
+        """Total, média, mínimo e máximo de preços do catálogo."""
+        return dict(self._geral)
+
+    def visao_geral(self):
+        """Estatísticas gerais com distribuição de ratings e categorias."""
+        visao = self.geral()
+        visao["distribuicao_ratings"] = dict(self._distribuicao)
+        visao["total_categorias"] = len(self._categorias)
+        return visao
+
+    def nomes_categorias(self):
+        """Categorias em ordem alfabética."""
+        return sorted(self._categorias)
+
+    def categoria(self, nome):
+        """Estatísticas de preço da categoria exata, ou None."""
+        estatisticas = self._categorias.get(nome)
+        return dict(estatisticas) if estatisticas is not None else None
@@ -0,0 +1,166 @@
+"""
+Índices em memória construídos uma vez por geração do catálogo.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+TAMANHO_NGRAMA = 3
+
+
+def _trigramas(texto):
+    """Trigramas distintos de um texto já em minúsculas."""
+    return {
+        texto[i:i + TAMANHO_NGRAMA]
+        for i in range(len(texto) - TAMANHO_NGRAMA + 1)
+    }
+
+
+def _contem(lista_ordenada, valor):
+    posicao = bisect_left(lista_ordenada, valor)
+    return posicao < len(lista_ordenada) and lista_ordenada[posicao] == valor
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido de trigramas para busca de substring em títulos.
+
+    Cada trigrama aponta para a lista ordenada das posições dos livros que
+    o contêm. Uma busca intersecta as listas dos trigramas do termo,
+    começando pela menor, e confirma cada candidato com `in` no título, de
+    modo que o custo acompanha o número de candidatos e não o catálogo.
+    Termos com menos de três caracteres não têm trigramas e caem na
+    varredura completa.
+    """
+
+    def __init__(self, titulos):
+        self._titulos = [titulo.lower() for titulo in titulos]
+        postagens = defaultdict(list)
+        for posicao, titulo in enumerate(self._titulos):
+            for trigrama in _trigramas(titulo):
+                postagens[trigrama].append(posicao)
+        self._postagens = {
+            trigrama: array('I', posicoes)
+            for trigrama, posicoes in postagens.items()
+        }
+
+    def buscar(self, termo):
+        """Posições (em ordem crescente) dos títulos que contêm `termo`."""
+        termo = termo.lower()
+        if len(termo) < TAMANHO_NGRAMA:
+            return [
+                posicao for posicao, titulo in enumerate(self._titulos)
+                if termo in titulo
+            ]
+
+        listas = []
+        for trigrama in _trigramas(termo):
+            lista = self._postagens.get(trigrama)
+            if lista is None:
+                return []
+            listas.append(lista)
+        listas.sort(key=len)
+
+        menor, demais = listas[0], listas[1:]
+        titulos = self._titulos
+        return [
+            posicao for posicao in menor
+            if all(_contem(lista, posicao) for lista in demais)
+            and termo in titulos[posicao]
+        ]
+
+
+class IndiceCategorias:
+    """
+    Índice hash categoria -> posições dos livros.
+
+    Montado em uma passada pela coluna de códigos de categoria, de modo
+    que o filtro de categoria da busca percorre só as k posições das
+    categorias que casam.
+    """
+
+    def __init__(self, colunas):
+        por_codigo = defaultdict(lambda: array('I'))
+        for posicao, codigo in enumerate(colunas.codigos_categoria):
+            por_codigo[codigo].append(posicao)
+
+        self._posicoes = {
+            colunas.categorias[codigo]: posicoes
+            for codigo, posicoes in por_codigo.items()
+            if colunas.categorias[codigo]
+        }
+        self._minusculas = [
+            (nome.lower(), nome) for nome in sorted(self._posicoes)
+        ]
+
+    def nomes(self):
+        """Categorias em ordem alfabética."""
+        return [nome for _, nome in self._minusculas]
+
+    def buscar(self, termo):
+        """Posições (em ordem crescente) das categorias que contêm `termo`."""
+        termo = termo.lower()
+        listas = [
+            self._posicoes[nome]
+            for minuscula, nome in self._minusculas
+            if termo in minuscula
+        ]
+        if len(listas) == 1:
+            return list(listas[0])
+        return sorted(posicao for lista in listas for posicao in lista)
+
+
+CAMPOS_ORDENACAO = ('price', 'rating', 'title')
+
+
+class IndicesOrdenados:
+    """
+    Índices secundários ordenados por preço, rating e título.
+
+    Para cada campo guarda as posições dos livros ordenadas por
+    (valor, ID) e os valores na mesma ordem, de modo que um filtro de
+    faixa vira dois `bisect` seguidos de uma fatia: O(log n + k). Títulos
+    são ordenados sem diferenciar maiúsculas.
+    """
+
+    def __init__(self, colunas):
+        self._valores = {
+            'price': colunas.precos,
+            'rating': colunas.ratings,
+            'title': [titulo.lower() for titulo in colunas.titulos],
+        }
+        tipos = {'price': 'd', 'rating': 'b', 'title': None}
+        self._ordem = {}
+        self._ordenados = {}
+        ids = colunas.ids
+        for campo, valores in self._valores.items():
+            ordem = sorted(
+                range(len(valores)), key=lambda p: (valores[p], ids[p])
+            )
+            ordenados = [valores[p] for p in ordem]
+            if tipos[campo]:
+                ordenados = array(tipos[campo], ordenados)
+            self._ordem[campo] = array('I', ordem)
+            self._ordenados[campo] = ordenados
+
+    def chave(self, campo, posicao):
+        """Valor de ordenação do livro na posição."""
+        return self._valores[campo][posicao]
+
+    def ordem(self, campo):
+        """Todas as posições ordenadas por (valor do campo, ID)."""
+        return self._ordem[campo]
+
+    def limites(self, campo, minimo=None, maximo=None):
+        """Intervalo [inicio, fim) da ordem do campo dentro da faixa."""
+        ordenados = self._ordenados[campo]
+        inicio = 0 if minimo is None else bisect_left(ordenados, minimo)
+        fim = (
+            len(ordenados) if maximo is None
+            else bisect_right(ordenados, maximo)
+        )
+        return inicio, max(inicio, fim)
+
+    def faixa(self, campo, inicio, fim):
+        """Posições da ordem do campo no intervalo [inicio, fim)."""
+        return self._ordem[campo][inicio:fim]
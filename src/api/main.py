@@ -9,13 +9,16 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from flask import Flask, send_from_directory  # noqa: E402
+from api.aquecimento import aquecer_cache  # noqa: E402
+from api.repositorio import BACKEND_SQLITE, sincronizar_banco  # noqa: E402
 from api.routers.books import router as books_router  # noqa: E402
 from api.routers.categories import router as categories_router  # noqa: E402
 from api.routers.health import router as health_router  # noqa: E402
 from api.routers.stats import router as stats_router  # noqa: E402
 from api.routers.ml import router as ml_router  # noqa: E402
+from api.serializacao import configurar_json  # noqa: E402
 from core.config import Config  # noqa: E402
-from core.cache import cache  # noqa: E402
+from core.cache import iniciar_cache  # noqa: E402
 from core.db import db  # noqa: E402
 from core.logging_config import setup_logging  # noqa: E402
 
@@ -23,13 +26,16 @@ setup_logging(log_level="INFO")
 logger = logging.getLogger(__name__)
 
 
-def create_app():
-    """Cria a aplicação Flask."""
+def create_app(configuracao=None):
+    """Cria a aplicação Flask (`configuracao` sobrescreve a Config)."""
     app = Flask(__name__)
     app.config.from_object(Config)
+    if configuracao:
+        app.config.update(configuracao)
 
     # Inicializa extensões
-    cache.init_app(app)
+    configurar_json(app)
+    iniciar_cache(app)
     db.init_app(app)
 
     # Registra rotas
@@ -61,6 +67,25 @@ def create_app():
             return {"erro": "Especificação não encontrada"}, 404
         return send_from_directory(docs_dir, 'openapi.json')
 
+    @app.route('/')
+    def home():
+        """Informações básicas e links úteis."""
+        return {
+            "message": "API de Recomendação de Livros",
+            "versao": "1.0.0",
+            "documentacao": "/docs",
+            "health_check": "/api/v1/health",
+            "autor": "Gabriel Peixer - ML Engineer Jr."
+        }
+
+    # Importa o CSV para o banco antes de receber tráfego
+    if app.config.get('CATALOG_BACKEND') == BACKEND_SQLITE:
+        with app.app_context():
+            sincronizar_banco()
+
+    # Calcula as respostas mais pedidas antes de receber tráfego
+    aquecer_cache(app)
+
     return app
 
 
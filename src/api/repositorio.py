@@ -0,0 +1,493 @@
+"""
+Acesso aos livros independente do backend de armazenamento.
+
+`CATALOG_BACKEND` escolhe entre o catálogo em memória (`memoria`, padrão) e
+o SQLite configurado em `SQLALCHEMY_DATABASE_URI` (`sqlite`). No backend SQL
+os livros são importados do CSV para a tabela `livros` (com índices
+(campo, ID) para categoria, preço, rating e título) sempre que o arquivo
+muda, e filtros, paginação e agregados viram consultas indexadas.
+Todas as rotas de dados (livros, categorias, estatísticas, ML e health)
+passam por aqui, então no backend SQL o catálogo em memória (`api.catalogo`)
+nunca é carregado.
+
+Os livros são identificados pelo ID estável gravado pelo scraper na coluna
+`id` do CSV (ou, em CSVs antigos, pela posição), então o ID de um livro não
+muda quando a extração reordena a saída. As listagens paginadas seguem a
+ordem dos IDs (ou do campo de ordenação, desempatado pelo ID), e os cursores
+guardam o ID do último livro: continuam válidos depois de uma reimportação.
+"""
+import csv
+import logging
+import threading
+from bisect import bisect_right
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, tuple_
+
+from api import utils
+from api.utils import MAX_INTEIRO_SQL, MAX_POR_PAGINA
+from api.catalogo import assinatura_arquivo, obter_catalogo
+from api.estatisticas import ResumoEstatisticas
+from core.db import db
+from core.models import Livro, VersaoDados
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORIA = 'memoria'
+BACKEND_SQLITE = 'sqlite'
+TAMANHO_LOTE_IMPORTACAO = 1000
+# Muda junto com o modelo `Livro`, forçando a reimportação dos bancos antigos
+ESQUEMA_LIVROS = 5
+# Espera pela trava de escrita enquanto outro worker reimporta o CSV
+ESPERA_IMPORTACAO_MS = 60000
+
+
+def _posicoes_fatia(total, offset, limite):
+    """Posições de `livros[offset:][:limite]` (fatiamento de lista)."""
+    posicoes = range(total)[offset:]
+    return posicoes[:limite] if limite else posicoes
+
+
+def _cursor(book_id, chave=None, ordenacao=None):
+    """Conteúdo do próximo cursor: ID do último livro e chave."""
+    cursor = {'id': book_id}
+    if ordenacao:
+        cursor['o'] = ordenacao
+        cursor['k'] = chave
+    return cursor
+
+
+class RepositorioMemoria:
+    """Consultas sobre o catálogo residente em memória."""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+
+    def total(self):
+        return len(self.catalogo)
+
+    def _pagina(self, posicoes, apos, limite, ordenacao=None):
+        """
+        Página keyset de uma sequência de posições já ordenada.
+
+        Sem `ordenacao` as posições estão em ordem de ID; com ela, em ordem
+        de (valor do campo, ID). `apos` é o cursor da página anterior;
+        retorna os livros da página e o próximo cursor (ou None).
+        """
+        ids = self.catalogo.colunas.ids
+        if ordenacao:
+            indices = self.catalogo.indices_ordenados
+
+            def chave(posicao):
+                return (indices.chave(ordenacao, posicao), ids[posicao])
+
+            alvo = (apos['k'], apos['id']) if apos else None
+        else:
+            chave = ids.__getitem__
+            alvo = apos['id'] if apos else None
+
+        inicio = 0 if alvo is None else bisect_right(posicoes, alvo, key=chave)
+        fatia = posicoes[inicio:inicio + limite]
+        colunas = self.catalogo.colunas
+        itens = [colunas.livro(posicao) for posicao in fatia]
+
+        proximo = None
+        if inicio + limite < len(posicoes):
+            ultimo = fatia[-1]
+            proximo = _cursor(
+                ids[ultimo],
+                chave(ultimo)[0] if ordenacao else None,
+                ordenacao,
+            )
+        return itens, proximo
+
+    def listar(self, pagina, por_pagina):
+        """Retorna (livros da página, meta, próximo cursor)."""
+        total = len(self.catalogo)
+        inicio = max(0, (pagina - 1) * por_pagina)
+        fim = inicio + por_pagina
+        colunas = self.catalogo.colunas
+        posicoes = self.catalogo.ordem_ids[inicio:fim]
+        itens = [colunas.livro(posicao) for posicao in posicoes]
+        proximo = (
+            _cursor(colunas.ids[posicoes[-1]])
+            if posicoes and fim < total else None
+        )
+        return itens, {
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "total_itens": total,
+            "total_paginas": max(1, (total + por_pagina - 1) // por_pagina),
+        }, proximo
+
+    def listar_apos(self, apos, limite):
+        return self._pagina(self.catalogo.ordem_ids, apos, limite)
+
+    def obter(self, book_id):
+        posicao = self.catalogo.indice_ids.get(book_id)
+        if posicao is None:
+            return None
+        return self.catalogo.colunas.livro(posicao)
+
+    def buscar(self, titulo='', categoria='', min_price=None, max_price=None,
+               min_rating=None, ordenacao=None, apos=None,
+               limite=MAX_POR_PAGINA):
+        """
+        Busca paginada: retorna (livros da página, total, próximo cursor).
+
+        Os candidatos vêm do índice mais seletivo disponível (trigramas,
+        categorias ou a menor faixa dos índices ordenados); os demais
+        filtros são conferidos direto nas colunas.
+        """
+        catalogo = self.catalogo
+        colunas = catalogo.colunas
+        candidatos = None
+        origem = None
+
+        if titulo:
+            candidatos = catalogo.indice_titulos.buscar(titulo)
+        if categoria:
+            da_categoria = catalogo.indice_categorias.buscar(categoria)
+            if candidatos is None:
+                candidatos = da_categoria
+            else:
+                da_categoria = set(da_categoria)
+                candidatos = [p for p in candidatos if p in da_categoria]
+
+        faixas = {}
+        if min_price is not None or max_price is not None:
+            faixas['price'] = (min_price, max_price)
+        if min_rating is not None:
+            faixas['rating'] = (min_rating, None)
+
+        if faixas and candidatos is None:
+            indices = catalogo.indices_ordenados
+            limites = {
+                campo: indices.limites(campo, *faixa)
+                for campo, faixa in faixas.items()
+            }
+            origem = min(limites, key=lambda c: limites[c][1] - limites[c][0])
+            candidatos = indices.faixa(origem, *limites[origem])
+            del faixas[origem]
+
+        if faixas:
+            precos, ratings = colunas.precos, colunas.ratings
+            minimo, maximo = faixas.get('price', (None, None))
+            rating_minimo = faixas.get('rating', (None, None))[0]
+            candidatos = [
+                p for p in candidatos
+                if (minimo is None or precos[p] >= minimo)
+                and (maximo is None or precos[p] <= maximo)
+                and (rating_minimo is None or ratings[p] >= rating_minimo)
+            ]
+
+        if ordenacao:
+            indices = catalogo.indices_ordenados
+            if candidatos is None:
+                posicoes = indices.ordem(ordenacao)
+            elif origem == ordenacao:
+                posicoes = candidatos
+            else:
+                ids = colunas.ids
+                posicoes = sorted(
+                    candidatos,
+                    key=lambda p: (indices.chave(ordenacao, p), ids[p])
+                )
+        elif candidatos is None:
+            posicoes = catalogo.ordem_ids
+        else:
+            posicoes = sorted(candidatos, key=colunas.ids.__getitem__)
+
+        itens, proximo = self._pagina(posicoes, apos, limite, ordenacao)
+        return itens, len(posicoes), proximo
+
+    def fatia(self, offset, limite=None):
+        """Livros de `livros[offset:][:limite]`, na ordem do catálogo."""
+        colunas = self.catalogo.colunas
+        return [
+            colunas.livro(posicao)
+            for posicao in _posicoes_fatia(len(colunas), offset, limite)
+        ]
+
+    def precos_e_ratings(self):
+        """Colunas de preço e rating, na ordem do catálogo."""
+        colunas = self.catalogo.colunas
+        return list(colunas.precos), list(colunas.ratings)
+
+    def resumo(self):
+        return self.catalogo.resumo
+
+    def estatisticas_categoria(self, categoria):
+        return self.resumo().categoria(categoria)
+
+
+class RepositorioSQL:
+    """Consultas indexadas sobre a tabela `livros` do SQLite."""
+
+    COLUNAS_ORDENACAO = {
+        'price': Livro.price,
+        'rating': Livro.rating,
+        'title': Livro.titulo_normalizado,
+    }
+
+    def total(self):
+        return db.session.scalar(select(func.count(Livro.id)))
+
+    def _pagina(self, consulta, apos, limite, ordenacao=None):
+        """Executa a consulta em modo keyset, buscando um item a mais."""
+        coluna = self.COLUNAS_ORDENACAO.get(ordenacao)
+        if coluna is None:
+            if apos:
+                consulta = consulta.where(Livro.id > apos['id'])
+            consulta = consulta.order_by(Livro.id)
+        else:
+            if apos:
+                consulta = consulta.where(
+                    tuple_(coluna, Livro.id) > tuple_(apos['k'], apos['id'])
+                )
+            consulta = consulta.order_by(coluna, Livro.id)
+
+        livros = list(db.session.scalars(consulta.limit(limite + 1)))
+        itens = livros[:limite]
+        proximo = None
+        if len(livros) > limite:
+            ultimo = itens[-1]
+            chave = getattr(ultimo, coluna.key) if ordenacao else None
+            proximo = _cursor(ultimo.id, chave, ordenacao)
+        return [livro.para_dict() for livro in itens], proximo
+
+    def listar(self, pagina, por_pagina):
+        """Retorna (livros da página, meta, próximo cursor)."""
+        total = self.total()
+        consulta = (
+            select(Livro)
+            .order_by(Livro.id)
+            .offset(max(0, (pagina - 1) * por_pagina))
+            .limit(por_pagina)
+        )
+        livros = list(db.session.scalars(consulta))
+        proximo = (
+            _cursor(livros[-1].id)
+            if livros and pagina * por_pagina < total else None
+        )
+        return [livro.para_dict() for livro in livros], {
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "total_itens": total,
+            "total_paginas": max(1, (total + por_pagina - 1) // por_pagina),
+        }, proximo
+
+    def listar_apos(self, apos, limite):
+        return self._pagina(select(Livro), apos, limite)
+
+    def obter(self, book_id):
+        if not 0 <= book_id <= MAX_INTEIRO_SQL:
+            return None
+        livro = db.session.get(Livro, book_id)
+        return livro.para_dict() if livro else None
+
+    def buscar(self, titulo='', categoria='', min_price=None, max_price=None,
+               min_rating=None, ordenacao=None, apos=None,
+               limite=MAX_POR_PAGINA):
+        """Busca paginada: (livros da página, total, próximo cursor)."""
+        filtros = []
+        if titulo:
+            # `titulo` já vem em minúsculas (`str.lower()`), como a coluna
+            filtros.append(
+                Livro.titulo_normalizado.contains(titulo, autoescape=True)
+            )
+        if categoria:
+            # Resolve as categorias pelo índice e filtra com igualdade,
+            # em vez de aplicar LIKE em todas as linhas.
+            categorias = [
+                c for c in db.session.scalars(
+                    select(Livro.category).distinct()
+                )
+                if categoria in c.lower()
+            ]
+            if not categorias:
+                return [], 0, None
+            filtros.append(Livro.category.in_(categorias))
+        if min_price is not None:
+            filtros.append(Livro.price >= min_price)
+        if max_price is not None:
+            filtros.append(Livro.price <= max_price)
+        if min_rating is not None:
+            filtros.append(Livro.rating >= min_rating)
+
+        total = db.session.scalar(
+            select(func.count(Livro.id)).where(*filtros)
+        )
+        itens, proximo = self._pagina(
+            select(Livro).where(*filtros), apos, limite, ordenacao
+        )
+        return itens, total, proximo
+
+    def fatia(self, offset, limite=None):
+        """Livros de `livros[offset:][:limite]`, na ordem do catálogo."""
+        posicoes = _posicoes_fatia(self.total(), offset, limite)
+        if not posicoes:
+            return []
+        consulta = (
+            select(Livro)
+            .order_by(Livro.posicao)
+            .offset(posicoes.start)
+            .limit(len(posicoes))
+        )
+        return [livro.para_dict() for livro in db.session.scalars(consulta)]
+
+    def precos_e_ratings(self):
+        """Colunas de preço e rating, na ordem do catálogo."""
+        linhas = db.session.execute(
+            select(Livro.price, Livro.rating).order_by(Livro.posicao)
+        ).all()
+        return [preco for preco, _ in linhas], [rating for _, rating in linhas]
+
+    def resumo(self):
+        """
+        Agregados de `/stats`, materializados uma vez por versão dos dados.
+
+        Três consultas (geral, por rating e por categoria) montam o mesmo
+        `ResumoEstatisticas` do backend em memória.
+        """
+        global _resumo_sql
+
+        chave, resumo = _resumo_sql
+        if chave != _chave_sincronizada or resumo is None:
+            precos = (
+                func.count(Livro.id),
+                func.sum(Livro.price),
+                func.min(Livro.price),
+                func.max(Livro.price),
+            )
+            geral = db.session.execute(select(*precos)).one()
+            ratings = dict(db.session.execute(
+                select(Livro.rating, func.count(Livro.id))
+                .group_by(Livro.rating)
+            ).all())
+            categorias = {
+                nome: tuple(acumulado)
+                for nome, *acumulado in db.session.execute(
+                    select(Livro.category, *precos).group_by(Livro.category)
+                )
+            }
+            resumo = ResumoEstatisticas.de_agregados(
+                (geral[0], geral[1] or 0.0, geral[2], geral[3]),
+                ratings,
+                categorias,
+            )
+            _resumo_sql = (_chave_sincronizada, resumo)
+        return resumo
+
+    def estatisticas_categoria(self, categoria):
+        return self.resumo().categoria(categoria)
+
+
+_trava_sincronizacao = threading.Lock()
+_chave_sincronizada = None
+_resumo_sql = (None, None)
+
+
+def _ler_lotes_csv(caminho):
+    """Lê o CSV em lotes, sem carregar o arquivo inteiro em memória."""
+    with caminho.open('r', encoding='utf-8') as arquivo:
+        lote = []
+        for posicao, linha in enumerate(csv.DictReader(arquivo), start=1):
+            titulo = linha.get('title') or ''
+            lote.append({
+                'id': utils._numero_inteiro_seguro(linha.get('id')) or posicao,
+                'posicao': posicao,
+                'title': titulo,
+                'titulo_normalizado': titulo.lower(),
+                'price': utils._numero_flutuante_seguro(linha.get('price')),
+                'availability': linha.get('availability') or '',
+                'rating': utils._numero_inteiro_seguro(linha.get('rating')),
+                'category': linha.get('category') or '',
+            })
+            if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+
+def _importar_csv(conexao, assinatura):
+    """
+    Reimporta o CSV na conexão, dentro da transação já aberta.
+
+    Retorna o número de livros importados, ou None se outro processo já
+    importou esta versão enquanto esperávamos a trava de escrita.
+    """
+    db.metadata.create_all(conexao)
+    versao = conexao.scalar(
+        select(VersaoDados.assinatura).where(VersaoDados.id == 1)
+    )
+    if versao == assinatura:
+        return None
+
+    # Recriar a tabela também migra bancos de um esquema anterior
+    Livro.__table__.drop(conexao)
+    Livro.__table__.create(conexao)
+    total = 0
+    if utils.CAMINHO_DADOS.exists():
+        # IDs repetidos ficam com o primeiro livro, como na memória
+        inserir = insert(Livro).prefix_with('OR IGNORE')
+        for lote in _ler_lotes_csv(utils.CAMINHO_DADOS):
+            conexao.execute(inserir, lote)
+            total += len(lote)
+    conexao.execute(delete(VersaoDados))
+    conexao.execute(insert(VersaoDados), {'id': 1, 'assinatura': assinatura})
+    return total
+
+
+def sincronizar_banco():
+    """
+    Importa o CSV para o banco se ele mudou desde a última importação.
+
+    A assinatura do arquivo fica gravada em `versao_dados`, então workers
+    diferentes (e reinícios) não reimportam dados já carregados. A troca
+    roda em uma única transação `BEGIN IMMEDIATE`: o primeiro worker a
+    obter a trava de escrita reimporta, os leitores continuam vendo a
+    tabela anterior completa até o commit, e os demais workers esperam a
+    trava e encontram a versão já importada.
+    """
+    global _chave_sincronizada
+
+    # Só o CSV: publicar o snapshot binário não muda o que o banco importa
+    assinatura = (
+        f"{ESQUEMA_LIVROS}:{assinatura_arquivo(utils.CAMINHO_DADOS)!r}"
+    )
+    chave = (str(db.engine.url), assinatura)
+    if chave == _chave_sincronizada:
+        return
+
+    with _trava_sincronizacao:
+        if chave == _chave_sincronizada:
+            return
+
+        with db.engine.connect() as conexao:
+            conexao.exec_driver_sql(
+                f'PRAGMA busy_timeout = {ESPERA_IMPORTACAO_MS}'
+            )
+            # O pysqlite não abre transação antes de DDL: sem o BEGIN
+            # explícito, o DROP/CREATE ficaria visível antes da importação
+            conexao.exec_driver_sql('BEGIN IMMEDIATE')
+            try:
+                total = _importar_csv(conexao, assinatura)
+            except Exception:
+                conexao.rollback()
+                raise
+            conexao.commit()
+        if total is not None:
+            logger.info(f"Banco sincronizado: {total} livros importados")
+
+        _chave_sincronizada = chave
+
+
+def obter_repositorio():
+    """Retorna o repositório do backend configurado em CATALOG_BACKEND."""
+    backend = current_app.config.get('CATALOG_BACKEND', BACKEND_MEMORIA)
+    if backend == BACKEND_SQLITE:
+        sincronizar_banco()
+        return RepositorioSQL()
+    return RepositorioMemoria(obter_catalogo())
@@ -2,29 +2,84 @@
 Rotas para gerenciamento de livros.
 """
 import logging
+import math
 from flask import Blueprint, request
 
+from api.cache_respostas import resposta_em_cache
+from api.indices import CAMPOS_ORDENACAO
+from api.repositorio import obter_repositorio
 from api.utils import (
-    carregar_livros,
-    paginar_lista,
+    MAX_INTEIRO_SQL,
+    MAX_POR_PAGINA,
+    codificar_cursor,
+    decodificar_cursor,
     resposta_erro,
     resposta_sucesso,
 )
-from core.cache import cache
 
 logger = logging.getLogger(__name__)
 
 router = Blueprint('books', __name__, url_prefix='/api/v1/books')
 
 
+# Tipo da chave de ordenação guardada no cursor, por campo
+TIPOS_CHAVE = {'price': (int, float), 'rating': (int, float), 'title': str}
+
+
+def _chave_valida(ordenacao, chave):
+    """Confere se a chave do cursor tem o tipo do campo de ordenação."""
+    tipo = TIPOS_CHAVE[ordenacao]
+    if isinstance(chave, bool) or not isinstance(chave, tipo):
+        return False
+    if isinstance(chave, int):
+        return abs(chave) <= MAX_INTEIRO_SQL
+    if isinstance(chave, float):
+        return math.isfinite(chave)
+    return True
+
+
+def _ler_cursor(ordenacao=None):
+    """Cursor da página anterior (dict com id e chave) ou None."""
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return None
+    dados = decodificar_cursor(cursor)
+    posicao = dados.get('id')
+    if (
+        isinstance(posicao, bool) or not isinstance(posicao, int)
+        or not 0 <= posicao <= MAX_INTEIRO_SQL
+    ):
+        raise ValueError("Cursor inválido")
+    if dados.get('o') != ordenacao or (ordenacao and 'k' not in dados):
+        raise ValueError("Cursor não corresponde à ordenação")
+    if ordenacao and not _chave_valida(ordenacao, dados['k']):
+        raise ValueError("Cursor inválido")
+    return dados
+
+
+def _proximo_cursor(proximo):
+    return codificar_cursor(proximo) if proximo else None
+
+
+def _ler_numero(nome, tipo):
+    valor = request.args.get(nome)
+    if valor in (None, ''):
+        return None
+    numero = tipo(valor)
+    # nan/inf não ordenam igual em Python e no SQLite
+    if isinstance(numero, float) and not math.isfinite(numero):
+        raise ValueError(f"{nome} precisa ser finito")
+    return numero
+
+
 @router.route('/', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@resposta_em_cache(timeout=300)
 def get_books():
     """Lista todos os livros com paginação."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
 
-        if not livros:
+        if not repositorio.total():
             return resposta_sucesso(
                 dados=[],
                 meta={"pagina": 1, "total_itens": 0}
@@ -34,9 +89,13 @@ def get_books():
         try:
             pagina = int(request.args.get('page', 1))
             por_pagina = int(request.args.get('per_page', 20))
+            apos = _ler_cursor()
 
             if pagina < 1 or por_pagina < 1:
                 raise ValueError("Valores inválidos")
+            # Offset e limite precisam caber em um inteiro do SQLite
+            if pagina * por_pagina > MAX_INTEIRO_SQL:
+                raise ValueError("Valores fora do intervalo")
 
         except ValueError:
             return resposta_erro(
@@ -44,7 +103,22 @@ def get_books():
                 codigo_status=400
             )
 
-        itens_pagina, meta = paginar_lista(livros, pagina, por_pagina)
+        # Mesmo teto de itens com ou sem cursor
+        por_pagina = min(por_pagina, MAX_POR_PAGINA)
+
+        # Com cursor, pagina por chave (id > cursor) em vez de offset
+        if apos is not None:
+            itens_pagina, proximo = repositorio.listar_apos(apos, por_pagina)
+            meta = {
+                "por_pagina": por_pagina,
+                "total_itens": repositorio.total(),
+            }
+        else:
+            itens_pagina, meta, proximo = repositorio.listar(
+                pagina, por_pagina
+            )
+
+        meta["proximo_cursor"] = _proximo_cursor(proximo)
         return resposta_sucesso(dados=itens_pagina, meta=meta)
 
     except Exception as e:
@@ -53,16 +127,15 @@ def get_books():
 
 
 @router.route('/<int:book_id>', methods=['GET'])
+@resposta_em_cache(timeout=300, por_conteudo=True)
 def get_book_by_id(book_id):
-    """Retorna um livro pelo ID."""
+    """Retorna um livro pelo ID estável."""
     try:
-        livros = carregar_livros()
+        livro = obter_repositorio().obter(book_id)
 
-        if book_id < 1 or book_id > len(livros):
+        if livro is None:
             return resposta_erro('Livro não encontrado', codigo_status=404)
 
-        livro = livros[book_id - 1]
-        livro['id'] = book_id
         return resposta_sucesso(dados=livro)
 
     except Exception as e:
@@ -71,37 +144,67 @@ def get_book_by_id(book_id):
 
 
 @router.route('/search', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@resposta_em_cache(timeout=300)
 def search_books():
-    """Busca livros por título ou categoria."""
+    """Busca livros por título, categoria, faixa de preço e rating."""
     try:
-        livros = carregar_livros()
-
         titulo = request.args.get('title', '').strip().lower()
         categoria = request.args.get('category', '').strip().lower()
+        ordenacao = request.args.get('sort') or None
 
-        # Se não tem filtro, retorna todos
-        if not titulo and not categoria:
-            return resposta_sucesso(
-                dados=livros,
-                meta={"total_resultados": len(livros)}
+        if ordenacao is not None and ordenacao not in CAMPOS_ORDENACAO:
+            return resposta_erro(
+                "Ordenação inválida",
+                codigo_status=400,
+                detalhes={"valores_aceitos": list(CAMPOS_ORDENACAO)}
             )
 
-        # Filtra os livros
-        resultado = []
-        for livro in livros:
-            titulo_livro = livro.get('title', '').lower()
-            categoria_livro = livro.get('category', '').lower()
+        try:
+            min_price = _ler_numero('min_price', float)
+            max_price = _ler_numero('max_price', float)
+            min_rating = _ler_numero('min_rating', int)
+            if min_rating is not None and abs(min_rating) > MAX_INTEIRO_SQL:
+                raise ValueError("Rating fora do intervalo")
+        except ValueError:
+            return resposta_erro(
+                "Parâmetros de filtro inválidos",
+                codigo_status=400
+            )
 
-            titulo_ok = not titulo or titulo in titulo_livro
-            categoria_ok = not categoria or categoria in categoria_livro
+        try:
+            por_pagina = int(request.args.get('per_page', 20))
+            apos = _ler_cursor(ordenacao)
+
+            if por_pagina < 1:
+                raise ValueError("Valores inválidos")
 
-            if titulo_ok and categoria_ok:
-                resultado.append(livro)
+        except ValueError:
+            return resposta_erro(
+                "Parâmetros de paginação inválidos",
+                codigo_status=400
+            )
+
+        por_pagina = min(por_pagina, MAX_POR_PAGINA)
+
+        # Sem filtro, o repositório pagina o catálogo inteiro
+        resultado, total, proximo = obter_repositorio().buscar(
+            titulo,
+            categoria,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            ordenacao=ordenacao,
+            apos=apos,
+            limite=por_pagina,
+        )
 
         return resposta_sucesso(
             dados=resultado,
-            meta={"total_resultados": len(resultado)}
+            meta={
+                "total_resultados": total,
+                "por_pagina": por_pagina,
+                "proximo_cursor": _proximo_cursor(proximo),
+            }
         )
 
     except Exception as e:
@@ -4,13 +4,12 @@ Rotas para categorias de livros.
 import logging
 from flask import Blueprint
 
+from api.cache_respostas import resposta_em_cache
+from api.repositorio import obter_repositorio
 from api.utils import (
-    carregar_livros,
-    lista_categorias,
     resposta_erro,
     resposta_sucesso,
 )
-from core.cache import cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +17,11 @@ router = Blueprint('categories', __name__, url_prefix='/api/v1/categories')
 
 
 @router.route('/', methods=['GET'])
-@cache.cached(timeout=300)
+@resposta_em_cache(timeout=300)
 def get_categories():
     """Lista todas as categorias."""
     try:
-        livros = carregar_livros()
-        categorias = lista_categorias(livros)
+        categorias = obter_repositorio().resumo().nomes_categorias()
         return resposta_sucesso(dados=categorias)
 
     except Exception as e:
@@ -5,7 +5,8 @@ import logging
 from pathlib import Path
 from flask import Blueprint
 
-from api.utils import carregar_livros, resposta_sucesso
+from api.repositorio import obter_repositorio
+from api.utils import resposta_sucesso
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +21,7 @@ def health_check():
     dados_disponiveis = Path(data_file).exists()
 
     try:
-        livros = carregar_livros()
-        total_livros = len(livros)
+        total_livros = obter_repositorio().total()
         dados_status = "ok" if total_livros > 0 else "vazio"
     except Exception as e:
         logger.error(f"Erro ao verificar dados: {e}")
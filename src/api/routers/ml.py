@@ -4,8 +4,9 @@ Rotas para Machine Learning.
 import logging
 from flask import Blueprint, request
 
-from api.utils import carregar_livros, resposta_sucesso, resposta_erro
-from core.cache import cache
+from api.cache_respostas import resposta_em_cache
+from api.repositorio import obter_repositorio
+from api.utils import resposta_sucesso, resposta_erro
 
 logger = logging.getLogger(__name__)
 
@@ -50,31 +51,27 @@ def extrair_features(livro):
 
 
 @router.route('/features', methods=['GET'])
-@cache.cached(timeout=300)
+@resposta_em_cache(timeout=300)
 def get_features():
     """Retorna features dos livros para ML."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
+        total = repositorio.total()
 
-        if not livros:
+        if not total:
             return resposta_erro("Nenhum livro encontrado", codigo_status=404)
 
         # Pega limit e offset da query
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', default=0, type=int)
 
-        # Aplica offset e limit
-        livros_filtrados = livros[offset:]
-        if limit:
-            livros_filtrados = livros_filtrados[:limit]
-
-        # Extrai features
+        # Extrai features só dos livros da fatia pedida
         features = []
-        for livro in livros_filtrados:
+        for livro in repositorio.fatia(offset, limit):
             features.append(extrair_features(livro))
 
         return resposta_sucesso(dados={
-            "total": len(livros),
+            "total": total,
             "retornados": len(features),
             "features": features
         })
@@ -85,29 +82,25 @@ def get_features():
 
 
 @router.route('/training-data', methods=['GET'])
-@cache.cached(timeout=300)
+@resposta_em_cache(timeout=300)
 def get_training_data():
     """Retorna dados para treinar modelo de ML."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
 
-        if not livros:
+        if not repositorio.total():
             return resposta_erro("Nenhum livro encontrado", codigo_status=404)
 
-        # Monta as features e labels
-        features = []
-        labels = []
+        # Monta as features e labels direto das colunas
+        precos, ratings = repositorio.precos_e_ratings()
+        precos = [round(preco, 2) for preco in precos]
 
-        for livro in livros:
-            f = extrair_features(livro)
-            # Vetor de features simples
-            features.append([f['preco'], f['rating']])
-            labels.append(f['rating'])
+        # Vetor de features simples
+        features = [list(par) for par in zip(precos, ratings)]
 
         # Qual campo é o target
         target = request.args.get('target', default='rating')
-        if target == 'price':
-            labels = [extrair_features(l)['preco'] for l in livros]
+        labels = precos if target == 'price' else ratings
 
         return resposta_sucesso(dados={
             "features": features,
@@ -4,14 +4,9 @@ Rotas para estatísticas dos livros.
 import logging
 from flask import Blueprint
 
-from api.utils import (
-    carregar_livros,
-    resposta_sucesso,
-    resposta_erro,
-    lista_categorias,
-    estatisticas_precos
-)
-from core.cache import cache
+from api.cache_respostas import resposta_condicional, resposta_em_cache
+from api.repositorio import obter_repositorio
+from api.utils import resposta_sucesso, resposta_erro
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +14,13 @@ router = Blueprint('stats', __name__, url_prefix='/api/v1/stats')
 
 
 @router.route('/', methods=['GET'])
-@cache.cached(timeout=300)
+@resposta_em_cache(timeout=300)
 def get_stats():
     """Retorna estatísticas básicas dos livros."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
 
-        if not livros:
+        if not repositorio.total():
             return resposta_sucesso(dados={
                 "total_livros": 0,
                 "preco_medio": 0.0,
@@ -33,7 +28,7 @@ def get_stats():
                 "preco_maximo": 0.0
             })
 
-        stats = estatisticas_precos(livros)
+        stats = repositorio.resumo().geral()
         return resposta_sucesso(dados=stats)
 
     except Exception as e:
@@ -42,13 +37,13 @@ def get_stats():
 
 
 @router.route('/overview', methods=['GET'])
-@cache.cached(timeout=300)
+@resposta_em_cache(timeout=300)
 def get_stats_overview():
     """Retorna visão geral com distribuição de ratings."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
 
-        if not livros:
+        if not repositorio.total():
             return resposta_sucesso(dados={
                 "total_livros": 0,
                 "preco_medio": 0.0,
@@ -58,17 +53,7 @@ def get_stats_overview():
                 "total_categorias": 0
             })
 
-        stats = estatisticas_precos(livros)
-
-        # Conta ratings
-        distribuicao = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-        for livro in livros:
-            rating = livro.get('rating', 0)
-            if rating in [1, 2, 3, 4, 5]:
-                distribuicao[str(rating)] += 1
-
-        stats["distribuicao_ratings"] = distribuicao
-        stats["total_categorias"] = len(lista_categorias(livros))
+        stats = repositorio.resumo().visao_geral()
 
         return resposta_sucesso(dados=stats)
 
@@ -78,27 +63,21 @@ def get_stats_overview():
 
 
 @router.route('/category/<string:category>', methods=['GET'])
+@resposta_condicional
 def get_category_stats(category):
     """Retorna estatísticas de uma categoria."""
     try:
-        livros = carregar_livros()
+        repositorio = obter_repositorio()
 
-        if not livros:
+        if not repositorio.total():
             return resposta_sucesso(
                 dados={'total_livros': 0, 'categoria': category}
             )
 
-        categorias = lista_categorias(livros)
-        if category not in categorias:
+        stats = repositorio.estatisticas_categoria(category)
+        if stats is None:
             return resposta_erro('Categoria não encontrada', codigo_status=404)
 
-        # Filtra livros da categoria
-        livros_categoria = []
-        for livro in livros:
-            if livro.get('category') == category:
-                livros_categoria.append(livro)
-
-        stats = estatisticas_precos(livros_categoria)
         stats['categoria'] = category
 
         return resposta_sucesso(dados=stats)
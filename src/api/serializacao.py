@@ -0,0 +1,44 @@
+"""
+Serialização JSON das respostas.
+
+Com o `orjson` instalado, `jsonify` passa a usá-lo no lugar do `json` da
+biblioteca padrão; sem ele, fica o provedor padrão do Flask. A saída segue
+o formato do provedor padrão (chaves ordenadas, compacta), exceto pelos
+caracteres não ASCII, que saem em UTF-8 em vez de escapados.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ProvedorOrjson(DefaultJSONProvider):
+    """Provedor JSON do Flask que serializa com o orjson."""
+
+    if orjson is not None:
+        OPCOES = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def _serializar(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.OPCOES)
+
+    def dumps(self, obj, **kwargs):
+        # Indentação e outras opções do json ficam com o provedor padrão
+        if set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self._serializar(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self._serializar(obj) + b'\n', mimetype=self.mimetype
+        )
+
+
+def configurar_json(app):
+    """Instala o provedor orjson na aplicação, se o pacote existir."""
+    if orjson is not None and app.config.get('API_FAST_JSON', True):
+        app.json = ProvedorOrjson(app)
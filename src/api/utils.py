@@ -1,20 +1,27 @@
 """
 Funções utilitárias da API.
 """
-import csv
+import base64
+import json
 import logging
 from pathlib import Path
-from statistics import mean
 
 from flask import jsonify
 
+from core.colunas import ColunasLivros
 from core.config import Config
+from core.snapshot import abrir_snapshot
 
 logger = logging.getLogger(__name__)
 
 # Caminho do arquivo CSV
 CAMINHO_DADOS = Path(Config.CSV_FILE)
 
+# Limite de itens por página na paginação por cursor e na busca
+MAX_POR_PAGINA = 100
+# Maior inteiro que o SQLite aceita; acima dele a consulta nem é montada
+MAX_INTEIRO_SQL = 2 ** 63 - 1
+
 
 def resposta_sucesso(dados=None, meta=None, codigo_status=200):
     """Monta resposta de sucesso."""
@@ -54,84 +61,41 @@ def _numero_inteiro_seguro(valor):
         return 0
 
 
-def carregar_livros():
-    """Lê os livros do arquivo CSV."""
+def carregar_colunas():
+    """
+    Carrega os livros na representação colunar.
+
+    Usa o snapshot binário mapeado em memória quando ele corresponde ao CSV
+    atual; senão lê o CSV.
+    """
     if not CAMINHO_DADOS.exists():
         logger.warning(f"Arquivo não encontrado: {CAMINHO_DADOS}")
-        return []
+        return ColunasLivros.vazio()
+
+    colunas = abrir_snapshot(CAMINHO_DADOS)
+    if colunas is not None:
+        return colunas
 
-    livros = []
     try:
-        with CAMINHO_DADOS.open("r", encoding="utf-8") as arquivo:
-            leitor = csv.DictReader(arquivo)
-            for linha in leitor:
-                linha["price"] = _numero_flutuante_seguro(linha.get("price"))
-                linha["rating"] = _numero_inteiro_seguro(linha.get("rating"))
-                livros.append(linha)
+        return ColunasLivros.de_csv(CAMINHO_DADOS)
     except Exception as e:
         logger.error(f"Erro ao ler CSV: {e}")
-        return []
-
-    return livros
-
-
-def paginar_lista(itens, pagina, por_pagina):
-    """Pagina uma lista de itens."""
-    total = len(itens)
-    
-    if por_pagina:
-        total_paginas = max(1, (total + por_pagina - 1) // por_pagina)
-    else:
-        total_paginas = 1
-    
-    inicio = max(0, (pagina - 1) * por_pagina)
-    fim = inicio + por_pagina if por_pagina else total
-    
-    return itens[inicio:fim], {
-        "pagina": pagina,
-        "por_pagina": por_pagina,
-        "total_itens": total,
-        "total_paginas": total_paginas,
-    }
+        return ColunasLivros.vazio()
 
 
-def lista_categorias(itens):
-    """Extrai categorias únicas dos itens."""
-    categorias = set()
-    for item in itens:
-        categoria = item.get("category", "")
-        if categoria:
-            categorias.add(categoria)
-    return sorted(list(categorias))
-
-
-def estatisticas_precos(itens):
-    """Calcula estatísticas de preços."""
-    if not itens:
-        return {
-            "total_livros": 0,
-            "preco_medio": 0,
-            "preco_minimo": 0,
-            "preco_maximo": 0
-        }
-
-    valores = []
-    for item in itens:
-        preco = item.get("price", 0)
-        if isinstance(preco, (int, float)):
-            valores.append(preco)
-
-    if not valores:
-        return {
-            "total_livros": len(itens),
-            "preco_medio": 0,
-            "preco_minimo": 0,
-            "preco_maximo": 0
-        }
-
-    return {
-        "total_livros": len(itens),
-        "preco_medio": round(mean(valores), 2),
-        "preco_minimo": min(valores),
-        "preco_maximo": max(valores),
-    }
+def codificar_cursor(dados):
+    """Gera um cursor opaco (JSON em base64) para paginação keyset."""
+    bruto = json.dumps(dados, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Lê um cursor de `codificar_cursor`; ValueError se for inválido."""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(preenchido))
+    except ValueError as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(dados, dict):
+        raise ValueError("Cursor inválido")
+    return dados
@@ -1,3 +1,15 @@
 from flask_caching import Cache
 
 cache = Cache()
+
+# Apelidos de CACHE_TYPE para os backends do próprio projeto
+BACKENDS_CACHE = {
+    'sqlite': 'core.cache_compartilhado.CacheSQLite',
+}
+
+
+def iniciar_cache(app):
+    """Inicializa o cache, aceitando os apelidos de BACKENDS_CACHE."""
+    tipo = app.config.get('CACHE_TYPE')
+    app.config['CACHE_TYPE'] = BACKENDS_CACHE.get(tipo, tipo)
+    cache.init_app(app)
@@ -0,0 +1,191 @@
+"""
+Backend do Flask-Caching compartilhado entre processos, em um arquivo SQLite.
+
+Com `CACHE_TYPE=simple` cada worker do gunicorn tem o próprio cache: a taxa
+de acerto cai na proporção do número de workers e a memória se multiplica.
+Este backend guarda as entradas em um SQLite local (modo WAL, leituras
+concorrentes), de modo que todos os workers do mesmo nó compartilham as
+respostas calculadas, sem depender de um Redis.
+
+O arquivo tem um teto de tamanho (`CACHE_SQLITE_MAX_MB`): ao passar dele,
+saem primeiro as entradas vencidas e depois as usadas há mais tempo (LRU).
+
+    CACHE_TYPE=sqlite
+    CACHE_SQLITE_PATH=data/api_cache.sqlite
+    CACHE_SQLITE_MAX_MB=64
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from flask_caching.backends.base import BaseCache
+
+logger = logging.getLogger(__name__)
+
+# Resolução do horário de último acesso: evita uma escrita a cada leitura
+_RESOLUCAO_ACESSO = 1.0
+_ESPERA_TRAVA_MS = 5000
+
+
+class CacheSQLite(BaseCache):
+    """
+    Cache LRU com teto de tamanho em um arquivo SQLite.
+
+    Cada thread (de cada processo) usa a própria conexão; o SQLite cuida da
+    concorrência entre processos.
+
+    Attributes:
+        caminho (Path): O arquivo do cache.
+        limite_bytes (int): Tamanho máximo somado das entradas.
+    """
+
+    def __init__(
+        self,
+        caminho: str,
+        limite_bytes: int = 64 * 1024 * 1024,
+        default_timeout: int = 300
+    ) -> None:
+        super().__init__(default_timeout=default_timeout)
+        self.caminho = Path(caminho)
+        self.limite_bytes = limite_bytes
+        self._local = threading.local()
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                ' chave TEXT PRIMARY KEY,'
+                ' valor BLOB NOT NULL,'
+                ' expira REAL,'
+                ' acesso REAL NOT NULL,'
+                ' tamanho INTEGER NOT NULL)'
+            )
+            conexao.execute(
+                'CREATE INDEX IF NOT EXISTS cache_acesso ON cache (acesso)'
+            )
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            caminho=config['CACHE_SQLITE_PATH'],
+            limite_bytes=int(config['CACHE_SQLITE_MAX_MB']) * 1024 * 1024,
+        )
+        return cls(*args, **kwargs)
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão desta thread (refeita depois de um fork)."""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(
+                self.caminho, timeout=_ESPERA_TRAVA_MS / 1000,
+                isolation_level=None
+            )
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def _expiracao(self, timeout: Optional[int]) -> Optional[float]:
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else None
+
+    def get(self, key: str) -> Any:
+        agora = time.time()
+        conexao = self._conexao()
+        linha = conexao.execute(
+            'SELECT valor, expira, acesso FROM cache WHERE chave = ?', (key,)
+        ).fetchone()
+        if linha is None:
+            return None
+        valor, expira, acesso = linha
+        if expira is not None and expira <= agora:
+            return None
+        if agora - acesso >= _RESOLUCAO_ACESSO:
+            conexao.execute(
+                'UPDATE cache SET acesso = ? WHERE chave = ?', (agora, key)
+            )
+        try:
+            return pickle.loads(valor)
+        except Exception:
+            logger.warning(f"Entrada de cache ilegível descartada: {key}")
+            self.delete(key)
+            return None
+
+    def _gravar(self, key: str, value: Any, timeout: Optional[int],
+                somente_se_ausente: bool) -> bool:
+        valor = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        agora = time.time()
+        conexao = self._conexao()
+        consulta = (
+            'INSERT INTO cache (chave, valor, expira, acesso, tamanho)'
+            ' VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor,'
+            ' expira = excluded.expira, acesso = excluded.acesso,'
+            ' tamanho = excluded.tamanho'
+        )
+        parametros = [key, valor, self._expiracao(timeout), agora, len(valor)]
+        if somente_se_ausente:
+            # Só sobrescreve uma entrada já vencida
+            consulta += ' WHERE cache.expira IS NOT NULL AND cache.expira <= ?'
+            parametros.append(agora)
+        gravou = conexao.execute(consulta, parametros).rowcount > 0
+        if gravou:
+            self._liberar_espaco(conexao, agora)
+        return gravou
+
+    def _liberar_espaco(self, conexao: sqlite3.Connection, agora: float):
+        """Remove vencidas e depois as menos usadas até caber no teto."""
+        total = conexao.execute(
+            'SELECT COALESCE(SUM(tamanho), 0) FROM cache'
+        ).fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        conexao.execute(
+            'DELETE FROM cache WHERE expira IS NOT NULL AND expira <= ?',
+            (agora,)
+        )
+        total = conexao.execute(
+            'SELECT COALESCE(SUM(tamanho), 0) FROM cache'
+        ).fetchone()[0]
+        excedente = total - self.limite_bytes
+        if excedente <= 0:
+            return
+        removidas = []
+        for chave, tamanho in conexao.execute(
+            'SELECT chave, tamanho FROM cache ORDER BY acesso'
+        ):
+            removidas.append((chave,))
+            excedente -= tamanho
+            if excedente <= 0:
+                break
+        conexao.executemany('DELETE FROM cache WHERE chave = ?', removidas)
+
+    def set(self, key: str, value: Any,
+            timeout: Optional[int] = None) -> bool:
+        return self._gravar(key, value, timeout, somente_se_ausente=False)
+
+    def add(self, key: str, value: Any,
+            timeout: Optional[int] = None) -> bool:
+        return self._gravar(key, value, timeout, somente_se_ausente=True)
+
+    def delete(self, key: str) -> bool:
+        cursor = self._conexao().execute(
+            'DELETE FROM cache WHERE chave = ?', (key,)
+        )
+        return cursor.rowcount > 0
+
+    def has(self, key: str) -> bool:
+        linha = self._conexao().execute(
+            'SELECT 1 FROM cache WHERE chave = ?'
+            ' AND (expira IS NULL OR expira > ?)', (key, time.time())
+        ).fetchone()
+        return linha is not None
+
+    def clear(self) -> bool:
+        self._conexao().execute('DELETE FROM cache')
+        return True
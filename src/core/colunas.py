@@ -0,0 +1,143 @@
+"""
+Representação colunar do catálogo de livros.
+
+Em vez de um dicionário por livro, cada campo vira uma coluna contígua:
+preços em `array('d')`, ratings em `array('b')` e categoria/disponibilidade
+codificadas como índices para um dicionário de valores distintos, e os
+IDs estáveis (atribuídos pelo scraper) em `array('q')`. Os agregados são
+calculados direto sobre as colunas, em uma passada, por
+`api.estatisticas.ResumoEstatisticas`. As colunas podem ser `array`s ou
+`memoryview`s sobre um snapshot mapeado (`core.snapshot`).
+"""
+import csv
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+RATINGS_VALIDOS = (1, 2, 3, 4, 5)
+
+
+def _flutuante(valor: Any) -> float:
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _inteiro(valor: Any) -> int:
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return 0
+
+
+class _Dicionario:
+    """Codifica valores repetidos (categoria, disponibilidade) em inteiros."""
+
+    def __init__(self) -> None:
+        self.valores: List[str] = []
+        self._codigos: Dict[str, int] = {}
+
+    def codificar(self, valor: str) -> int:
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self._codigos[valor] = codigo
+            self.valores.append(valor)
+        return codigo
+
+
+class ColunasLivros:
+    """
+    Catálogo armazenado por colunas.
+
+    Attributes:
+        titulos (Sequence[str]): Título de cada livro.
+        precos (array): Preços como float64 contíguos.
+        ratings (array): Ratings como inteiros de 8 bits.
+        codigos_categoria (array): Índice em `categorias` de cada livro.
+        categorias (List[str]): Valores distintos de categoria.
+        codigos_disponibilidade (array): Índice em `disponibilidades`.
+        disponibilidades (List[str]): Valores distintos de disponibilidade.
+        ids (array): ID estável de cada livro (int64); CSVs sem a coluna
+                     `id` usam a posição 1-indexada.
+    """
+
+    def __init__(
+        self,
+        titulos: Sequence[str],
+        precos: Sequence[float],
+        ratings: Sequence[int],
+        codigos_categoria: Sequence[int],
+        categorias: List[str],
+        codigos_disponibilidade: Sequence[int],
+        disponibilidades: List[str],
+        ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.titulos = titulos
+        self.precos = precos
+        self.ratings = ratings
+        self.codigos_categoria = codigos_categoria
+        self.categorias = categorias
+        self.codigos_disponibilidade = codigos_disponibilidade
+        self.disponibilidades = disponibilidades
+        if ids is None:
+            ids = array('q', range(1, len(precos) + 1))
+        self.ids = ids
+
+    @classmethod
+    def de_linhas(cls, linhas: Iterable[Dict[str, Any]]) -> 'ColunasLivros':
+        """Monta as colunas a partir de dicionários no formato do CSV."""
+        titulos: List[str] = []
+        precos = array('d')
+        ratings = array('b')
+        codigos_categoria = array('I')
+        codigos_disponibilidade = array('I')
+        ids = array('q')
+        categorias = _Dicionario()
+        disponibilidades = _Dicionario()
+
+        for linha in linhas:
+            titulos.append(linha.get('title') or '')
+            precos.append(_flutuante(linha.get('price')))
+            ids.append(_inteiro(linha.get('id')) or len(precos))
+            rating = _inteiro(linha.get('rating'))
+            ratings.append(rating if -128 <= rating <= 127 else 0)
+            codigos_categoria.append(
+                categorias.codificar(linha.get('category') or '')
+            )
+            codigos_disponibilidade.append(
+                disponibilidades.codificar(linha.get('availability') or '')
+            )
+
+        return cls(
+            titulos, precos, ratings,
+            codigos_categoria, categorias.valores,
+            codigos_disponibilidade, disponibilidades.valores, ids,
+        )
+
+    @classmethod
+    def de_csv(cls, caminho: Path) -> 'ColunasLivros':
+        """Lê o CSV linha a linha direto para as colunas."""
+        with Path(caminho).open('r', encoding='utf-8') as arquivo:
+            return cls.de_linhas(csv.DictReader(arquivo))
+
+    @classmethod
+    def vazio(cls) -> 'ColunasLivros':
+        return cls.de_linhas([])
+
+    def __len__(self) -> int:
+        return len(self.precos)
+
+    def livro(self, indice: int) -> Dict[str, Any]:
+        """Reconstrói o dicionário de um livro a partir das colunas."""
+        return {
+            'id': self.ids[indice],
+            'title': self.titulos[indice],
+            'price': self.precos[indice],
+            'availability': self.disponibilidades[
+                self.codigos_disponibilidade[indice]
+            ],
+            'rating': self.ratings[indice],
+            'category': self.categorias[self.codigos_categoria[indice]],
+        }
@@ -16,6 +16,32 @@ class Config:
 
     # Scraping Settings
     SITE_URL = os.getenv('SITE_URL', 'https://books.toscrape.com/')
+    # Max simultaneous requests (lowered adaptively on 429/5xx/slow
+    # responses) and global request rate cap (robots.txt Crawl-delay may
+    # lower it further)
+    SCRAPER_CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', 8))
+    SCRAPER_MAX_REQUESTS_PER_SECOND = float(
+        os.getenv('SCRAPER_MAX_REQUESTS_PER_SECOND', 5)
+    )
+    # Processes parsing listing and detail HTML outside the GIL
+    # (0 = parse in the fetching thread)
+    SCRAPER_PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', 0))
+    # Catalogue pages to crawl in 'detalhes' mode (0 = every page announced
+    # by the pager's "Page 1 of N")
+    SCRAPER_MAX_PAGES = int(os.getenv('SCRAPER_MAX_PAGES', 0))
+    # Retries (jittered backoff / Retry-After) on 429, 5xx and network errors
+    SCRAPER_MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', 3))
+    # 'detalhes' (catalogue pages + one detail request per book) or
+    # 'categorias' (category listings, category taken from the listing)
+    SCRAPER_CRAWL_MODE = os.getenv('SCRAPER_CRAWL_MODE', 'detalhes').lower()
+    # On-disk HTTP cache for conditional GETs on re-scrapes ('' disables)
+    SCRAPER_HTTP_CACHE_DIR = os.getenv(
+        'SCRAPER_HTTP_CACHE_DIR', str(DATA_FOLDER / 'http_cache')
+    )
+    # Reuse the previous books.csv and only enrich new or changed books
+    SCRAPER_INCREMENTAL = os.getenv(
+        'SCRAPER_INCREMENTAL', 'false'
+    ).lower() == 'true'
 
     # API Settings
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
@@ -50,15 +76,54 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Cache Settings
+    # Storage backend for catalog queries: 'memoria' (in-process catalog)
+    # or 'sqlite' (indexed tables in SQLALCHEMY_DATABASE_URI). With
+    # 'sqlite' every data route reads from the database and the in-memory
+    # catalog is never loaded
+    CATALOG_BACKEND = os.getenv('CATALOG_BACKEND', 'memoria').lower()
+
+    # Cache Settings ('simple' is per process; 'sqlite' is shared by every
+    # worker on the node through CACHE_SQLITE_PATH, LRU-capped)
     CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
+    CACHE_SQLITE_PATH = os.getenv(
+        'CACHE_SQLITE_PATH', str(DATA_FOLDER / 'api_cache.sqlite')
+    )
+    CACHE_SQLITE_MAX_MB = int(os.getenv('CACHE_SQLITE_MAX_MB', 64))
     CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+    # Seconds an expired response stays servable while one request
+    # recomputes it (stale-while-revalidate)
+    API_CACHE_STALE_SECONDS = int(os.getenv('API_CACHE_STALE_SECONDS', 60))
+    # Cache-Control max-age of GET responses; clients and CDNs revalidate
+    # with If-None-Match against the dataset-version ETag afterwards
+    API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 60))
+    # Serialize JSON responses with orjson when it is installed
+    API_FAST_JSON = os.getenv('API_FAST_JSON', 'true').lower() == 'true'
+    # Hot GET responses precomputed at startup and whenever a new dataset
+    # version is seen (comma-separated paths; empty disables warm-up)
+    API_WARMUP_URLS = tuple(
+        url.strip() for url in os.getenv(
+            'API_WARMUP_URLS',
+            '/api/v1/stats/overview,/api/v1/stats/,/api/v1/categories/,'
+            '/api/v1/books/,/api/v1/books/?page=2'
+        ).split(',') if url.strip()
+    )
+    # Running API the pipeline pings after publishing data, so workers warm
+    # up right away instead of on the next client request ('' disables)
+    API_WARMUP_BASE_URL = os.getenv('API_WARMUP_BASE_URL', '')
 
 
 # Expose settings as module-level variables for backward compatibility
 # if needed, but prefer using Config class.
 # For now, we map them to keep existing code working until fully refactored.
 SITE_URL = Config.SITE_URL
+SCRAPER_CONCURRENCY = Config.SCRAPER_CONCURRENCY
+SCRAPER_MAX_REQUESTS_PER_SECOND = Config.SCRAPER_MAX_REQUESTS_PER_SECOND
+SCRAPER_MAX_RETRIES = Config.SCRAPER_MAX_RETRIES
+SCRAPER_PARSE_WORKERS = Config.SCRAPER_PARSE_WORKERS
+SCRAPER_MAX_PAGES = Config.SCRAPER_MAX_PAGES
+SCRAPER_CRAWL_MODE = Config.SCRAPER_CRAWL_MODE
+SCRAPER_HTTP_CACHE_DIR = Config.SCRAPER_HTTP_CACHE_DIR
+SCRAPER_INCREMENTAL = Config.SCRAPER_INCREMENTAL
 DATA_FOLDER = str(Config.DATA_FOLDER)
 CSV_FILE = str(Config.CSV_FILE)
 API_HOST = Config.API_HOST
@@ -72,5 +137,13 @@ SECRET_KEY = Config.SECRET_KEY
 DEBUG = Config.DEBUG
 SQLALCHEMY_DATABASE_URI = Config.SQLALCHEMY_DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = Config.SQLALCHEMY_TRACK_MODIFICATIONS
+CATALOG_BACKEND = Config.CATALOG_BACKEND
 CACHE_TYPE = Config.CACHE_TYPE
+CACHE_SQLITE_PATH = Config.CACHE_SQLITE_PATH
+CACHE_SQLITE_MAX_MB = Config.CACHE_SQLITE_MAX_MB
 CACHE_DEFAULT_TIMEOUT = Config.CACHE_DEFAULT_TIMEOUT
+API_CACHE_STALE_SECONDS = Config.API_CACHE_STALE_SECONDS
+API_CACHE_MAX_AGE = Config.API_CACHE_MAX_AGE
+API_FAST_JSON = Config.API_FAST_JSON
+API_WARMUP_URLS = Config.API_WARMUP_URLS
+API_WARMUP_BASE_URL = Config.API_WARMUP_BASE_URL
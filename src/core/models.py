@@ -0,0 +1,49 @@
+"""
+Modelos do backend SQL do catálogo (usado quando CATALOG_BACKEND=sqlite).
+"""
+from core.db import db
+
+
+class Livro(db.Model):
+    """Um livro raspado; `id` é o ID estável e `posicao` a ordem no CSV."""
+
+    __tablename__ = 'livros'
+    # Cada índice termina no `id`, o desempate estável da paginação keyset:
+    # cobrem o ORDER BY (campo, id) e o WHERE (campo, id) > (...)
+    __table_args__ = (
+        db.Index('ix_livros_titulo_id', 'titulo_normalizado', 'id'),
+        db.Index('ix_livros_price_id', 'price', 'id'),
+        db.Index('ix_livros_rating_id', 'rating', 'id'),
+        db.Index('ix_livros_category_id', 'category', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    posicao = db.Column(db.Integer, nullable=False, unique=True)
+    title = db.Column(db.String, nullable=False, default='')
+    # `str.lower()` do título: o SQLite só dobra maiúsculas ASCII, então a
+    # ordenação e a busca por título usam esta coluna, como na memória
+    titulo_normalizado = db.Column(db.String, nullable=False, default='')
+    price = db.Column(db.Float, nullable=False, default=0.0)
+    availability = db.Column(db.String, nullable=False, default='')
+    rating = db.Column(db.Integer, nullable=False, default=0)
+    category = db.Column(db.String, nullable=False, default='')
+
+    def para_dict(self):
+        """Retorna o livro no mesmo formato lido do CSV."""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'price': self.price,
+            'availability': self.availability,
+            'rating': self.rating,
+            'category': self.category,
+        }
+
+
+class VersaoDados(db.Model):
+    """Assinatura do arquivo de dados importado por último no banco."""
+
+    __tablename__ = 'versao_dados'
+
+    id = db.Column(db.Integer, primary_key=True)
+    assinatura = db.Column(db.String, nullable=False)
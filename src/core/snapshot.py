@@ -0,0 +1,257 @@
+"""
+Snapshot binário do catálogo, pensado para ser lido via `mmap`.
+
+O arquivo fica ao lado do CSV (`books.csv` -> `books.bin`) e guarda as
+mesmas colunas de `core.colunas.ColunasLivros`:
+
+    cabeçalho  MAGIC, versão, ordem de bytes, nº de livros, tamanho e
+               mtime do CSV de origem, nº de seções
+    seções     tabela (offset, tamanho) seguida dos dados, cada seção
+               alinhada em 8 bytes:
+               preços (float64), ratings (int8), códigos de categoria e
+               de disponibilidade (uint32), três tabelas de texto
+               (títulos, categorias, disponibilidades) no formato
+               offsets (uint64, n + 1) + blob UTF-8 e os IDs (int64).
+
+Como o arquivo é aberto somente leitura e as colunas são `memoryview`s
+sobre o mapeamento, vários workers compartilham as mesmas páginas do page
+cache. O snapshot só é usado se o tamanho/mtime do CSV gravados no
+cabeçalho batem com o CSV atual e se todas as seções são consistentes
+(cabem no arquivo, cada coluna tem um valor por livro e os códigos apontam
+para os dicionários); caso contrário a API volta a ler o CSV.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from core.colunas import ColunasLivros
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LIVROSBN'
+VERSAO = 2
+EXTENSAO = '.bin'
+_ALINHAMENTO = 8
+_CABECALHO = struct.Struct('<8sHBxIQqI')
+_SECAO = struct.Struct('<QQ')
+_ORDEM_BYTES = {'little': 1, 'big': 2}
+_NUM_SECOES = 11
+
+
+def caminho_snapshot(caminho_csv: Path) -> Path:
+    """Caminho do snapshot correspondente a um CSV."""
+    return Path(caminho_csv).with_suffix(EXTENSAO)
+
+
+class _TabelaTextos:
+    """Sequência de strings decodificadas sob demanda de um blob UTF-8."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, indice: int) -> str:
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        inicio = self._offsets[indice]
+        fim = self._offsets[indice + 1]
+        return bytes(self._blob[inicio:fim]).decode('utf-8')
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self[indice]
+
+
+def _tabela_textos(textos: Sequence[str]) -> List[bytes]:
+    """Serializa uma lista de strings em (offsets, blob)."""
+    offsets = array('Q', [0])
+    partes = []
+    total = 0
+    for texto in textos:
+        codificado = texto.encode('utf-8')
+        partes.append(codificado)
+        total += len(codificado)
+        offsets.append(total)
+    return [offsets.tobytes(), b''.join(partes)]
+
+
+def _serializar(colunas: ColunasLivros) -> List[bytes]:
+    secoes = [
+        array('d', colunas.precos).tobytes(),
+        array('b', colunas.ratings).tobytes(),
+        array('I', colunas.codigos_categoria).tobytes(),
+        array('I', colunas.codigos_disponibilidade).tobytes(),
+    ]
+    secoes += _tabela_textos(colunas.titulos)
+    secoes += _tabela_textos(colunas.categorias)
+    secoes += _tabela_textos(colunas.disponibilidades)
+    secoes.append(array('q', colunas.ids).tobytes())
+    return secoes
+
+
+def escrever_snapshot(
+    livros: Iterable[Dict[str, Any]],
+    caminho_csv: Path
+) -> Path:
+    """
+    Grava o snapshot binário dos livros ao lado do CSV já salvo.
+
+    O arquivo é escrito em um temporário e movido com `os.replace`, assim
+    processos que ainda mapeiam a versão anterior não são afetados.
+
+    Args:
+        livros (Iterable[Dict[str, Any]]): Livros no formato do CSV (uma
+                                           lista ou um `csv.DictReader`).
+        caminho_csv (Path): CSV de origem, que precisa existir.
+
+    Returns:
+        Path: O caminho do snapshot gravado.
+    """
+    caminho_csv = Path(caminho_csv)
+    info_csv = caminho_csv.stat()
+    colunas = ColunasLivros.de_linhas(livros)
+    secoes = _serializar(colunas)
+
+    inicio_dados = _CABECALHO.size + _SECAO.size * len(secoes)
+    tabela = []
+    posicao = inicio_dados
+    for secao in secoes:
+        posicao += -posicao % _ALINHAMENTO
+        tabela.append((posicao, len(secao)))
+        posicao += len(secao)
+
+    destino = caminho_snapshot(caminho_csv)
+    temporario = destino.with_name(destino.name + '.tmp')
+    with temporario.open('wb') as arquivo:
+        arquivo.write(_CABECALHO.pack(
+            MAGIC, VERSAO, _ORDEM_BYTES[sys.byteorder], len(colunas),
+            info_csv.st_size, info_csv.st_mtime_ns, len(secoes)
+        ))
+        for offset, tamanho in tabela:
+            arquivo.write(_SECAO.pack(offset, tamanho))
+        for (offset, _), secao in zip(tabela, secoes):
+            arquivo.write(b'\0' * (offset - arquivo.tell()))
+            arquivo.write(secao)
+    os.replace(temporario, destino)
+
+    logger.info(f"Snapshot binário salvo em {destino}")
+    return destino
+
+
+def abrir_snapshot(caminho_csv: Path) -> Optional[ColunasLivros]:
+    """
+    Mapeia o snapshot do CSV em memória, somente leitura.
+
+    Args:
+        caminho_csv (Path): CSV cujo snapshot deve ser aberto.
+
+    Returns:
+        Optional[ColunasLivros]: As colunas apoiadas no `mmap`, ou None se
+                                 o snapshot não existir, for de outra versão
+                                 ou estiver desatualizado em relação ao CSV.
+    """
+    caminho = caminho_snapshot(caminho_csv)
+    try:
+        info_csv = Path(caminho_csv).stat()
+        with caminho.open('rb') as arquivo:
+            mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        (magic, versao, ordem, total, tamanho_csv, mtime_csv,
+         num_secoes) = _CABECALHO.unpack_from(mapa)
+    except struct.error:
+        mapa.close()
+        return None
+    if (
+        magic != MAGIC
+        or versao != VERSAO
+        or ordem != _ORDEM_BYTES[sys.byteorder]
+        or tamanho_csv != info_csv.st_size
+        or mtime_csv != info_csv.st_mtime_ns
+    ):
+        mapa.close()
+        return None
+
+    visao = memoryview(mapa)
+    try:
+        return _colunas_do_mapa(visao, total, num_secoes)
+    except (struct.error, IndexError, TypeError, ValueError) as e:
+        logger.warning(f"Snapshot inválido em {caminho}: {e}")
+    # As views das seções morreram com o frame de `_colunas_do_mapa`;
+    # sem exportações pendentes, o mapeamento pode ser fechado já
+    visao.release()
+    mapa.close()
+    return None
+
+
+def _tabela_do_mapa(offsets: memoryview, blob: memoryview) -> _TabelaTextos:
+    """Tabela de textos sobre as seções; ValueError se os offsets saírem."""
+    if len(offsets) < 1 or offsets[0] != 0 or offsets[-1] != len(blob):
+        raise ValueError("tabela de textos inconsistente")
+    return _TabelaTextos(offsets, blob)
+
+
+def _conferir_codigos(codigos: memoryview, dicionario: List[str]) -> None:
+    if len(codigos) and max(codigos) >= len(dicionario):
+        raise ValueError("código fora do dicionário")
+
+
+def _colunas_do_mapa(
+    visao: memoryview,
+    total: int,
+    num_secoes: int
+) -> ColunasLivros:
+    """
+    Monta as colunas sobre as seções do snapshot.
+
+    Raises:
+        ValueError: Se alguma seção sair do arquivo, alguma coluna não
+                    tiver um valor por livro ou algum código não existir
+                    no dicionário correspondente.
+    """
+    if num_secoes != _NUM_SECOES:
+        raise ValueError(f"{num_secoes} seções em vez de {_NUM_SECOES}")
+    secoes = []
+    for i in range(num_secoes):
+        offset, tamanho = _SECAO.unpack_from(
+            visao, _CABECALHO.size + i * _SECAO.size
+        )
+        if offset + tamanho > len(visao):
+            raise ValueError(f"seção {i} termina depois do fim do arquivo")
+        secoes.append(visao[offset:offset + tamanho])
+
+    precos = secoes[0].cast('d')
+    ratings = secoes[1].cast('b')
+    codigos_categoria = secoes[2].cast('I')
+    codigos_disponibilidade = secoes[3].cast('I')
+    titulos = _tabela_do_mapa(secoes[4].cast('Q'), secoes[5])
+    categorias = list(_tabela_do_mapa(secoes[6].cast('Q'), secoes[7]))
+    disponibilidades = list(_tabela_do_mapa(secoes[8].cast('Q'), secoes[9]))
+    ids = secoes[10].cast('q')
+
+    por_livro = (
+        precos, ratings, codigos_categoria, codigos_disponibilidade,
+        titulos, ids,
+    )
+    if any(len(coluna) != total for coluna in por_livro):
+        raise ValueError("número de livros inconsistente com o cabeçalho")
+    _conferir_codigos(codigos_categoria, categorias)
+    _conferir_codigos(codigos_disponibilidade, disponibilidades)
+
+    return ColunasLivros(
+        titulos, precos, ratings,
+        codigos_categoria, categorias,
+        codigos_disponibilidade, disponibilidades, ids,
+    )
@@ -0,0 +1,147 @@
+"""
+Cache HTTP persistente em disco para o scraper.
+
+Cada URL vira um arquivo JSON com o corpo da resposta, os validadores
+(`ETag` e `Last-Modified`) e, opcionalmente, o resultado já extraído da
+página. Em uma nova execução a requisição sai condicional
+(`If-None-Match`/`If-Modified-Since`); se o servidor responde 304 o corpo e
+os dados extraídos vêm do disco, sem baixar nem analisar a página de novo.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class RespostaHttp:
+    """
+    Resposta de uma requisição feita pelo scraper.
+
+    Attributes:
+        url (str): A URL requisitada.
+        status_code (int): O status HTTP (200 também para hits de 304).
+        text (str): O corpo da resposta.
+        nao_modificado (bool): True se o servidor respondeu 304 e o corpo
+                               veio do cache.
+        dados (Any): Resultado extraído guardado com `gravar_dados`, se a
+                     página não mudou desde então.
+        headers (Mapping[str, str]): Cabeçalhos da resposta do servidor.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        text: str,
+        nao_modificado: bool = False,
+        dados: Any = None,
+        headers: Optional[Mapping[str, str]] = None
+    ) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.nao_modificado = nao_modificado
+        self.dados = dados
+        self.headers = headers if headers is not None else {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f"{self.status_code} ao acessar {self.url}"
+            )
+
+
+class CacheHttp:
+    """Cache de respostas por URL com requisições condicionais."""
+
+    def __init__(self, diretorio: Path) -> None:
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def _caminho(self, url: str) -> Path:
+        chave = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.diretorio / f"{chave}.json"
+
+    def ler(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada gravada para a URL, ou None."""
+        try:
+            with self._caminho(url).open('r', encoding='utf-8') as arquivo:
+                entrada = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        return entrada if entrada.get('url') == url else None
+
+    def _gravar(self, entrada: Dict[str, Any]) -> None:
+        destino = self._caminho(entrada['url'])
+        temporario = destino.with_name(
+            f"{destino.name}.{os.getpid()}.{id(entrada)}.tmp"
+        )
+        try:
+            with temporario.open('w', encoding='utf-8') as arquivo:
+                json.dump(entrada, arquivo, ensure_ascii=False)
+            os.replace(temporario, destino)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar cache de {entrada['url']}: {e}")
+
+    def gravar_dados(self, url: str, dados: Any) -> None:
+        """Guarda o resultado extraído da versão atual da página."""
+        entrada = self.ler(url)
+        if entrada is not None:
+            entrada['dados'] = dados
+            self._gravar(entrada)
+
+    def buscar(
+        self,
+        sessao: requests.Session,
+        url: str,
+        timeout: float
+    ) -> RespostaHttp:
+        """
+        Faz a requisição, condicional se a URL já estiver no cache.
+
+        Args:
+            sessao (requests.Session): A sessão de requests.
+            url (str): A URL a buscar.
+            timeout (float): Timeout da requisição em segundos.
+
+        Returns:
+            RespostaHttp: A resposta; em um 304, com corpo e dados do cache.
+        """
+        entrada = self.ler(url)
+        cabecalhos = {}
+        if entrada:
+            if entrada.get('etag'):
+                cabecalhos['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                cabecalhos['If-Modified-Since'] = entrada['last_modified']
+
+        resposta = sessao.get(url, timeout=timeout, headers=cabecalhos)
+
+        if resposta.status_code == 304 and entrada:
+            return RespostaHttp(
+                url, 200, entrada['corpo'],
+                nao_modificado=True, dados=entrada.get('dados')
+            )
+
+        if resposta.status_code == 200:
+            etag = resposta.headers.get('ETag')
+            last_modified = resposta.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._gravar({
+                    'url': url,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'corpo': resposta.text,
+                    'dados': None,
+                })
+
+        return RespostaHttp(
+            url, resposta.status_code, resposta.text,
+            headers=resposta.headers
+        )
@@ -0,0 +1,145 @@
+"""
+Gravação incremental do CSV com checkpoint para retomar extrações.
+
+As linhas de cada página vão para `books.csv.parcial` assim que a página
+fica pronta, e `books.csv.checkpoint.json` registra as páginas concluídas
+(com a URL da página seguinte de cada uma) e o tamanho do parcial naquele
+momento. Uma execução interrompida é retomada da última página concluída
+(páginas que falharam entram no fim do arquivo, depois das já gravadas);
+o `books.csv` só é substituído, de forma atômica, quando a extração
+termina sem falhas.
+"""
+import csv
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class GravadorParcial:
+    """
+    Acrescenta páginas ao CSV parcial e mantém o checkpoint.
+
+    Attributes:
+        destino (Path): O CSV final.
+        parcial (Path): O CSV em construção.
+        checkpoint (Path): O arquivo de checkpoint.
+        concluidas (Dict[str, Optional[str]]): Páginas já gravadas, com a
+                                               URL da página seguinte.
+        total (int): Linhas gravadas no parcial.
+    """
+
+    def __init__(
+        self,
+        destino: Path,
+        campos: Sequence[str],
+        identificacao: Dict[str, Any]
+    ) -> None:
+        """
+        Args:
+            destino (Path): O CSV final.
+            campos (Sequence[str]): As colunas do CSV.
+            identificacao (Dict[str, Any]): Parâmetros da extração; um
+                                            checkpoint com parâmetros
+                                            diferentes é descartado.
+        """
+        self.destino = Path(destino)
+        self.parcial = self.destino.with_name(self.destino.name + '.parcial')
+        self.checkpoint = self.destino.with_name(
+            self.destino.name + '.checkpoint.json'
+        )
+        self.concluidas: Dict[str, Optional[str]] = {}
+        self.total = 0
+        self._campos = list(campos)
+        self._identificacao = identificacao
+
+        self.destino.parent.mkdir(parents=True, exist_ok=True)
+        tamanho = self._retomar()
+        if tamanho is None:
+            self._arquivo = self.parcial.open(
+                'w', encoding='utf-8', newline=''
+            )
+            self._escritor = csv.DictWriter(self._arquivo, self._campos)
+            self._escritor.writeheader()
+        else:
+            # Descarta linhas gravadas depois do último checkpoint
+            with self.parcial.open('r+b') as arquivo:
+                arquivo.truncate(tamanho)
+            self._arquivo = self.parcial.open(
+                'a', encoding='utf-8', newline=''
+            )
+            self._escritor = csv.DictWriter(self._arquivo, self._campos)
+
+    def _retomar(self) -> Optional[int]:
+        """Carrega o checkpoint válido; devolve o tamanho do parcial."""
+        try:
+            with self.checkpoint.open('r', encoding='utf-8') as arquivo:
+                estado = json.load(arquivo)
+            tamanho = self.parcial.stat().st_size
+        except (OSError, ValueError):
+            return None
+
+        if (
+            estado.get('identificacao') != self._identificacao
+            or estado.get('campos') != self._campos
+            or estado.get('tamanho', 0) > tamanho
+        ):
+            logger.info("Checkpoint de outra extração descartado.")
+            return None
+
+        self.concluidas = estado.get('paginas', {})
+        self.total = estado.get('total', 0)
+        logger.info(
+            f"Retomando extração: {len(self.concluidas)} páginas e "
+            f"{self.total} livros já gravados."
+        )
+        return estado['tamanho']
+
+    def gravar_pagina(self, pagina: Dict[str, Any]) -> None:
+        """
+        Acrescenta os livros da página ao parcial e atualiza o checkpoint.
+
+        Args:
+            pagina (Dict[str, Any]): Página de `extrair_paginas`.
+        """
+        self._escritor.writerows(pagina['livros'])
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+        self.total += len(pagina['livros'])
+        self.concluidas[pagina['url']] = pagina['proxima']
+        estado = {
+            'identificacao': self._identificacao,
+            'campos': self._campos,
+            'paginas': self.concluidas,
+            'total': self.total,
+            'tamanho': os.fstat(self._arquivo.fileno()).st_size,
+        }
+        temporario = self.checkpoint.with_name(self.checkpoint.name + '.tmp')
+        with temporario.open('w', encoding='utf-8') as arquivo:
+            json.dump(estado, arquivo)
+        os.replace(temporario, self.checkpoint)
+
+    def fechar(self) -> None:
+        """Fecha o parcial mantendo o checkpoint (execução interrompida)."""
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+    def concluir(self) -> bool:
+        """
+        Publica o parcial como CSV final e remove o checkpoint.
+
+        Returns:
+            bool: False se nenhum livro foi gravado (o CSV final é mantido).
+        """
+        self.fechar()
+        if self.total:
+            os.replace(self.parcial, self.destino)
+        else:
+            logger.warning("Nenhum dado para salvar.")
+            self.parcial.unlink()
+        self.checkpoint.unlink(missing_ok=True)
+        return bool(self.total)
@@ -0,0 +1,199 @@
+"""
+Controle de tráfego do scraper: taxa, concorrência e novas tentativas.
+
+Todas as requisições passam por um `LimitadorTaxa`, que combina:
+
+- um balde de tokens global (taxa máxima de requisições por segundo, já
+  reduzida pelo `Crawl-delay`/`Request-rate` do robots.txt);
+- um limite de requisições simultâneas ajustado por AIMD: cresce uma
+  unidade a cada rodada de respostas rápidas e cai pela metade quando o
+  servidor responde 429/5xx, a conexão falha ou a latência dispara;
+- pausas globais pedidas pelo servidor via `Retry-After`.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+from urllib.robotparser import RobotFileParser
+
+# Respostas que indicam sobrecarga temporária e merecem nova tentativa
+STATUS_TRANSITORIOS = frozenset({429, 500, 502, 503, 504})
+ESPERA_BASE_RETRY = 0.5
+ESPERA_MAXIMA_RETRY = 60.0
+# Latência média acima deste múltiplo da referência conta como sobrecarga
+FATOR_LATENCIA = 2.0
+_PESO_LATENCIA = 0.2
+
+
+def taxa_permitida(
+    robots: Optional[RobotFileParser],
+    requisicoes_por_segundo: float,
+    agente: str = '*'
+) -> float:
+    """
+    Taxa efetiva: a configurada, limitada pelo que o robots.txt pede.
+
+    Args:
+        robots (Optional[RobotFileParser]): O robots.txt do site.
+        requisicoes_por_segundo (float): A taxa configurada (0 = sem limite).
+        agente (str): O user-agent consultado no robots.txt.
+
+    Returns:
+        float: Requisições por segundo (0 = sem limite).
+    """
+    limites = []
+    if requisicoes_por_segundo > 0:
+        limites.append(requisicoes_por_segundo)
+    if robots:
+        atraso = robots.crawl_delay(agente)
+        if atraso:
+            limites.append(1.0 / float(atraso))
+        taxa = robots.request_rate(agente)
+        if taxa and taxa.requests and taxa.seconds:
+            limites.append(taxa.requests / taxa.seconds)
+    return min(limites) if limites else 0.0
+
+
+def espera_retry(tentativa: int, retry_after: Optional[str] = None) -> float:
+    """
+    Segundos até a próxima tentativa.
+
+    Usa o `Retry-After` do servidor quando houver (em segundos ou data
+    HTTP); senão, backoff exponencial com jitter completo, para que
+    threads que falharam juntas não tentem de novo juntas.
+
+    Args:
+        tentativa (int): Quantas tentativas já falharam (a partir de 0).
+        retry_after (Optional[str]): O cabeçalho `Retry-After`.
+
+    Returns:
+        float: A espera em segundos.
+    """
+    if retry_after:
+        try:
+            espera = float(retry_after)
+        except ValueError:
+            try:
+                espera = parsedate_to_datetime(retry_after).timestamp() - (
+                    time.time()
+                )
+            except (TypeError, ValueError):
+                espera = None
+        if espera is not None:
+            return min(max(espera, 0.0), ESPERA_MAXIMA_RETRY)
+    teto = min(ESPERA_MAXIMA_RETRY, ESPERA_BASE_RETRY * 2 ** tentativa)
+    return random.uniform(0, teto)
+
+
+class LimitadorTaxa:
+    """
+    Limite global de taxa e de concorrência, compartilhado entre threads.
+
+    A taxa é um balde de tokens no formato GCRA: cada chamada a `aguardar`
+    reserva o próximo horário livre, permitindo rajadas de até `rajada`
+    requisições. A concorrência é um semáforo cujo tamanho (`limite`) é
+    ajustado por AIMD a partir das respostas registradas.
+    """
+
+    def __init__(
+        self,
+        requisicoes_por_segundo: float,
+        concorrencia_maxima: Optional[int] = None,
+        rajada: int = 1
+    ) -> None:
+        self._intervalo = (
+            1.0 / requisicoes_por_segundo if requisicoes_por_segundo > 0
+            else 0.0
+        )
+        self._folga = self._intervalo * (max(1, rajada) - 1)
+        self._trava = threading.Lock()
+        self._proximo_horario = 0.0
+
+        self.maximo = concorrencia_maxima
+        self.limite = concorrencia_maxima
+        self._condicao = threading.Condition()
+        self._em_uso = 0
+        self._sucessos = 0
+        # Permite o primeiro corte sem esperar uma rodada completa
+        self._desde_corte = concorrencia_maxima or 0
+        self._latencia_media: Optional[float] = None
+        self._latencia_referencia: Optional[float] = None
+
+    def aguardar(self) -> None:
+        """Bloqueia até que a próxima requisição possa ser feita."""
+        with self._trava:
+            agora = time.monotonic()
+            horario = max(agora - self._folga, self._proximo_horario)
+            self._proximo_horario = horario + self._intervalo
+        espera = horario - agora
+        if espera > 0:
+            time.sleep(espera)
+
+    def pausar(self, segundos: float) -> None:
+        """Adia todas as próximas requisições (ex.: `Retry-After`)."""
+        with self._trava:
+            self._proximo_horario = max(
+                self._proximo_horario, time.monotonic() + segundos
+            )
+
+    @contextmanager
+    def vaga(self) -> Iterator[None]:
+        """Ocupa uma das `limite` vagas de requisição simultânea."""
+        if self.maximo is None:
+            yield
+            return
+        with self._condicao:
+            while self._em_uso >= self.limite:
+                self._condicao.wait()
+            self._em_uso += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._em_uso -= 1
+                self._condicao.notify_all()
+
+    def registrar_sucesso(self, latencia: float) -> None:
+        """Resposta normal: aumento aditivo, salvo se a latência disparou."""
+        if self.maximo is None:
+            return
+        with self._condicao:
+            self._desde_corte += 1
+            media = self._latencia_media
+            media = latencia if media is None else (
+                (1 - _PESO_LATENCIA) * media + _PESO_LATENCIA * latencia
+            )
+            self._latencia_media = media
+            referencia = self._latencia_referencia
+            if referencia is None or media < referencia:
+                self._latencia_referencia = media
+            elif media > FATOR_LATENCIA * referencia:
+                if self._reduzir():
+                    # Nova referência: só corta de novo se piorar outra vez
+                    self._latencia_referencia = media
+                return
+
+            self._sucessos += 1
+            if self._sucessos >= self.limite and self.limite < self.maximo:
+                self.limite += 1
+                self._sucessos = 0
+                self._condicao.notify_all()
+
+    def registrar_sobrecarga(self) -> None:
+        """429/5xx ou falha de conexão: redução multiplicativa."""
+        if self.maximo is None:
+            return
+        with self._condicao:
+            self._reduzir()
+
+    def _reduzir(self) -> bool:
+        # No máximo um corte por rodada, para que as respostas das
+        # requisições já em voo não derrubem o limite várias vezes
+        if self._desde_corte < self.limite:
+            return False
+        self.limite = max(1, self.limite // 2)
+        self._desde_corte = 0
+        self._sucessos = 0
+        return True
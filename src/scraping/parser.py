@@ -0,0 +1,217 @@
+"""
+Camada de análise de HTML do scraper.
+
+As páginas do Books to Scrape trazem cabeçalho, estilos, descrição e
+rodapé que o scraper nunca lê. Antes de analisar, o HTML é recortado a partir
+do primeiro trecho usado (o breadcrumb nos detalhes, a barra lateral ou a
+lista de livros nas listagens) e a árvore fica restrita às subárvores usadas
+(via `SoupStrainer`). O `lxml` é usado quando estiver instalado, caindo no
+`html.parser` da biblioteca padrão caso contrário.
+
+Benchmark só de análise (sem rede), comparando com a análise completa:
+
+    python src/scraping/parser.py [pagina.html ...] [--repeticoes N]
+"""
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    BACKEND = 'lxml'
+except ImportError:
+    BACKEND = 'html.parser'
+
+# Listagens: livros, cabeçalho da categoria, paginação e índice lateral
+_FILTRO_LISTAGEM = SoupStrainer(
+    class_=['product_pod', 'page-header', 'pager', 'side_categories']
+)
+# Detalhes: só o breadcrumb, de onde sai a categoria
+_FILTRO_DETALHE = SoupStrainer('ul', class_='breadcrumb')
+
+_INICIOS_LISTAGEM = (
+    '<div class="side_categories"',
+    '<div class="page-header',
+    '<article class="product_pod"',
+)
+_INICIO_DETALHE = '<ul class="breadcrumb"'
+_FIM_DETALHE = '</ul>'
+
+
+def _recortar(html: str, inicios: Tuple[str, ...], fim: str = '') -> str:
+    """
+    Trecho do HTML a partir do primeiro marcador encontrado.
+
+    Se nenhum marcador aparece (layout diferente do esperado), devolve o
+    HTML inteiro, e a análise continua correta, só que sem o ganho.
+    """
+    posicoes = [p for p in (html.find(inicio) for inicio in inicios) if p >= 0]
+    if not posicoes:
+        return html
+    inicio = min(posicoes)
+    final = html.find(fim, inicio) if fim else -1
+    return html[inicio:final + len(fim)] if final >= 0 else html[inicio:]
+
+
+def analisar_listagem(html: str) -> BeautifulSoup:
+    """
+    Analisa uma página de listagem mantendo só as partes lidas.
+
+    O resultado responde aos seletores `article.product_pod`,
+    `div.page-header h1`, `li.next a` e `div.side_categories ...`.
+
+    Args:
+        html (str): O HTML da página.
+
+    Returns:
+        BeautifulSoup: A árvore restrita.
+    """
+    return BeautifulSoup(
+        _recortar(html, _INICIOS_LISTAGEM), BACKEND,
+        parse_only=_FILTRO_LISTAGEM
+    )
+
+
+def analisar_detalhe(html: str) -> BeautifulSoup:
+    """
+    Analisa uma página de detalhes mantendo só o breadcrumb.
+
+    Args:
+        html (str): O HTML da página.
+
+    Returns:
+        BeautifulSoup: A árvore com `ul.breadcrumb`.
+    """
+    return BeautifulSoup(
+        _recortar(html, (_INICIO_DETALHE,), _FIM_DETALHE), BACKEND,
+        parse_only=_FILTRO_DETALHE
+    )
+
+
+def _analisar_completo(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _listagem_exemplo() -> str:
+    """Listagem sintética com o formato e o tamanho das do site."""
+    livro = (
+        '<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">'
+        '<article class="product_pod"><div class="image_container">'
+        '<a href="a-light-in-the-attic_1000/index.html"><img '
+        'src="../media/cache/2c/da/2cdad67c.jpg" alt="A Light in the Attic" '
+        'class="thumbnail"></a></div><p class="star-rating Three">'
+        '<i class="icon-star"></i><i class="icon-star"></i></p>'
+        '<h3><a href="a-light-in-the-attic_1000/index.html" '
+        'title="A Light in the Attic">A Light in the ...</a></h3>'
+        '<div class="product_price"><p class="price_color">£51.77</p>'
+        '<p class="instock availability"><i class="icon-ok"></i> In stock'
+        '</p><form><button type="submit" class="btn btn-primary btn-block">'
+        'Add to basket</button></form></div></article></li>'
+    )
+    categorias = ''.join(
+        f'<li><a href="category/books/c_{i}/index.html">Categoria {i}</a>'
+        '</li>'
+        for i in range(50)
+    )
+    return (
+        '<html><head>' + '<link rel="stylesheet" href="x.css">' * 10
+        + '<script>var x = 1;</script>' * 5 + '</head><body>'
+        + '<header><div class="row">' + '<a href="#">menu</a>' * 20
+        + '</div></header><div class="side_categories"><ul><li>'
+        '<a href="category/books_1/index.html">Books</a><ul>'
+        + categorias + '</ul></li></ul></div>'
+        '<div class="page-header"><h1>All products</h1></div><ol class="row">'
+        + livro * 20 + '</ol><ul class="pager"><li class="current">'
+        'Page 1 of 50</li><li class="next"><a href="page-2.html">next</a>'
+        '</li></ul><footer>' + '<p>rodapé</p>' * 20 + '</footer>'
+        '</body></html>'
+    )
+
+
+def _detalhe_exemplo() -> str:
+    """Página de detalhes sintética com o formato das do site."""
+    linhas = ''.join(
+        f'<tr><th>Campo {i}</th><td>valor {i}</td></tr>' for i in range(7)
+    )
+    return (
+        '<html><head>' + '<link rel="stylesheet" href="x.css">' * 10
+        + '<script>var x = 1;</script>' * 5 + '</head><body>'
+        + '<header><div class="row">' + '<a href="#">menu</a>' * 20
+        + '</div></header><ul class="breadcrumb"><li><a href="../../index'
+        '.html">Home</a></li><li><a href="../category/books_1/index.html">'
+        'Books</a></li><li><a href="../category/books/poetry_23/index.html">'
+        'Poetry</a></li><li class="active">A Light in the Attic</li></ul>'
+        '<article class="product_page"><div class="row"><img src="a.jpg">'
+        '<h1>A Light in the Attic</h1><p class="price_color">£51.77</p>'
+        '</div><div id="product_description" class="sub-header"><h2>'
+        'Product Description</h2></div>'
+        + '<p>' + 'Lorem ipsum dolor sit amet. ' * 60 + '</p>'
+        + '<table class="table table-striped">' + linhas + '</table>'
+        '</article><footer>' + '<p>rodapé</p>' * 20 + '</footer>'
+        '</body></html>'
+    )
+
+
+def medir_analise(
+    paginas: List[str],
+    analisar: Callable[[str], BeautifulSoup],
+    repeticoes: int = 50
+) -> Dict[str, float]:
+    """
+    Mede o tempo médio de CPU da análise por página, sem rede.
+
+    Args:
+        paginas (List[str]): HTMLs das páginas a analisar.
+        analisar (Callable[[str], BeautifulSoup]): A análise restrita
+                                                   (`analisar_listagem` ou
+                                                   `analisar_detalhe`).
+        repeticoes (int): Quantas vezes analisar cada página.
+
+    Returns:
+        Dict[str, float]: Milissegundos por página da análise completa com
+                          `html.parser` e da análise restrita.
+    """
+    def medir(funcao: Callable[[str], BeautifulSoup]) -> float:
+        inicio = time.process_time()
+        for _ in range(repeticoes):
+            for html in paginas:
+                funcao(html)
+        return (time.process_time() - inicio) * 1000 / (
+            repeticoes * len(paginas)
+        )
+
+    return {
+        'completo (html.parser)': medir(_analisar_completo),
+        f'restrito ({BACKEND})': medir(analisar),
+    }
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    repeticoes = 50
+    if '--repeticoes' in argumentos:
+        posicao = argumentos.index('--repeticoes')
+        repeticoes = int(argumentos[posicao + 1])
+        del argumentos[posicao:posicao + 2]
+
+    # Páginas com livros são listagens; as demais, páginas de detalhes
+    htmls = [
+        Path(arquivo).read_text(encoding='utf-8') for arquivo in argumentos
+    ]
+    listagens = [h for h in htmls if 'product_pod' in h]
+    detalhes = [h for h in htmls if 'product_pod' not in h]
+    if not htmls:
+        listagens, detalhes = [_listagem_exemplo()], [_detalhe_exemplo()]
+
+    for tipo, paginas, analisar in (
+        ('listagem', listagens, analisar_listagem),
+        ('detalhe', detalhes, analisar_detalhe),
+    ):
+        if not paginas:
+            continue
+        print(f"{tipo} ({len(paginas)} páginas, {repeticoes} repetições):")
+        for nome, ms in medir_analise(paginas, analisar, repeticoes).items():
+            print(f"  {nome:>24}: {ms:.2f} ms de CPU por página")
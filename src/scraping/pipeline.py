@@ -1,24 +1,139 @@
 # Pipeline completo: extrai dados e salva em CSV
-from scraping.scraper import extrair_livros, salvar_csv
+import logging
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urljoin
 
+import requests
 
-def executar_pipeline():
+from core import config
+from scraping.checkpoint import GravadorParcial
+from scraping.scraper import (
+    CAMPOS_CSV,
+    carregar_livros_anteriores,
+    extrair_paginas,
+    livro_inalterado,
+    salvar_snapshot_do_csv,
+)
+
+logger = logging.getLogger(__name__)
+TIMEOUT_AQUECIMENTO = 30
+
+
+def avisar_api() -> int:
+    """
+    Pede à API em API_WARMUP_BASE_URL as respostas quentes.
+
+    Cada worker que recebe uma dessas requisições percebe a nova versão dos
+    dados e recalcula as respostas de API_WARMUP_URLS em segundo plano; as
+    próprias requisições já deixam as respectivas respostas em cache.
+
+    Returns:
+        int: Quantas requisições responderam 200.
+    """
+    base = config.API_WARMUP_BASE_URL
+    if not base:
+        return 0
+    aquecidas = 0
+    with requests.Session() as sessao:
+        for caminho in config.API_WARMUP_URLS:
+            url = urljoin(base, caminho)
+            try:
+                resposta = sessao.get(url, timeout=TIMEOUT_AQUECIMENTO)
+            except requests.RequestException as erro:
+                logger.warning(f"Não foi possível aquecer {url}: {erro}")
+                continue
+            aquecidas += resposta.status_code == 200
+    return aquecidas
+
+
+def executar_pipeline(
+    incremental: Optional[bool] = None,
+    arquivo: str = str(config.CSV_FILE)
+) -> bool:
     """
     Executa todo o processo de coleta de dados:
-    1. Extrai os livros do site
-    2. Salva em CSV
+    1. Extrai os livros do site, página a página
+    2. Grava cada página no CSV parcial assim que ela fica pronta
+    3. Publica o CSV (e o snapshot binário lido pela API)
+
+    As páginas chegam de `extrair_paginas` em fluxo, então a memória não
+    cresce com o tamanho do catálogo. Se a execução for interrompida ou
+    alguma página falhar, o `books.csv` anterior é mantido e a próxima
+    execução retoma a partir do checkpoint.
+
+    No modo incremental (padrão: SCRAPER_INCREMENTAL) o CSV anterior é
+    carregado e só os livros novos ou com listagem alterada têm a página
+    de detalhes buscada; os demais reaproveitam a categoria já conhecida.
+
+    Returns:
+        bool: True se o CSV foi publicado.
     """
+    if incremental is None:
+        incremental = config.SCRAPER_INCREMENTAL
+    modo = config.SCRAPER_CRAWL_MODE
+
     print("=== INICIANDO PIPELINE DE DADOS ===")
 
-    # Passo 1: Extrai os dados
-    print("\n[1/2] Extraindo dados do site...")
-    livros = extrair_livros()
+    anteriores = carregar_livros_anteriores(arquivo) if incremental else None
+    gravador = GravadorParcial(
+        Path(arquivo), CAMPOS_CSV, {'modo': modo, 'site': config.SITE_URL}
+    )
+    if gravador.concluidas:
+        print(
+            f"Retomando: {len(gravador.concluidas)} páginas já gravadas "
+            f"({gravador.total} livros)."
+        )
+
+    # Passos 1 e 2: Extrai e grava página a página
+    print("\n[1/2] Extraindo e gravando dados do site...")
+    falhas = []
+    novos = reaproveitados = 0
+    try:
+        for pagina in extrair_paginas(
+            modo=modo,
+            anteriores=anteriores,
+            concluidas=dict(gravador.concluidas)
+        ):
+            if 'erro' in pagina:
+                falhas.append(pagina['url'])
+                continue
+            gravador.gravar_pagina(pagina)
+            if anteriores is not None:
+                inalterados = sum(
+                    1 for livro in pagina['livros']
+                    if livro_inalterado(livro, anteriores.get(livro['url']))
+                )
+                reaproveitados += inalterados
+                novos += len(pagina['livros']) - inalterados
+    except requests.RequestException as erro:
+        falhas.append(f"{config.SITE_URL} ({erro})")
+    finally:
+        gravador.fechar()
+
+    if falhas:
+        print(
+            f"\nExtração incompleta ({len(falhas)} páginas com erro). "
+            "O CSV anterior foi mantido; execute novamente para retomar."
+        )
+        return False
+
+    if anteriores is not None:
+        print(
+            f"Incremental: {novos} livros novos ou alterados, "
+            f"{reaproveitados} reaproveitados."
+        )
 
-    # Passo 2: Salva em CSV
-    print("\n[2/2] Salvando dados...")
-    salvar_csv(livros)
+    # Passo 3: Publica o CSV e o snapshot
+    print("\n[2/2] Publicando dados...")
+    if not gravador.concluir():
+        return False
+    salvar_snapshot_do_csv(arquivo)
+    if config.API_WARMUP_BASE_URL:
+        print(f"API aquecida: {avisar_api()} respostas recalculadas.")
 
     print("\n=== PIPELINE CONCLUÍDO COM SUCESSO ===")
+    return True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+"""
+Gravação e reprodução local do site para medir o scraper sem rede.
+
+Três comandos:
+
+    # grava as páginas de uma extração real em um corpus local
+    python src/scraping/replay.py gravar data/corpus --modo categorias
+
+    # serve o corpus como um site, com latência e erros injetados
+    python src/scraping/replay.py servir data/corpus --latencia 0.05
+
+    # extrai do corpus servido localmente e mede a vazão
+    python src/scraping/replay.py benchmark data/corpus --erros 0.02
+
+O corpus guarda cada página no caminho da URL (`catalogue/page-1.html`,
+...). O servidor responde com `ETag` (e 304 para `If-None-Match`), e os
+erros injetados são 503 com `Retry-After: 0`, que exercitam as novas
+tentativas e o ajuste de concorrência do scraper.
+"""
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import unquote, urljoin, urlsplit
+
+import requests
+
+caminho_src = Path(__file__).resolve().parents[1]
+if str(caminho_src) not in sys.path:
+    sys.path.insert(0, str(caminho_src))
+
+from core import config  # noqa: E402
+from scraping import scraper  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _caminho_no_corpus(corpus: Path, caminho_url: str) -> Path:
+    """Arquivo do corpus para o caminho de uma URL."""
+    relativo = unquote(caminho_url).lstrip('/')
+    if not relativo or relativo.endswith('/'):
+        relativo += 'index.html'
+    destino = (corpus / relativo).resolve()
+    if corpus.resolve() not in destino.parents:
+        raise ValueError(f"Caminho fora do corpus: {caminho_url}")
+    return destino
+
+
+class SessaoGravadora:
+    """
+    Sessão que grava no corpus toda página baixada com sucesso.
+
+    Envolve uma `requests.Session` e expõe o mesmo `get` usado pelo
+    scraper.
+    """
+
+    def __init__(self, sessao: requests.Session, corpus: Path) -> None:
+        self._sessao = sessao
+        self.corpus = Path(corpus)
+        self.gravadas = 0
+        self._trava = threading.Lock()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        resposta = self._sessao.get(url, **kwargs)
+        if resposta.status_code == 200:
+            destino = _caminho_no_corpus(self.corpus, urlsplit(url).path)
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            destino.write_bytes(resposta.content)
+            with self._trava:
+                self.gravadas += 1
+        return resposta
+
+
+class _SessaoContadora:
+    """Conta requisições e páginas baixadas com sucesso."""
+
+    def __init__(self, sessao: requests.Session) -> None:
+        self._sessao = sessao
+        self.requisicoes = 0
+        self.paginas = 0
+        self._trava = threading.Lock()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        resposta = self._sessao.get(url, **kwargs)
+        with self._trava:
+            self.requisicoes += 1
+            if resposta.status_code == 200:
+                self.paginas += 1
+        return resposta
+
+
+def gravar_corpus(
+    corpus: Path,
+    modo: Optional[str] = None,
+    max_paginas: Optional[int] = None
+) -> int:
+    """
+    Faz uma extração real de SITE_URL gravando as páginas no corpus.
+
+    O cache HTTP fica desligado durante a gravação, para que toda página
+    venha com corpo.
+
+    Returns:
+        int: Número de páginas gravadas.
+    """
+    cache_anterior = config.SCRAPER_HTTP_CACHE_DIR
+    config.SCRAPER_HTTP_CACHE_DIR = ''
+    try:
+        concorrencia = config.SCRAPER_CONCURRENCY
+        sessao = SessaoGravadora(scraper._criar_sessao(concorrencia), corpus)
+        robots = urljoin(config.SITE_URL.rstrip('/') + '/', 'robots.txt')
+        try:
+            sessao.get(robots, timeout=scraper.TIMEOUT_REQUISICAO)
+        except requests.RequestException as erro:
+            logger.warning(f"robots.txt não gravado: {erro}")
+        scraper.extrair_livros(max_paginas, modo=modo, sessao=sessao)
+    finally:
+        config.SCRAPER_HTTP_CACHE_DIR = cache_anterior
+    return sessao.gravadas
+
+
+class ServidorReplay(ThreadingHTTPServer):
+    """
+    Servidor HTTP que reproduz um corpus gravado.
+
+    Attributes:
+        corpus (Path): Diretório do corpus.
+        latencia (float): Segundos de espera antes de cada resposta.
+        taxa_erros (float): Fração de respostas trocadas por 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        corpus: Path,
+        latencia: float = 0.0,
+        taxa_erros: float = 0.0,
+        porta: int = 0,
+        semente: Optional[int] = None
+    ) -> None:
+        super().__init__(('127.0.0.1', porta), _ManipuladorReplay)
+        self.corpus = Path(corpus)
+        self.latencia = latencia
+        self.taxa_erros = taxa_erros
+        self._aleatorio = random.Random(semente)
+        self._trava = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def sortear_erro(self) -> bool:
+        with self._trava:
+            return self._aleatorio.random() < self.taxa_erros
+
+
+class _ManipuladorReplay(BaseHTTPRequestHandler):
+    server: ServidorReplay
+
+    def do_GET(self) -> None:
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+        if self.server.sortear_erro():
+            self._responder(503, b'', {'Retry-After': '0'})
+            return
+
+        try:
+            arquivo = _caminho_no_corpus(
+                self.server.corpus, urlsplit(self.path).path
+            )
+            corpo = arquivo.read_bytes()
+        except (OSError, ValueError):
+            self._responder(404, b'')
+            return
+
+        etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self._responder(304, b'', {'ETag': etag})
+            return
+        self._responder(200, corpo, {
+            'ETag': etag,
+            'Content-Type': 'text/html; charset=utf-8',
+        })
+
+    def _responder(
+        self,
+        status: int,
+        corpo: bytes,
+        cabecalhos: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        pass
+
+
+def _servir_em_processo(
+    corpus: str,
+    latencia: float,
+    taxa_erros: float,
+    conexao: Any
+) -> None:
+    """Alvo do processo do servidor; envia a URL pela conexão."""
+    servidor = ServidorReplay(Path(corpus), latencia, taxa_erros)
+    conexao.send(servidor.url)
+    servidor.serve_forever()
+
+
+def _cpu_total() -> float:
+    """CPU deste processo e dos filhos já encerrados (pool de análise)."""
+    cpu = time.process_time()
+    if resource is not None:
+        filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += filhos.ru_utime + filhos.ru_stime
+    return cpu
+
+
+def executar_benchmark(
+    corpus: Path,
+    latencia: float = 0.0,
+    taxa_erros: float = 0.0,
+    modo: Optional[str] = None,
+    max_paginas: Optional[int] = None,
+    concorrencia: Optional[int] = None,
+    processos_analise: Optional[int] = None,
+    requisicoes_por_segundo: float = 0.0
+) -> Dict[str, float]:
+    """
+    Extrai do corpus servido localmente e mede a vazão do scraper.
+
+    O servidor roda em outro processo, para que a CPU medida seja só a do
+    scraper. O cache HTTP fica desligado e a taxa, salvo se informada,
+    sem limite.
+
+    Returns:
+        Dict[str, float]: Livros, páginas (respostas 200), requisições,
+                          segundos, páginas/s, requisições/s e
+                          milissegundos de CPU por página.
+    """
+    contexto = multiprocessing.get_context('spawn')
+    recebe, envia = contexto.Pipe(duplex=False)
+    servidor = contexto.Process(
+        target=_servir_em_processo,
+        args=(str(corpus), latencia, taxa_erros, envia),
+        daemon=True
+    )
+    servidor.start()
+
+    anteriores = (
+        config.SITE_URL,
+        config.SCRAPER_HTTP_CACHE_DIR,
+        config.SCRAPER_MAX_REQUESTS_PER_SECOND,
+    )
+    try:
+        config.SITE_URL = recebe.recv()
+        config.SCRAPER_HTTP_CACHE_DIR = ''
+        config.SCRAPER_MAX_REQUESTS_PER_SECOND = requisicoes_por_segundo
+
+        sessao = _SessaoContadora(scraper._criar_sessao(
+            concorrencia or config.SCRAPER_CONCURRENCY
+        ))
+        livros = 0
+        cpu_inicial = _cpu_total()
+        inicio = time.perf_counter()
+        for pagina in scraper.extrair_paginas(
+            max_paginas,
+            concorrencia,
+            modo,
+            processos_analise=processos_analise,
+            sessao=sessao
+        ):
+            livros += len(pagina.get('livros', []))
+        segundos = time.perf_counter() - inicio
+        cpu = _cpu_total() - cpu_inicial
+    finally:
+        (
+            config.SITE_URL,
+            config.SCRAPER_HTTP_CACHE_DIR,
+            config.SCRAPER_MAX_REQUESTS_PER_SECOND,
+        ) = anteriores
+        servidor.terminate()
+        servidor.join()
+
+    return {
+        'livros': livros,
+        'paginas': sessao.paginas,
+        'requisicoes': sessao.requisicoes,
+        'segundos': round(segundos, 3),
+        'paginas_por_segundo': round(sessao.paginas / segundos, 1),
+        'requisicoes_por_segundo': round(sessao.requisicoes / segundos, 1),
+        'cpu_ms_por_pagina': round(
+            cpu * 1000 / max(1, sessao.paginas), 2
+        ),
+    }
+
+
+def _argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    gravar = comandos.add_parser('gravar', help='grava o site no corpus')
+    servir = comandos.add_parser('servir', help='serve o corpus')
+    benchmark = comandos.add_parser('benchmark', help='mede o scraper')
+    for sub in (gravar, servir, benchmark):
+        sub.add_argument('corpus', type=Path)
+    for sub in (gravar, benchmark):
+        sub.add_argument('--modo', choices=(
+            scraper.MODO_DETALHES, scraper.MODO_CATEGORIAS
+        ))
+        sub.add_argument('--paginas', type=int)
+    for sub in (servir, benchmark):
+        sub.add_argument('--latencia', type=float, default=0.0)
+        sub.add_argument('--erros', type=float, default=0.0)
+    servir.add_argument('--porta', type=int, default=8765)
+    benchmark.add_argument('--concorrencia', type=int)
+    benchmark.add_argument('--processos', type=int)
+    benchmark.add_argument('--rps', type=float, default=0.0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    argumentos = _argumentos()
+
+    if argumentos.comando == 'gravar':
+        total = gravar_corpus(
+            argumentos.corpus, argumentos.modo, argumentos.paginas
+        )
+        print(f"{total} páginas gravadas em {argumentos.corpus}")
+
+    elif argumentos.comando == 'servir':
+        servidor = ServidorReplay(
+            argumentos.corpus, argumentos.latencia, argumentos.erros,
+            argumentos.porta
+        )
+        print(f"Servindo {argumentos.corpus} em {servidor.url}")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    else:
+        resultado = executar_benchmark(
+            argumentos.corpus,
+            latencia=argumentos.latencia,
+            taxa_erros=argumentos.erros,
+            modo=argumentos.modo,
+            max_paginas=argumentos.paginas,
+            concorrencia=argumentos.concorrencia,
+            processos_analise=argumentos.processos,
+            requisicoes_por_segundo=argumentos.rps,
+        )
+        for nome, valor in resultado.items():
+            print(f"{nome:>24}: {valor}")
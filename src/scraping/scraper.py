@@ -2,16 +2,31 @@
 Módulo para extração de dados de livros do site Books to Scrape.
 """
 import csv
+import hashlib
 import logging
+import multiprocessing
+import queue
+import re
 import sys
+import threading
 import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Callable
 from urllib.parse import urljoin
 from urllib.robotparser import RobotFileParser
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
 # Ajusta o path para permitir importar o módulo de configurações
 # Idealmente, este script deve ser executado como um módulo
@@ -22,18 +37,43 @@ if str(caminho_src) not in sys.path:
 
 from core import config  # noqa: E402
 from core.logging_config import setup_logging  # noqa: E402
+from core.snapshot import escrever_snapshot  # noqa: E402
+from scraping.cache_http import CacheHttp, RespostaHttp  # noqa: E402
+from scraping.limitador import (  # noqa: E402
+    STATUS_TRANSITORIOS,
+    LimitadorTaxa,
+    espera_retry,
+    taxa_permitida,
+)
+from scraping.parser import analisar_detalhe, analisar_listagem  # noqa: E402
 
 # Inicializa o logging
 setup_logging(log_level="INFO")
 logger = logging.getLogger(__name__)
 
 # Constantes
-MAX_PAGINAS = 5
 TIMEOUT_REQUISICAO = 10
-SEGUNDOS_PAUSA = 1
+MODO_DETALHES = 'detalhes'
+MODO_CATEGORIAS = 'categorias'
 MAPEAMENTO_RATING = {
     'Zero': 0, 'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5
 }
+# Campos da listagem que, se mudarem, fazem o livro ser enriquecido de novo
+CAMPOS_LISTAGEM = ('title', 'price', 'availability', 'rating')
+CAMPOS_CSV = ('id',) + CAMPOS_LISTAGEM + ('category', 'url')
+# Páginas em trânsito entre duas etapas do pipeline de extração
+TAMANHO_FILA = 4
+_ESPERA_FILA = 0.1
+_FIM = object()
+_LINK_PROXIMA = re.compile(r'<li class="next">\s*<a href="([^"]+)"')
+_PAGINA_ATUAL = re.compile(
+    r'<li class="current">\s*Page\s+(\d+)\s+of\s+(\d+)', re.IGNORECASE
+)
+_NUMERO_PAGINA = re.compile(r'page-(\d+)\.html$')
+# Detalhes no formato `catalogue/<slug>_<número>/index.html`
+_NUMERO_LIVRO = re.compile(r'_(\d+)/(?:index\.html)?$')
+# IDs derivados de hash ficam acima dos números do site (e abaixo de 2^53)
+_BASE_ID_HASH = 1 << 48
 
 
 def _carregar_robots(url_base: str) -> Optional[RobotFileParser]:
@@ -58,24 +98,228 @@ def _carregar_robots(url_base: str) -> Optional[RobotFileParser]:
         return None
 
 
-def _processar_pagina(
+def _criar_sessao(concorrencia: int = 1) -> requests.Session:
+    """
+    Cria a sessão HTTP com pool de conexões do tamanho da concorrência.
+
+    O pool tem uma conexão a mais que a concorrência, para a etapa que
+    baixa as listagens enquanto os detalhes são buscados.
+
+    Args:
+        concorrencia (int): Número de requisições simultâneas esperadas.
+
+    Returns:
+        requests.Session: A sessão configurada.
+    """
+    sessao = requests.Session()
+    sessao.headers['User-Agent'] = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/91.0.4472.124 Safari/537.36"
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=max(1, concorrencia) + 1,
+        pool_maxsize=max(1, concorrencia) + 1
+    )
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+
+def _requisitar(
+    sessao: requests.Session,
+    url: str,
+    limitador: Optional[LimitadorTaxa] = None,
+    cache: Optional[CacheHttp] = None
+) -> RespostaHttp:
+    """
+    Faz um GET respeitando o limitador e, se houver, o cache HTTP.
+
+    Falhas de conexão e respostas 429/5xx são tentadas de novo até
+    SCRAPER_MAX_RETRIES vezes, com backoff exponencial e jitter (ou o
+    `Retry-After` do servidor, que pausa todo o limitador). Cada resultado
+    alimenta o ajuste de concorrência do limitador.
+
+    Args:
+        sessao (requests.Session): A sessão de requests.
+        url (str): A URL a buscar.
+        limitador (Optional[LimitadorTaxa]): Limite global de taxa e
+                                             concorrência.
+        cache (Optional[CacheHttp]): Cache para requisições condicionais.
+
+    Returns:
+        RespostaHttp: A resposta (com `dados` do cache em um 304); depois
+                      da última tentativa, a própria resposta de erro.
+
+    Raises:
+        requests.RequestException: Se a conexão falhar em todas as
+                                   tentativas.
+    """
+    tentativa = 0
+    while True:
+        try:
+            # A vaga vem antes do horário: quem está na fila só marca o
+            # horário ao entrar, já vendo as pausas pedidas pelo servidor
+            with limitador.vaga() if limitador else nullcontext():
+                if limitador:
+                    limitador.aguardar()
+                inicio = time.monotonic()
+                if cache:
+                    resposta = cache.buscar(sessao, url, TIMEOUT_REQUISICAO)
+                else:
+                    bruta = sessao.get(url, timeout=TIMEOUT_REQUISICAO)
+                    resposta = RespostaHttp(
+                        url, bruta.status_code, bruta.text,
+                        headers=bruta.headers
+                    )
+                transitorio = resposta.status_code in STATUS_TRANSITORIOS
+                retry_after = resposta.headers.get('Retry-After')
+                if transitorio and retry_after and limitador:
+                    # Pausa antes de liberar a vaga
+                    limitador.pausar(espera_retry(tentativa, retry_after))
+        except (requests.ConnectionError, requests.Timeout):
+            if limitador:
+                limitador.registrar_sobrecarga()
+            if tentativa >= config.SCRAPER_MAX_RETRIES:
+                raise
+            espera = espera_retry(tentativa)
+        else:
+            if limitador:
+                if transitorio:
+                    limitador.registrar_sobrecarga()
+                else:
+                    limitador.registrar_sucesso(time.monotonic() - inicio)
+            if not transitorio or tentativa >= config.SCRAPER_MAX_RETRIES:
+                return resposta
+            espera = espera_retry(tentativa, retry_after)
+
+        tentativa += 1
+        logger.warning(
+            f"Tentativa {tentativa} de {url} falhou; "
+            f"nova tentativa em {espera:.1f}s."
+        )
+        time.sleep(espera)
+
+
+def _categoria_do_detalhe(html: str) -> str:
+    """
+    Lê a categoria do breadcrumb de uma página de detalhes.
+
+    Não depende de estado do processo, então pode rodar em um worker de
+    `ProcessPoolExecutor` (ver SCRAPER_PARSE_WORKERS).
+
+    Args:
+        html (str): O HTML da página de detalhes.
+
+    Returns:
+        str: A categoria, ou string vazia se o breadcrumb não a trouxer.
+    """
+    breadcrumb_anchors = analisar_detalhe(html).select('ul.breadcrumb li a')
+    if len(breadcrumb_anchors) >= 3:
+        return breadcrumb_anchors[-1].text.strip()
+    if len(breadcrumb_anchors) > 1:
+        return breadcrumb_anchors[1].text.strip()
+    return ''
+
+
+def _buscar_categoria(
+    detalhe_url: str,
+    session: requests.Session,
+    limitador: Optional[LimitadorTaxa] = None,
+    cache: Optional[CacheHttp] = None,
+    processos: Optional[ProcessPoolExecutor] = None
+) -> str:
+    """
+    Baixa a página de detalhes de um livro e lê a categoria do breadcrumb.
+
+    Args:
+        detalhe_url (str): URL absoluta da página de detalhes.
+        session (requests.Session): A sessão de requests.
+        limitador (Optional[LimitadorTaxa]): Limite global de taxa.
+        cache (Optional[CacheHttp]): Cache HTTP; em um 304 a categoria
+                                     já extraída é reaproveitada.
+        processos (Optional[ProcessPoolExecutor]): Pool que analisa o HTML
+                                     fora do GIL; sem ele, a análise roda
+                                     na própria thread.
+
+    Returns:
+        str: A categoria, ou string vazia se não for possível obtê-la.
+    """
+    try:
+        detalhe = _requisitar(session, detalhe_url, limitador, cache)
+        if detalhe.dados is not None:
+            return detalhe.dados
+        if detalhe.status_code == 200:
+            if processos is None:
+                categoria = _categoria_do_detalhe(detalhe.text)
+            else:
+                categoria = processos.submit(
+                    _categoria_do_detalhe, detalhe.text
+                ).result()
+            if cache and categoria:
+                cache.gravar_dados(detalhe_url, categoria)
+            return categoria
+    except Exception as e:
+        logger.debug(f"Falha ao buscar categoria em {detalhe_url}: {e}")
+    return ''
+
+
+def livro_inalterado(
+    livro: Dict[str, Any],
+    anterior: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Indica se a listagem de um livro é igual à da extração anterior.
+
+    Args:
+        livro (Dict[str, Any]): O livro lido da listagem atual.
+        anterior (Optional[Dict[str, Any]]): O mesmo livro (pela URL de
+                                             detalhes) no dataset anterior.
+
+    Returns:
+        bool: True se os campos da listagem não mudaram e a categoria
+              anterior pode ser reaproveitada.
+    """
+    return bool(anterior and anterior.get('category')) and all(
+        livro[campo] == anterior.get(campo) for campo in CAMPOS_LISTAGEM
+    )
+
+
+def id_livro(url: str, titulo: str = '') -> int:
+    """
+    ID estável de um livro, que não depende da ordem da extração.
+
+    Usa o número que o site atribui ao livro na URL de detalhes; sem ele,
+    um hash de 48 bits da URL (ou do título, se não houver URL).
+
+    Args:
+        url (str): A URL de detalhes do livro.
+        titulo (str): O título, usado só quando não há URL.
+
+    Returns:
+        int: O ID do livro.
+    """
+    numero = _NUMERO_LIVRO.search(url)
+    if numero:
+        return int(numero.group(1))
+    resumo = hashlib.sha1((url or titulo).encode('utf-8')).hexdigest()
+    return _BASE_ID_HASH | int(resumo[:12], 16)
+
+
+def _ler_livros(
     soup: BeautifulSoup,
-    base_url: Optional[str] = None,
-    session: Optional[requests.Session] = None
+    base_url: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
-    Extrai dados dos livros de uma página HTML analisada.
+    Lê os livros de uma página de listagem analisada.
 
     Args:
         soup (BeautifulSoup): O conteúdo HTML analisado.
         base_url (Optional[str]): A URL da página atual
                                   (para resolver links relativos).
-        session (Optional[requests.Session]): A sessão de requests
-                                              para buscar detalhes.
 
     Returns:
-        List[Dict[str, Any]]: Uma lista de dicionários contendo
-                              dados dos livros.
+        List[Dict[str, Any]]: Os livros, ainda sem categoria.
     """
     itens = []
     produtos = soup.select('article.product_pod')
@@ -108,42 +352,22 @@ def _processar_pagina(
                 classe_rating = 'Zero'
             rating = MAPEAMENTO_RATING.get(classe_rating, 0)
 
-            # Opcional: Buscar categoria da página de detalhes
-            categoria = ''
             link_rel = (
                 livro.h3.a.get('href') if livro.h3 and livro.h3.a else ''
             )
-
-            if base_url and session and link_rel:
-                try:
-                    detalhe_url = urljoin(base_url, link_rel)
-                    # Usa um timeout curto para detalhes para não atrasar muito
-                    detalhe = session.get(
-                        detalhe_url, timeout=TIMEOUT_REQUISICAO
-                    )
-                    if detalhe.status_code == 200:
-                        detalhe_soup = BeautifulSoup(
-                            detalhe.text, 'html.parser'
-                        )
-                        breadcrumb_anchors = detalhe_soup.select(
-                            'ul.breadcrumb li a'
-                        )
-                        if len(breadcrumb_anchors) >= 3:
-                            categoria = breadcrumb_anchors[-1].text.strip()
-                        elif len(breadcrumb_anchors) > 1:
-                            categoria = breadcrumb_anchors[1].text.strip()
-                except Exception as e:
-                    logger.debug(
-                        f"Falha ao buscar categoria para '{titulo}': {e}"
-                    )
-
-            itens.append({
+            detalhe_url = (
+                urljoin(base_url, link_rel) if base_url and link_rel else ''
+            )
+            item = {
+                'id': id_livro(detalhe_url, titulo),
                 'title': titulo,
                 'price': preco,
                 'availability': disponibilidade,
                 'rating': rating,
-                'category': categoria
-            })
+                'category': '',
+                'url': detalhe_url
+            }
+            itens.append(item)
 
         except Exception as e:
             logger.error(f"Erro ao processar item do livro: {e}")
@@ -152,67 +376,739 @@ def _processar_pagina(
     return itens
 
 
-def extrair_livros(
-    max_paginas: int = MAX_PAGINAS
-) -> List[Dict[str, Any]]:
+def _detalhes_pendentes(
+    itens: List[Dict[str, Any]],
+    anteriores: Optional[Dict[str, Dict[str, Any]]] = None
+) -> List[Tuple[int, str]]:
     """
-    Percorre as páginas do site e extrai dados dos livros.
+    Livros que ainda precisam da categoria da página de detalhes.
+
+    Livros presentes em `anteriores` com a mesma listagem recebem a
+    categoria anterior e ficam de fora.
 
     Args:
-        max_paginas (int): O número máximo de páginas para percorrer.
+        itens (List[Dict[str, Any]]): Os livros lidos da listagem.
+        anteriores (Optional[Dict[str, Dict[str, Any]]]): Livros da
+                                   extração anterior indexados pela URL
+                                   de detalhes.
 
     Returns:
-        List[Dict[str, Any]]: Uma lista de todos os livros extraídos.
+        List[Tuple[int, str]]: Pares (índice, URL de detalhes).
+    """
+    detalhes_pendentes = []
+    for indice, item in enumerate(itens):
+        anterior = anteriores.get(item['url']) if anteriores else None
+        if livro_inalterado(item, anterior):
+            item['category'] = anterior['category']
+        elif item['url']:
+            detalhes_pendentes.append((indice, item['url']))
+    return detalhes_pendentes
+
+
+def _extrair_listagem(
+    html: str,
+    base_url: str
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Analisa o HTML de uma listagem e devolve só dados simples.
+
+    Não depende de estado do processo, então pode rodar em um worker de
+    `ProcessPoolExecutor` (ver SCRAPER_PARSE_WORKERS).
+
+    Args:
+        html (str): O HTML da página.
+        base_url (str): A URL da página.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: Os livros e o nome da
+            categoria do cabeçalho da página, se houver.
+    """
+    soup = analisar_listagem(html)
+    cabecalho = soup.select_one('div.page-header h1')
+    return (
+        _ler_livros(soup, base_url),
+        cabecalho.text.strip() if cabecalho else None
+    )
+
+
+def _enriquecer(
+    itens: List[Dict[str, Any]],
+    detalhes_pendentes: List[Tuple[int, str]],
+    session: requests.Session,
+    executor: Optional[Executor] = None,
+    limitador: Optional[LimitadorTaxa] = None,
+    cache: Optional[CacheHttp] = None,
+    processos: Optional[ProcessPoolExecutor] = None
+) -> None:
+    """
+    Preenche a categoria dos livros pendentes a partir dos detalhes.
+
+    Os detalhes são buscados em paralelo se um `executor` for informado,
+    ou em sequência caso contrário; com `processos`, o HTML de cada um é
+    analisado no pool de processos.
+    """
+    if not detalhes_pendentes:
+        return
+    urls = [url for _, url in detalhes_pendentes]
+
+    def buscar(url: str) -> str:
+        return _buscar_categoria(url, session, limitador, cache, processos)
+
+    if executor:
+        categorias = executor.map(buscar, urls)
+    else:
+        categorias = (buscar(url) for url in urls)
+    for (indice, _), categoria in zip(detalhes_pendentes, categorias):
+        itens[indice]['category'] = categoria
+
+
+def _baixar_pagina(
+    sessao: requests.Session,
+    url: str,
+    limitador: Optional[LimitadorTaxa] = None,
+    cache: Optional[CacheHttp] = None
+) -> RespostaHttp:
+    """
+    Baixa uma página de listagem.
+
+    Se `dados` vier preenchido (304 com resultado em cache), a página não
+    precisa ser analisada de novo.
+
+    Raises:
+        requests.RequestException: Se a requisição falhar.
+    """
+    resposta = _requisitar(sessao, url, limitador, cache)
+    resposta.raise_for_status()
+    return resposta
+
+
+def _listar_categorias(
+    soup: BeautifulSoup,
+    base_url: str
+) -> List[Tuple[str, str]]:
+    """
+    Lê o índice de categorias da barra lateral da página inicial.
+
+    Returns:
+        List[Tuple[str, str]]: Pares (nome da categoria, URL da listagem).
+    """
+    categorias = []
+    for link in soup.select('div.side_categories ul li ul li a'):
+        href = link.get('href')
+        if href:
+            categorias.append((link.text.strip(), urljoin(base_url, href)))
+    return categorias
+
+
+def _proxima_pagina(html: str, url_pagina: str) -> Optional[str]:
+    """URL absoluta do link 'next' da paginação, lida sem analisar o HTML."""
+    encontrado = _LINK_PROXIMA.search(html)
+    return urljoin(url_pagina, encontrado.group(1)) if encontrado else None
+
+
+def _paginas_seguintes(
+    html: str,
+    proxima: Optional[str],
+    limite: Optional[int]
+) -> Optional[List[str]]:
+    """
+    Todas as páginas depois desta, deduzidas da paginação.
+
+    Lê "Page K of N" e, se o link 'next' seguir o padrão `page-{K+1}.html`,
+    monta as URLs das páginas K+1 até N (ou até `limite`), que podem então
+    ser baixadas em paralelo sem seguir os links uma a uma.
+
+    Args:
+        html (str): O HTML da página K.
+        proxima (Optional[str]): A URL absoluta do link 'next'.
+        limite (Optional[int]): O número da última página a incluir.
+
+    Returns:
+        Optional[List[str]]: As URLs em ordem, ou None se a paginação não
+                             seguir o padrão (a sequência segue link a
+                             link).
+    """
+    encontrado = _PAGINA_ATUAL.search(html)
+    numero = _NUMERO_PAGINA.search(proxima) if proxima else None
+    if not encontrado or not numero:
+        return None
+    atual, total = int(encontrado.group(1)), int(encontrado.group(2))
+    if int(numero.group(1)) != atual + 1:
+        return None
+    if limite is not None:
+        total = min(total, limite)
+    prefixo = proxima[:numero.start()]
+    return [
+        f'{prefixo}page-{indice}.html'
+        for indice in range(atual + 1, total + 1)
+    ]
+
+
+def _inicios_catalogo(
+    url_base: str,
+    max_paginas: Optional[int]
+) -> Iterator[Tuple[str, Optional[str], Optional[int]]]:
+    """O catálogo geral: uma sequência de até `max_paginas` páginas."""
+    yield urljoin(url_base, 'catalogue/page-1.html'), None, max_paginas
+
+
+def _inicios_categorias(
+    url_base: str,
+    sessao: requests.Session,
+    limitador: LimitadorTaxa,
+    cache: Optional[CacheHttp]
+) -> Iterator[Tuple[str, Optional[str], Optional[int]]]:
+    """
+    A primeira página de cada categoria do índice do site.
+
+    Cada livro de uma listagem recebe a categoria da própria listagem, sem
+    baixar a página de detalhes. Só quando o nome da categoria não pode ser
+    lido (nem do cabeçalho da listagem nem do link do índice) os livros
+    daquela página caem na busca de detalhes.
+    """
+    url_inicial = urljoin(url_base, 'index.html')
+    resposta = _baixar_pagina(sessao, url_inicial, limitador, cache)
+    if resposta.dados is not None:
+        categorias = [tuple(par) for par in resposta.dados]
+    else:
+        categorias = _listar_categorias(
+            analisar_listagem(resposta.text), url_base
+        )
+        if cache:
+            cache.gravar_dados(url_inicial, categorias)
+    logger.info(f"Encontradas {len(categorias)} categorias no índice.")
+
+    for nome, url_categoria in categorias:
+        yield url_categoria, nome, None
+
+
+def _colocar(fila: queue.Queue, item: Any, parar: threading.Event) -> bool:
+    """Põe o item na fila limitada, desistindo se o pipeline parar."""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=_ESPERA_FILA)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _retirar(fila: queue.Queue, parar: threading.Event) -> Any:
+    """Retira o próximo item da fila (ou `_FIM` se o pipeline parar)."""
+    while not parar.is_set():
+        try:
+            return fila.get(timeout=_ESPERA_FILA)
+        except queue.Empty:
+            continue
+    return _FIM
+
+
+def _etapa_busca(
+    inicios: Iterator[Tuple[str, Optional[str], Optional[int]]],
+    sessao: requests.Session,
+    robots: Optional[RobotFileParser],
+    limitador: LimitadorTaxa,
+    cache: Optional[CacheHttp],
+    concluidas: Dict[str, Optional[str]],
+    saida: queue.Queue,
+    parar: threading.Event,
+    executor: Optional[Executor] = None,
+    janela: int = 1
+) -> None:
+    """
+    Primeira etapa: baixa as páginas de listagem, seguindo a paginação.
+
+    A primeira página de cada sequência informa o total ("Page 1 of N");
+    as demais são então baixadas em paralelo no `executor`, com até
+    `janela` páginas (e as primeiras das sequências seguintes) em trânsito,
+    sempre sob o limitador. Sem o total, a sequência segue link a link. As
+    páginas saem na ordem do site.
+
+    Páginas em `concluidas` (de um checkpoint) não são baixadas de novo; o
+    checkpoint guarda a URL da página seguinte de cada uma. Páginas que o
+    robots.txt não permite nem entram na fila (e nunca chegam ao
+    `executor`); uma sequência encadeada para nelas. Uma falha de
+    requisição é repassada adiante como `{'url': ..., 'erro': ...}`; se a
+    página seguinte ainda não era conhecida, a sequência para ali.
+    """
+    # Páginas em ordem: [url, categoria, número, limite, futuro, encadeada]
+    # `encadeada`: a página seguinte sai do link desta (não foi deduzida)
+    pendentes: deque = deque()
+    inicios = iter(inicios)
+    restam_inicios = True
+
+    def baixar(url: str) -> RespostaHttp:
+        return _baixar_pagina(sessao, url, limitador, cache)
+
+    def permitida(url: str) -> bool:
+        if url in concluidas or not robots or robots.can_fetch('*', url):
+            return True
+        logger.warning(f"Pulando {url} (não permitido por robots.txt)")
+        return False
+
+    def disparar() -> None:
+        """Completa a fila de pendentes e dispara os downloads da janela."""
+        nonlocal restam_inicios
+        while restam_inicios and len(pendentes) < janela:
+            try:
+                url, categoria, limite = next(inicios)
+            except StopIteration:
+                restam_inicios = False
+            else:
+                if permitida(url):
+                    pendentes.append([url, categoria, 1, limite, None, True])
+        if executor is None:
+            return
+        for item in islice(pendentes, janela):
+            if item[4] is None and item[0] not in concluidas:
+                item[4] = executor.submit(baixar, item[0])
+
+    try:
+        while not parar.is_set():
+            disparar()
+            if not pendentes:
+                break
+            url_pagina, categoria, numero, limite, futuro, encadeada = (
+                pendentes.popleft()
+            )
+            seguinte = None
+            if url_pagina in concluidas:
+                if encadeada:
+                    seguinte = concluidas[url_pagina]
+            else:
+                try:
+                    resposta = futuro.result() if futuro else baixar(
+                        url_pagina
+                    )
+                except requests.RequestException as erro:
+                    logger.error(f"Erro ao acessar {url_pagina}: {erro}")
+                    if not _colocar(
+                        saida, {'url': url_pagina, 'erro': str(erro)}, parar
+                    ):
+                        return
+                    continue
+
+                proxima = _proxima_pagina(resposta.text, url_pagina)
+                pagina = {
+                    'url': url_pagina,
+                    'proxima': proxima,
+                    'categoria': categoria,
+                    'resposta': resposta,
+                }
+                if not _colocar(saida, pagina, parar):
+                    return
+                if encadeada:
+                    demais = _paginas_seguintes(resposta.text, proxima, limite)
+                    if demais is None:
+                        seguinte = proxima
+                    else:
+                        pendentes.extendleft(reversed([
+                            [url, categoria, numero + 1 + i, limite, None,
+                             False]
+                            for i, url in enumerate(demais)
+                            if permitida(url)
+                        ]))
+
+            if (
+                seguinte and (limite is None or numero < limite)
+                and permitida(seguinte)
+            ):
+                pendentes.appendleft(
+                    [seguinte, categoria, numero + 1, limite, None, True]
+                )
+    except Exception as erro:
+        _colocar(saida, erro, parar)
+    finally:
+        for item in pendentes:
+            if item[4]:
+                item[4].cancel()
+        _colocar(saida, _FIM, parar)
+
+
+def _etapa(
+    processar: Callable[[Dict[str, Any]], None],
+    entrada: queue.Queue,
+    saida: queue.Queue,
+    parar: threading.Event
+) -> None:
+    """
+    Etapa intermediária: aplica `processar` a cada página, em ordem.
+
+    Falhas de página e exceções de etapas anteriores passam adiante sem
+    processamento; a fila de saída limitada segura a etapa quando a
+    seguinte está atrasada.
     """
+    try:
+        while True:
+            pagina = _retirar(entrada, parar)
+            if pagina is _FIM:
+                break
+            if not isinstance(pagina, Exception) and 'erro' not in pagina:
+                processar(pagina)
+            if not _colocar(saida, pagina, parar):
+                break
+    except Exception as erro:
+        _colocar(saida, erro, parar)
+    finally:
+        _colocar(saida, _FIM, parar)
+
+
+def _iniciar_analise(
+    pagina: Dict[str, Any],
+    anteriores: Optional[Dict[str, Dict[str, Any]]],
+    processos: Optional[ProcessPoolExecutor]
+) -> Optional[Future]:
+    """
+    Começa a análise da página: no pool de processos, se houver, ou aqui.
+
+    Returns:
+        Optional[Future]: A análise em andamento no pool, ou None se a
+                          página já ficou pronta (inclusive pelo cache).
+    """
+    resposta = pagina.pop('resposta')
+    if resposta.dados is not None:
+        for livro in resposta.dados:
+            # Páginas guardadas antes dos IDs estáveis
+            livro.setdefault('id', id_livro(livro['url'], livro['title']))
+        pagina.update(livros=resposta.dados, pendentes=[], cacheado=True)
+        return None
+    if processos is None:
+        _concluir_analise(
+            pagina, _extrair_listagem(resposta.text, pagina['url']),
+            anteriores
+        )
+        return None
+    return processos.submit(_extrair_listagem, resposta.text, pagina['url'])
+
+
+def _concluir_analise(
+    pagina: Dict[str, Any],
+    resultado: Tuple[List[Dict[str, Any]], Optional[str]],
+    anteriores: Optional[Dict[str, Dict[str, Any]]]
+) -> None:
+    """Atribui a categoria da listagem ou marca os detalhes pendentes."""
+    livros, cabecalho = resultado
+    categoria = pagina['categoria']
+    if categoria is not None and cabecalho:
+        categoria = cabecalho
+    if categoria:
+        for livro in livros:
+            livro['category'] = categoria
+        pendentes = []
+    else:
+        pendentes = _detalhes_pendentes(livros, anteriores)
+    pagina.update(livros=livros, pendentes=pendentes, cacheado=False)
+
+
+def _etapa_analise(
+    entrada: queue.Queue,
+    saida: queue.Queue,
+    parar: threading.Event,
+    anteriores: Optional[Dict[str, Dict[str, Any]]],
+    processos: Optional[ProcessPoolExecutor],
+    janela: int
+) -> None:
+    """
+    Segunda etapa: lê os livros das listagens (ou os do cache HTTP).
+
+    Com um pool de processos, até `janela` páginas ficam em análise ao
+    mesmo tempo; elas seguem adiante na ordem em que chegaram.
+    """
+    em_analise = deque()
+
+    def entregar_pronta() -> bool:
+        pagina, futuro = em_analise.popleft()
+        if futuro is not None:
+            _concluir_analise(pagina, futuro.result(), anteriores)
+        return _colocar(saida, pagina, parar)
+
+    def primeira_pronta() -> bool:
+        futuro = em_analise[0][1]
+        return futuro is None or futuro.done()
+
+    try:
+        while not parar.is_set():
+            try:
+                pagina = entrada.get(timeout=_ESPERA_FILA)
+            except queue.Empty:
+                pagina = None
+            if pagina is _FIM:
+                break
+            if pagina is not None:
+                futuro = None
+                if not isinstance(pagina, Exception) and 'erro' not in pagina:
+                    futuro = _iniciar_analise(pagina, anteriores, processos)
+                em_analise.append((pagina, futuro))
+            while em_analise and (
+                len(em_analise) > janela or primeira_pronta()
+            ):
+                if not entregar_pronta():
+                    return
+        while em_analise and not parar.is_set():
+            if not entregar_pronta():
+                return
+    except Exception as erro:
+        _colocar(saida, erro, parar)
+    finally:
+        _colocar(saida, _FIM, parar)
+
+
+def _enriquecer_pagina(
+    pagina: Dict[str, Any],
+    sessao: requests.Session,
+    executor: Optional[Executor],
+    limitador: LimitadorTaxa,
+    cache: Optional[CacheHttp],
+    processos: Optional[ProcessPoolExecutor] = None
+) -> None:
+    """Terceira etapa: busca as categorias pendentes nos detalhes."""
+    _enriquecer(
+        pagina['livros'], pagina.pop('pendentes'),
+        sessao, executor, limitador, cache, processos
+    )
+    # Só reaproveita páginas cujas categorias vieram completas
+    if cache and not pagina.pop('cacheado') and all(
+        livro['category'] for livro in pagina['livros']
+    ):
+        cache.gravar_dados(pagina['url'], pagina['livros'])
+
+
+def extrair_paginas(
+    max_paginas: Optional[int] = None,
+    concorrencia: Optional[int] = None,
+    modo: Optional[str] = None,
+    anteriores: Optional[Dict[str, Dict[str, Any]]] = None,
+    concluidas: Optional[Dict[str, Optional[str]]] = None,
+    processos_analise: Optional[int] = None,
+    sessao: Optional[requests.Session] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Extrai o site como um fluxo de páginas de listagem já enriquecidas.
+
+    O trabalho é dividido em etapas (busca -> análise -> enriquecimento),
+    cada uma em sua thread (o HTML das listagens e dos detalhes
+    opcionalmente analisado em processos) e
+    ligadas por filas de tamanho TAMANHO_FILA: a
+    página N+1 é baixada e analisada enquanto os detalhes da página N são
+    buscados, e uma etapa lenta segura as anteriores em vez de acumular
+    páginas em memória. O consumidor recebe as páginas na ordem do site.
+
+    Args:
+        max_paginas (Optional[int]): O número máximo de páginas do
+                              catálogo geral (só no modo 'detalhes'); 0
+                              percorre todas as páginas anunciadas na
+                              paginação (padrão: SCRAPER_MAX_PAGES).
+        concorrencia (Optional[int]): Máximo de páginas de detalhes
+                                      buscadas ao mesmo tempo
+                                      (padrão: SCRAPER_CONCURRENCY).
+        modo (Optional[str]): 'detalhes' percorre o catálogo geral e busca
+                              a categoria na página de cada livro;
+                              'categorias' percorre as listagens de todas
+                              as categorias, uma requisição por página de
+                              listagem (padrão: SCRAPER_CRAWL_MODE).
+        anteriores (Optional[Dict[str, Dict[str, Any]]]): Dataset anterior
+                              (ver `carregar_livros_anteriores`); livros
+                              com a mesma listagem não têm o detalhe
+                              buscado de novo.
+        concluidas (Optional[Dict[str, Optional[str]]]): Páginas já
+                              gravadas por uma execução interrompida, com
+                              a URL da página seguinte de cada uma.
+        processos_analise (Optional[int]): Workers de um
+                              `ProcessPoolExecutor` para analisar o HTML
+                              das listagens e das páginas de detalhes
+                              fora do GIL; 0 analisa na própria thread
+                              (padrão: SCRAPER_PARSE_WORKERS).
+        sessao (Optional[requests.Session]): Sessão HTTP a usar (ex.: a
+                              gravadora de `scraping.replay`); por padrão
+                              uma criada com `_criar_sessao`.
+
+    Yields:
+        Dict[str, Any]: `{'url', 'proxima', 'livros'}` por página, ou
+                        `{'url', 'erro'}` se a página não pôde ser baixada.
+
+    Raises:
+        requests.RequestException: Se o índice de categorias não puder
+                                   ser baixado.
+    """
+    if concorrencia is None:
+        concorrencia = config.SCRAPER_CONCURRENCY
+    concorrencia = max(1, concorrencia)
+    modo = modo or config.SCRAPER_CRAWL_MODE
+    if processos_analise is None:
+        processos_analise = config.SCRAPER_PARSE_WORKERS
+    if max_paginas is None:
+        max_paginas = config.SCRAPER_MAX_PAGES
+
     url_base = config.SITE_URL.rstrip('/') + '/'
-    sessao = requests.Session()
-    sessao.headers['User-Agent'] = (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/91.0.4472.124 Safari/537.36"
+    if sessao is None:
+        sessao = _criar_sessao(concorrencia)
+    cache = (
+        CacheHttp(Path(config.SCRAPER_HTTP_CACHE_DIR))
+        if config.SCRAPER_HTTP_CACHE_DIR else None
     )
 
     robots = _carregar_robots(url_base)
-    livros = []
+    taxa = taxa_permitida(robots, config.SCRAPER_MAX_REQUESTS_PER_SECOND)
+    # +1: as listagens também ocupam vagas enquanto os detalhes são buscados
+    limitador = LimitadorTaxa(taxa, concorrencia + 1)
 
     logger.info(
-        f"Iniciando extração de {url_base} por {max_paginas} páginas."
+        f"Iniciando extração de {url_base} no modo '{modo}' "
+        f"(concorrência até {concorrencia}, "
+        f"{f'{taxa:g} req/s' if taxa else 'sem limite de taxa'})."
     )
 
-    for pagina in range(1, max_paginas + 1):
-        url_pagina = urljoin(url_base, f"catalogue/page-{pagina}.html")
+    if modo == MODO_CATEGORIAS:
+        inicios = _inicios_categorias(url_base, sessao, limitador, cache)
+    else:
+        inicios = _inicios_catalogo(url_base, max_paginas or None)
 
-        if robots and not robots.can_fetch('*', url_pagina):
-            logger.warning(
-                f"Pulando {url_pagina} (não permitido por robots.txt)"
-            )
-            continue
+    executor = (
+        ThreadPoolExecutor(max_workers=concorrencia)
+        if concorrencia > 1 else None
+    )
+    buscas = (
+        ThreadPoolExecutor(
+            max_workers=concorrencia, thread_name_prefix='scraper-listagem'
+        )
+        if concorrencia > 1 else None
+    )
+    # 'spawn': as etapas já são threads, e fork com threads ativas é frágil
+    processos = (
+        ProcessPoolExecutor(
+            max_workers=processos_analise,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        if processos_analise > 0 else None
+    )
+    filas = [queue.Queue(maxsize=TAMANHO_FILA) for _ in range(3)]
+    parar = threading.Event()
+    etapas = [
+        threading.Thread(
+            target=_etapa_busca,
+            args=(
+                inicios, sessao, robots, limitador, cache,
+                concluidas or {}, filas[0], parar, buscas, concorrencia
+            ),
+            name='scraper-busca', daemon=True
+        ),
+        threading.Thread(
+            target=_etapa_analise,
+            args=(
+                filas[0], filas[1], parar, anteriores, processos,
+                2 * max(1, processos_analise)
+            ),
+            name='scraper-analise', daemon=True
+        ),
+        threading.Thread(
+            target=_etapa,
+            args=(
+                lambda pagina: _enriquecer_pagina(
+                    pagina, sessao, executor, limitador, cache, processos
+                ),
+                filas[1], filas[2], parar
+            ),
+            name='scraper-enriquecimento', daemon=True
+        ),
+    ]
+    for etapa in etapas:
+        etapa.start()
 
-        try:
-            logger.info(f"Extraindo página {pagina}: {url_pagina}")
-            resposta = sessao.get(url_pagina, timeout=TIMEOUT_REQUISICAO)
-            resposta.raise_for_status()
+    try:
+        while True:
+            pagina = _retirar(filas[2], parar)
+            if pagina is _FIM:
+                break
+            if isinstance(pagina, Exception):
+                raise pagina
+            if 'erro' not in pagina:
+                del pagina['categoria']
+                logger.info(
+                    f"Encontrados {len(pagina['livros'])} livros em "
+                    f"{pagina['url']}."
+                )
+            yield pagina
+    finally:
+        parar.set()
+        for etapa in etapas:
+            etapa.join()
+        if executor:
+            executor.shutdown()
+        if buscas:
+            buscas.shutdown(cancel_futures=True)
+        if processos:
+            processos.shutdown(cancel_futures=True)
 
-            soup = BeautifulSoup(resposta.text, 'html.parser')
-            novos_livros = _processar_pagina(soup, url_pagina, sessao)
-            livros.extend(novos_livros)
 
-            logger.info(
-                f"Encontrados {len(novos_livros)} livros na página {pagina}."
-            )
+def extrair_livros(
+    max_paginas: Optional[int] = None,
+    concorrencia: Optional[int] = None,
+    modo: Optional[str] = None,
+    anteriores: Optional[Dict[str, Dict[str, Any]]] = None,
+    sessao: Optional[requests.Session] = None
+) -> List[Dict[str, Any]]:
+    """
+    Percorre as páginas do site e extrai dados dos livros.
 
-            time.sleep(SEGUNDOS_PAUSA)
+    Junta em uma lista as páginas de `extrair_paginas`, que documenta os
+    argumentos; páginas que não puderam ser baixadas são ignoradas.
 
-        except requests.RequestException as erro:
-            logger.error(f"Erro ao acessar {url_pagina}: {erro}")
-            # Decide se para ou continua.
-            # Parar pode ser mais seguro se o site estiver fora do ar.
-            break
+    Returns:
+        List[Dict[str, Any]]: Uma lista de todos os livros extraídos.
+    """
+    livros = []
+    try:
+        for pagina in extrair_paginas(
+            max_paginas, concorrencia, modo, anteriores, sessao=sessao
+        ):
+            livros.extend(pagina.get('livros', []))
+    except requests.RequestException as erro:
+        logger.error(f"Erro ao acessar {config.SITE_URL}: {erro}")
+        livros = []
 
     logger.info(f"Total de livros extraídos: {len(livros)}")
     return livros
 
 
+def carregar_livros_anteriores(
+    arquivo: str = str(config.CSV_FILE)
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Lê o CSV de uma extração anterior, indexado pela URL de detalhes.
+
+    CSVs antigos, sem a coluna `url`, resultam em um dicionário vazio (a
+    extração volta a ser completa).
+
+    Args:
+        arquivo (str): O caminho do CSV anterior.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Livros por URL de detalhes.
+    """
+    caminho = Path(arquivo)
+    if not caminho.exists():
+        return {}
+
+    anteriores = {}
+    try:
+        with caminho.open('r', encoding='utf-8', newline='') as arquivo_csv:
+            for linha in csv.DictReader(arquivo_csv):
+                if not linha.get('url'):
+                    continue
+                try:
+                    linha['price'] = float(linha.get('price') or 0)
+                    linha['rating'] = int(linha.get('rating') or 0)
+                except ValueError:
+                    continue
+                anteriores[linha['url']] = linha
+    except (IOError, csv.Error) as e:
+        logger.error(f"Erro ao ler CSV anterior: {e}")
+        return {}
+
+    logger.info(f"{len(anteriores)} livros carregados da extração anterior.")
+    return anteriores
+
+
 def salvar_csv(
     livros: List[Dict[str, Any]],
     arquivo: str = str(config.CSV_FILE)
@@ -244,6 +1140,48 @@ def salvar_csv(
         logger.error(f"Erro ao salvar CSV: {e}")
 
 
+def salvar_snapshot(
+    livros: List[Dict[str, Any]],
+    arquivo: str = str(config.CSV_FILE)
+) -> None:
+    """
+    Salva o snapshot binário (mapeável pela API) ao lado do CSV.
+
+    Deve ser chamado depois de `salvar_csv`, pois o snapshot registra o
+    tamanho e o mtime do CSV correspondente.
+
+    Args:
+        livros (List[Dict[str, Any]]): A lista de livros para salvar.
+        arquivo (str): O caminho do CSV já salvo.
+    """
+    if not livros:
+        return
+
+    try:
+        escrever_snapshot(livros, Path(arquivo))
+    except OSError as e:
+        logger.error(f"Erro ao salvar snapshot binário: {e}")
+
+
+def salvar_snapshot_do_csv(arquivo: str = str(config.CSV_FILE)) -> None:
+    """
+    Gera o snapshot binário lendo o CSV salvo em streaming.
+
+    Usado pelo pipeline, que grava o CSV página a página e não mantém a
+    lista de livros em memória.
+
+    Args:
+        arquivo (str): O caminho do CSV já salvo.
+    """
+    caminho = Path(arquivo)
+    try:
+        with caminho.open('r', encoding='utf-8', newline='') as arquivo_csv:
+            escrever_snapshot(csv.DictReader(arquivo_csv), caminho)
+    except OSError as e:
+        logger.error(f"Erro ao salvar snapshot binário: {e}")
+
+
 if __name__ == "__main__":
     dados = extrair_livros()
     salvar_csv(dados)
+    salvar_snapshot(dados)
@@ -40,3 +40,929 @@ def test_stats_endpoint_handles_empty_dataset(tmp_path, monkeypatch):
     stats = response.get_json()["dados"]
     assert stats["total_livros"] == 0
     assert stats["preco_medio"] == 0
+
+
+def test_backend_sqlite_usa_consultas_indexadas(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Light Book,10.00,In stock,3,Poetry\n"
+        "Other Book,20.00,In stock,5,Travel\n"
+        "Light Trip,30.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    app_sql = create_app({
+        "TESTING": True,
+        "CATALOG_BACKEND": "sqlite",
+        "CACHE_TYPE": "NullCache",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    })
+    cliente = app_sql.test_client()
+
+    busca = cliente.get("/api/v1/books/search?title=light&category=trav")
+    titulos = [livro["title"] for livro in busca.get_json()["dados"]]
+    assert titulos == ["Light Trip"]
+
+    livro = cliente.get("/api/v1/books/2").get_json()["dados"]
+    assert livro["title"] == "Other Book" and livro["id"] == 2
+
+    pagina = cliente.get("/api/v1/books/?page=2&per_page=2").get_json()
+    assert pagina["meta"]["total_itens"] == 3
+    assert [livro["title"] for livro in pagina["dados"]] == ["Light Trip"]
+
+    stats = cliente.get("/api/v1/stats/category/Travel").get_json()["dados"]
+    assert stats["total_livros"] == 2 and stats["preco_medio"] == 25.0
+    assert cliente.get("/api/v1/stats/category/Nope").status_code == 404
+
+
+def test_paginacao_por_cursor_em_books_e_search(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    linhas = [f"Book {i},{i}.00,In stock,3,Poetry" for i in range(1, 8)]
+    destino.write_text(
+        "title,price,availability,rating,category\n" + "\n".join(linhas),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    for backend in ("memoria", "sqlite"):
+        cliente = create_app({
+            "TESTING": True,
+            "CATALOG_BACKEND": backend,
+            "CACHE_TYPE": "NullCache",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'b.db'}",
+        }).test_client()
+
+        for url in ("/api/v1/books/?per_page=3",
+                    "/api/v1/books/search?category=poe&per_page=3"):
+            titulos = []
+            while url:
+                payload = cliente.get(url).get_json()
+                titulos += [livro["title"] for livro in payload["dados"]]
+                cursor = payload["meta"]["proximo_cursor"]
+                base = url.split("&cursor=")[0]
+                url = f"{base}&cursor={cursor}" if cursor else None
+            assert titulos == [f"Book {i}" for i in range(1, 8)], backend
+
+        invalido = cliente.get("/api/v1/books/search?cursor=%%%")
+        assert invalido.status_code == 400
+
+
+def test_busca_por_faixa_e_ordenacao(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    livros = [
+        (f"Book {i:02d}", (i * 7) % 13 + 0.5, i % 5 + 1, "Travel")
+        for i in range(30)
+    ]
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n" + "\n".join(
+            f"{t},{p},In stock,{r},{c}" for t, p, r, c in livros
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    esperado = sorted(
+        (livro for livro in livros if 2 <= livro[1] <= 9 and livro[2] >= 4),
+        key=lambda livro: livro[1],
+    )
+    for backend in ("memoria", "sqlite"):
+        cliente = create_app({
+            "TESTING": True,
+            "CATALOG_BACKEND": backend,
+            "CACHE_TYPE": "NullCache",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'b.db'}",
+        }).test_client()
+
+        base = ("/api/v1/books/search?min_price=2&max_price=9"
+                "&min_rating=4&sort=price&per_page=2")
+        url, precos, titulos = base, [], []
+        while url:
+            payload = cliente.get(url).get_json()
+            assert payload["meta"]["total_resultados"] == len(esperado)
+            precos += [livro["price"] for livro in payload["dados"]]
+            titulos += [livro["title"] for livro in payload["dados"]]
+            cursor = payload["meta"]["proximo_cursor"]
+            url = f"{base}&cursor={cursor}" if cursor else None
+
+        assert precos == [livro[1] for livro in esperado], backend
+        assert len(set(titulos)) == len(esperado)
+
+        assert cliente.get(
+            "/api/v1/books/search?sort=preco"
+        ).status_code == 400
+
+
+def test_etag_por_versao_dos_dados_e_304(tmp_path, monkeypatch):
+    import os
+
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    os.utime(destino, (1_000_000, 1_000_000))
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    cliente = create_app({
+        "TESTING": True, "CACHE_TYPE": "SimpleCache", "API_WARMUP_URLS": (),
+    }).test_client()
+
+    for url in ("/api/v1/books/", "/api/v1/books/search?title=book",
+                "/api/v1/categories/", "/api/v1/stats/",
+                "/api/v1/ml/features", "/api/v1/books/1"):
+        resposta = cliente.get(url)
+        etag = resposta.headers["ETag"]
+        assert resposta.headers["Cache-Control"].startswith("public")
+        repetida = cliente.get(url, headers={"If-None-Match": etag})
+        assert repetida.status_code == 304, url
+        assert repetida.data == b"" and repetida.headers["ETag"] == etag
+
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book B,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    nova = cliente.get("/api/v1/categories/", headers={"If-None-Match": etag})
+    assert nova.status_code == 200 and nova.headers["ETag"] != etag
+    assert nova.get_json()["dados"] == ["Travel"]
+    assert "ETag" not in cliente.get("/api/v1/books/9").headers
+
+
+def test_cache_guarda_bytes_e_variante_gzip(tmp_path, monkeypatch):
+    import gzip
+    import importlib
+
+    from api import utils
+    from src.api.main import create_app
+
+    books = importlib.import_module("api.routers.books")
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n" + "\n".join(
+            f"Book {i},{i}.00,In stock,3,Poetry" for i in range(40)
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    chamadas = []
+    original = books.obter_repositorio
+    monkeypatch.setattr(
+        books, "obter_repositorio",
+        lambda: chamadas.append(1) or original()
+    )
+    cliente = create_app({
+        "TESTING": True, "CACHE_TYPE": "SimpleCache", "API_WARMUP_URLS": (),
+    }).test_client()
+
+    url = "/api/v1/books/?per_page=40"
+    simples = cliente.get(url)
+    comprimida = cliente.get(url, headers={"Accept-Encoding": "gzip, br"})
+
+    assert len(chamadas) == 1
+    assert "Content-Encoding" not in simples.headers
+    assert comprimida.headers["Content-Encoding"] == "gzip"
+    assert comprimida.headers["Vary"] == "Accept-Encoding"
+    assert len(comprimida.data) < len(simples.data)
+    assert gzip.decompress(comprimida.data) == simples.data
+    assert comprimida.headers["ETag"] != simples.headers["ETag"]
+    assert cliente.get(url, headers={
+        "If-None-Match": comprimida.headers["ETag"]
+    }).status_code == 304
+    assert simples.get_json()["meta"]["total_itens"] == 40
+
+
+def test_aquecimento_na_subida_e_a_cada_nova_versao(tmp_path, monkeypatch):
+    import importlib
+    import os
+    import threading
+
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    os.utime(destino, (1_000_000, 1_000_000))
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    categorias = importlib.import_module("api.routers.categories")
+    chamadas = []
+    original = categorias.obter_repositorio
+    monkeypatch.setattr(
+        categorias, "obter_repositorio",
+        lambda: chamadas.append(1) or original()
+    )
+
+    app_aquecida = create_app({
+        "TESTING": True, "CACHE_TYPE": "SimpleCache",
+        "API_WARMUP_URLS": ("/api/v1/categories/",),
+    })
+    assert len(chamadas) == 1
+    cliente = app_aquecida.test_client()
+    assert cliente.get("/api/v1/categories/").status_code == 200
+    assert len(chamadas) == 1
+
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book B,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    # A primeira requisição que vê a nova versão dispara o aquecimento
+    cliente.get("/api/v1/books/1")
+    for thread in threading.enumerate():
+        if thread.name == "aquecimento":
+            thread.join()
+    assert len(chamadas) == 2
+    resposta = cliente.get("/api/v1/categories/")
+    assert resposta.get_json()["dados"] == ["Travel"]
+    assert len(chamadas) == 2
+
+
+def test_single_flight_e_copia_vencida_durante_recalculo(
+    tmp_path, monkeypatch
+):
+    import importlib
+    import threading
+    import time
+    from types import SimpleNamespace
+
+    from api import cache_respostas, utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    categorias = importlib.import_module("api.routers.categories")
+    original = categorias.obter_repositorio
+    chamadas, liberar = [], threading.Event()
+
+    def lento():
+        chamadas.append(1)
+        liberar.wait(5)
+        return original()
+
+    monkeypatch.setattr(categorias, "obter_repositorio", lento)
+    app_cache = create_app({
+        "TESTING": True, "CACHE_TYPE": "SimpleCache", "API_WARMUP_URLS": (),
+    })
+
+    def pedir(respostas):
+        with app_cache.test_client() as cliente:
+            respostas.append(cliente.get("/api/v1/categories/"))
+
+    respostas = []
+    threads = [
+        threading.Thread(target=pedir, args=(respostas,)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+    assert len(chamadas) == 1
+    assert [r.get_json()["dados"] for r in respostas] == [["Poetry"]] * 8
+
+    # Vencido o TTL, só uma requisição recalcula; as outras recebem a cópia
+    monkeypatch.setattr(cache_respostas, "time", SimpleNamespace(
+        time=lambda: time.time() + 301
+    ))
+    liberar.clear()
+    recalculo = []
+    lider = threading.Thread(target=pedir, args=(recalculo,))
+    lider.start()
+    while len(chamadas) < 2:
+        time.sleep(0.01)
+    antigas = []
+    pedir(antigas)
+    assert antigas[0].get_json()["dados"] == ["Poetry"]
+    assert len(chamadas) == 2
+    liberar.set()
+    lider.join()
+    assert recalculo[0].status_code == 200
+
+
+def test_cache_sqlite_compartilhado_com_lru(tmp_path, monkeypatch):
+    from api import utils
+    from core.cache_compartilhado import CacheSQLite
+    from src.api.main import create_app
+
+    caminho = tmp_path / "cache.sqlite"
+    um, outro = CacheSQLite(caminho, 3000), CacheSQLite(caminho, 3000)
+    um.set("a", b"x" * 1000)
+    um.set("b", b"x" * 1000)
+    assert outro.get("a") == b"x" * 1000
+    assert not outro.add("a", b"y") and outro.add("c", b"z")
+    # "b" é a menos usada: sai quando o teto é ultrapassado
+    um._local.conexao.execute("UPDATE cache SET acesso = 0 WHERE chave='b'")
+    outro.set("d", b"x" * 1500)
+    assert um.get("b") is None and um.get("a") is not None
+    um.set("e", 1, timeout=-1)
+    assert not um.has("e") and um.get("e") is None
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    configuracao = {
+        "TESTING": True, "CACHE_TYPE": "sqlite",
+        "CACHE_SQLITE_PATH": str(tmp_path / "api.sqlite"),
+        "API_WARMUP_URLS": ("/api/v1/categories/",),
+    }
+    create_app(dict(configuracao))
+    # Outro "worker" encontra a resposta já calculada pelo primeiro
+    segundo = create_app(dict(configuracao))
+    cache = segundo.extensions["cache"]
+    backend = next(iter(cache.values()))
+    assert isinstance(backend, CacheSQLite)
+    linhas = backend._conexao().execute("SELECT chave FROM cache").fetchall()
+    assert any("/api/v1/categories/" in chave for chave, in linhas)
+    resposta = segundo.test_client().get("/api/v1/categories/")
+    assert resposta.get_json()["dados"] == ["Poetry"]
+
+
+def test_ids_estaveis_com_etag_por_conteudo(tmp_path, monkeypatch):
+    import os
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "id,title,price,availability,rating,category\n"
+        "1000,Book A,10.00,In stock,3,Poetry\n"
+        "7,Book B,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    os.utime(destino, (1_000_000, 1_000_000))
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    clientes = [
+        create_app({
+            "TESTING": True, "CACHE_TYPE": "SimpleCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+        for extra in ({}, {
+            "CATALOG_BACKEND": "sqlite",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+        })
+    ]
+
+    etags = []
+    for cliente in clientes:
+        resposta = cliente.get("/api/v1/books/7")
+        assert resposta.get_json()["dados"]["title"] == "Book B"
+        assert resposta.get_json()["dados"]["id"] == 7
+        assert cliente.get("/api/v1/books/2").status_code == 404
+        etags.append(resposta.headers["ETag"])
+
+    # Nova extração em outra ordem: os IDs e o ETag do livro não mudam
+    destino.write_text(
+        "id,title,price,availability,rating,category\n"
+        "7,Book B,12.00,In stock,4,Travel\n"
+        "3,Book C,9.00,In stock,2,Poetry\n"
+        "1000,Book A,11.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    for cliente, etag in zip(clientes, etags):
+        igual = cliente.get("/api/v1/books/7", headers={"If-None-Match": etag})
+        assert igual.status_code == 304 and igual.headers["ETag"] == etag
+        mudou = cliente.get("/api/v1/books/1000")
+        assert mudou.get_json()["dados"]["price"] == 11.0
+        assert cliente.get("/api/v1/books/3").get_json()["dados"]["id"] == 3
+
+
+def test_ids_das_listagens_levam_aos_detalhes(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "id,title,price,availability,rating,category\n"
+        "1000,Book A,10.00,In stock,3,Poetry\n"
+        "42,Book B,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    for extra in ({}, {
+        "CATALOG_BACKEND": "sqlite",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }):
+        cliente = create_app({
+            "TESTING": True, "CACHE_TYPE": "NullCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+
+        listagens = [
+            cliente.get("/api/v1/books/?per_page=1").get_json(),
+            cliente.get("/api/v1/books/search?title=book").get_json(),
+            cliente.get("/api/v1/books/search?sort=price").get_json(),
+        ]
+        cursor = listagens[0]["meta"]["proximo_cursor"]
+        listagens.append(
+            cliente.get(f"/api/v1/books/?cursor={cursor}").get_json()
+        )
+        ids = [[livro["id"] for livro in r["dados"]] for r in listagens]
+        assert ids == [[42], [42, 1000], [1000, 42], [1000]]
+        for livro in listagens[1]["dados"]:
+            detalhe = cliente.get(f"/api/v1/books/{livro['id']}").get_json()
+            assert detalhe["dados"] == livro
+
+    features = cliente.get("/api/v1/ml/features").get_json()["dados"]
+    assert [f["id"] for f in features["features"]] == [1000, 42]
+
+
+def test_cursor_sobrevive_a_reimportacao_em_outra_ordem(
+    tmp_path, monkeypatch
+):
+    import os
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    cabecalho = "id,title,price,availability,rating,category\n"
+    linhas = [f"{i},Book {i},10.00,In stock,3,Poetry\n" for i in range(1, 5)]
+    for extra in ({}, {
+        "CATALOG_BACKEND": "sqlite",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }):
+        destino.write_text(cabecalho + "".join(linhas), encoding="utf-8")
+        cliente = create_app({
+            "TESTING": True, "CACHE_TYPE": "NullCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+        urls = ("/api/v1/books/?per_page=2",
+                "/api/v1/books/search?sort=price&per_page=2")
+        primeiras = [cliente.get(url).get_json() for url in urls]
+
+        # Nova extração com os mesmos livros em outra ordem
+        destino.write_text(
+            cabecalho + "".join(reversed(linhas)), encoding="utf-8"
+        )
+        instante = destino.stat().st_mtime_ns + 10 ** 9
+        os.utime(destino, ns=(instante, instante))
+        for url, primeira in zip(urls, primeiras):
+            cursor = primeira["meta"]["proximo_cursor"]
+            seguinte = cliente.get(f"{url}&cursor={cursor}").get_json()
+            ids = [
+                livro["id"]
+                for pagina in (primeira, seguinte)
+                for livro in pagina["dados"]
+            ]
+            assert ids == [1, 2, 3, 4], (url, extra)
+
+
+def test_ordenacao_por_titulo_nao_ascii_percorre_todos(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Émile,10.00,In stock,3,Poetry\n"
+        "apple,12.00,In stock,4,Travel\n"
+        "Zoo,9.00,In stock,2,Poetry\n"
+        "Éclair,11.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    for extra in ({}, {
+        "CATALOG_BACKEND": "sqlite",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }):
+        cliente = create_app({
+            "TESTING": True, "CACHE_TYPE": "NullCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+        titulos = []
+        url = "/api/v1/books/search?sort=title&per_page=1"
+        while url:
+            pagina = cliente.get(url).get_json()
+            titulos += [livro["title"] for livro in pagina["dados"]]
+            cursor = pagina["meta"]["proximo_cursor"]
+            url = cursor and (
+                f"/api/v1/books/search?sort=title&per_page=1&cursor={cursor}"
+            )
+        assert titulos == ["apple", "Zoo", "Éclair", "Émile"], extra
+
+
+def test_busca_sql_por_titulo_nao_ascii_usa_indices(tmp_path, monkeypatch):
+    from sqlalchemy import text
+    from api import utils
+    from core.db import db
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Émile,10.00,In stock,3,Poetry\n"
+        "Other,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    app_sql = create_app({
+        "TESTING": True, "CATALOG_BACKEND": "sqlite",
+        "CACHE_TYPE": "NullCache", "API_WARMUP_URLS": (),
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    })
+    cliente = app_sql.test_client()
+
+    busca = cliente.get("/api/v1/books/search?title=émile").get_json()
+    assert [livro["title"] for livro in busca["dados"]] == ["Émile"]
+
+    with app_sql.app_context():
+        plano = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM livros"
+            " WHERE (price, id) > (10, 1) ORDER BY price, id"
+        )).fetchall()
+    assert any("ix_livros_price_id" in linha[-1] for linha in plano)
+    assert not any("TEMP B-TREE" in linha[-1] for linha in plano)
+
+
+def test_inteiros_fora_do_intervalo_do_sqlite(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", utils.Config.CSV_FILE)
+    cliente = create_app({
+        "TESTING": True, "CATALOG_BACKEND": "sqlite",
+        "CACHE_TYPE": "NullCache", "API_WARMUP_URLS": (),
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }).test_client()
+    enorme = 10 ** 30
+    cursor = utils.codificar_cursor({"id": enorme})
+    cursor_rating = utils.codificar_cursor(
+        {"id": 1, "o": "rating", "k": enorme}
+    )
+
+    assert cliente.get(f"/api/v1/books/{enorme}").status_code == 404
+    for url in (f"/api/v1/books/?page={enorme}",
+                f"/api/v1/books/?per_page={enorme}",
+                f"/api/v1/books/?cursor={cursor}",
+                f"/api/v1/books/search?cursor={cursor}",
+                f"/api/v1/books/search?sort=rating&cursor={cursor_rating}",
+                f"/api/v1/books/search?min_rating={enorme}"):
+        assert cliente.get(url).status_code == 400, url
+
+
+def test_cursores_adulterados_recebem_400(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", utils.Config.CSV_FILE)
+    adulterados = [
+        ("/api/v1/books/", {"id": True}),
+        ("/api/v1/books/", {"id": -1}),
+        ("/api/v1/books/search", {"id": 1.5}),
+        ("/api/v1/books/search?sort=title", {"id": 1, "o": "title", "k": 3}),
+        ("/api/v1/books/search?sort=title",
+         {"id": 1, "o": "title", "k": None}),
+        ("/api/v1/books/search?sort=price",
+         {"id": 1, "o": "price", "k": "barato"}),
+        ("/api/v1/books/search?sort=rating",
+         {"id": 1, "o": "rating", "k": False}),
+        ("/api/v1/books/search?sort=rating", {"id": 1, "o": "rating"}),
+    ]
+    for extra in ({}, {
+        "CATALOG_BACKEND": "sqlite",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }):
+        cliente = create_app({
+            "TESTING": True, "CACHE_TYPE": "NullCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+        for url, dados in adulterados:
+            separador = "&" if "?" in url else "?"
+            cursor = utils.codificar_cursor(dados)
+            resposta = cliente.get(f"{url}{separador}cursor={cursor}")
+            assert resposta.status_code == 400, (url, dados, extra)
+
+        valido = utils.codificar_cursor({"id": 1, "o": "price", "k": 20})
+        url = f"/api/v1/books/search?sort=price&cursor={valido}"
+        assert cliente.get(url).status_code == 200
+
+
+def test_reimportacao_sql_troca_a_tabela_em_uma_transacao(
+    tmp_path, monkeypatch
+):
+    import importlib
+    import sqlite3
+    import threading
+    from api import utils
+    from src.api.main import create_app
+
+    repositorio = importlib.import_module("api.repositorio")
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    banco = tmp_path / "books.db"
+    app_sql = create_app({
+        "TESTING": True, "CATALOG_BACKEND": "sqlite",
+        "CACHE_TYPE": "NullCache", "API_WARMUP_URLS": (),
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{banco}",
+    })
+    # A subida já importou o CSV
+    leitor = sqlite3.connect(banco)
+    assert leitor.execute("SELECT title FROM livros").fetchall() == [
+        ("Book A",)
+    ]
+
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book B,12.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    em_importacao, liberar = threading.Event(), threading.Event()
+    ler_lotes = repositorio._ler_lotes_csv
+
+    def ler_lotes_devagar(caminho):
+        for lote in ler_lotes(caminho):
+            yield lote
+            em_importacao.set()
+            liberar.wait(5)
+
+    monkeypatch.setattr(repositorio, "_ler_lotes_csv", ler_lotes_devagar)
+
+    def sincronizar():
+        with app_sql.app_context():
+            repositorio.sincronizar_banco()
+
+    thread = threading.Thread(target=sincronizar)
+    thread.start()
+    assert em_importacao.wait(5)
+    # No meio da importação, leitores ainda veem a tabela anterior inteira
+    assert leitor.execute("SELECT title FROM livros").fetchall() == [
+        ("Book A",)
+    ]
+    liberar.set()
+    thread.join()
+    assert leitor.execute("SELECT title FROM livros").fetchall() == [
+        ("Book B",)
+    ]
+
+
+def test_per_page_limitado_com_e_sem_cursor(tmp_path, monkeypatch):
+    import importlib
+    from api import utils
+    from src.api.main import create_app
+
+    books = importlib.import_module("api.routers.books")
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n"
+        "Book B,12.00,In stock,4,Travel\n"
+        "Book C,9.00,In stock,2,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    monkeypatch.setattr(books, "MAX_POR_PAGINA", 2)
+    cliente = create_app({
+        "TESTING": True, "CACHE_TYPE": "NullCache", "API_WARMUP_URLS": (),
+    }).test_client()
+
+    pagina = cliente.get("/api/v1/books/?per_page=1000").get_json()
+    assert len(pagina["dados"]) == 2 and pagina["meta"]["por_pagina"] == 2
+    assert pagina["meta"]["total_paginas"] == 2
+    cursor = pagina["meta"]["proximo_cursor"]
+    seguinte = cliente.get(f"/api/v1/books/?per_page=1000&cursor={cursor}")
+    assert [livro["title"] for livro in seguinte.get_json()["dados"]] == [
+        "Book C"
+    ]
+
+
+def test_filtros_de_preco_nao_finitos_recebem_400(tmp_path, monkeypatch):
+    from api import utils
+    from src.api.main import create_app
+
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", utils.Config.CSV_FILE)
+    for extra in ({}, {
+        "CATALOG_BACKEND": "sqlite",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }):
+        cliente = create_app({
+            "TESTING": True, "CACHE_TYPE": "NullCache",
+            "API_WARMUP_URLS": (), **extra,
+        }).test_client()
+        for filtro in ("min_price=nan", "max_price=inf", "min_price=-inf",
+                       "max_price=1e400", "min_price=NaN&max_price=10"):
+            resposta = cliente.get(f"/api/v1/books/search?{filtro}")
+            assert resposta.status_code == 400, (filtro, extra)
+        assert cliente.get(
+            "/api/v1/books/search?min_price=1e2"
+        ).status_code == 200
+
+
+def test_single_flight_entre_workers_pelo_cache_compartilhado(
+    tmp_path, monkeypatch
+):
+    import importlib
+    import threading
+    import time
+
+    from api import cache_respostas, utils
+    from core.cache import cache
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    monkeypatch.setattr(cache_respostas, "INTERVALO_CONSULTA", 0.01)
+    categorias = importlib.import_module("api.routers.categories")
+    original = categorias.obter_repositorio
+    chamadas = []
+    monkeypatch.setattr(
+        categorias, "obter_repositorio",
+        lambda: chamadas.append(1) or original()
+    )
+    app_cache = create_app({
+        "TESTING": True, "CACHE_TYPE": "sqlite", "API_WARMUP_URLS": (),
+        "CACHE_SQLITE_PATH": str(tmp_path / "api.sqlite"),
+    })
+    with app_cache.test_request_context("/api/v1/categories/"):
+        chave = cache_respostas.chave_cache()
+        reserva = chave + cache_respostas.SUFIXO_CALCULO
+        # Outro worker está calculando a mesma chave
+        assert cache.add(reserva, 1, timeout=30)
+
+    respostas = []
+    pedido = threading.Thread(target=lambda: respostas.append(
+        app_cache.test_client().get("/api/v1/categories/")
+    ))
+    pedido.start()
+    time.sleep(0.2)
+    assert chamadas == [] and respostas == []
+
+    # O outro worker grava a entrada e libera a chave
+    with app_cache.app_context():
+        entrada = ("application/json", b'{"dados": ["Outro"]}', None,
+                   time.time() + 300, "0" * 16)
+        cache.set(chave, entrada)
+        cache.delete(reserva)
+    pedido.join(5)
+    assert chamadas == []
+    assert respostas[0].get_json() == {"dados": ["Outro"]}
+
+    # Sem reserva alheia, o cálculo acontece e a reserva é liberada
+    cliente = app_cache.test_client()
+    assert cliente.get("/api/v1/books/search?title=book").status_code == 200
+    with app_cache.app_context():
+        reservas = [
+            chave for chave, in next(iter(
+                app_cache.extensions["cache"].values()
+            ))._conexao().execute("SELECT chave FROM cache")
+            if chave.endswith(cache_respostas.SUFIXO_CALCULO)
+        ]
+    assert reservas == []
+
+
+def test_snapshot_publicado_nao_reimporta_o_banco(tmp_path, monkeypatch):
+    import importlib
+    from api import utils
+    from core.snapshot import caminho_snapshot
+    from src.api.main import create_app
+
+    repositorio = importlib.import_module("api.repositorio")
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    importacoes = []
+    importar = repositorio._importar_csv
+    monkeypatch.setattr(
+        repositorio, "_importar_csv",
+        lambda *a: importacoes.append(1) or importar(*a)
+    )
+    cliente = create_app({
+        "TESTING": True, "CATALOG_BACKEND": "sqlite",
+        "CACHE_TYPE": "NullCache", "API_WARMUP_URLS": (),
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+    }).test_client()
+    assert len(importacoes) == 1
+
+    caminho_snapshot(destino).write_bytes(b"snapshot")
+    assert cliente.get("/api/v1/books/").status_code == 200
+    assert len(importacoes) == 1
+
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book B,112.00,In stock,4,Travel\n",
+        encoding="utf-8",
+    )
+    dados = cliente.get("/api/v1/books/").get_json()["dados"]
+    assert [livro["title"] for livro in dados] == ["Book B"]
+    assert len(importacoes) == 2
+
+
+def test_backend_sqlite_nao_carrega_o_catalogo_em_memoria(
+    tmp_path, monkeypatch
+):
+    from api import catalogo, utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.25,In stock,3,Poetry\n"
+        "Book B,20.50,In stock,5,Travel\n"
+        "Book C,30.00,Out of stock,5,Travel\n"
+        "Book D,7.10,In stock,1,\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    urls = (
+        "/api/v1/stats/", "/api/v1/stats/overview", "/api/v1/categories/",
+        "/api/v1/stats/category/Travel", "/api/v1/health",
+        "/api/v1/ml/features?offset=1&limit=2",
+        "/api/v1/ml/features?offset=-1",
+        "/api/v1/ml/training-data", "/api/v1/ml/training-data?target=price",
+    )
+
+    respostas = {}
+    for backend in ("sqlite", "memoria"):
+        monkeypatch.setattr(catalogo, "_catalogo_atual", None)
+        # Aquecimento padrão (/stats/overview, /categories/, ...) incluído
+        cliente = create_app({
+            "TESTING": True, "CATALOG_BACKEND": backend,
+            "CACHE_TYPE": "NullCache",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'b.db'}",
+        }).test_client()
+        respostas[backend] = [cliente.get(url).get_json() for url in urls]
+        if backend == "sqlite":
+            assert catalogo._catalogo_atual is None
+
+    assert respostas["sqlite"] == respostas["memoria"]
+    visao = respostas["sqlite"][1]["dados"]
+    assert visao["total_categorias"] == 2
+    assert visao["distribuicao_ratings"]["5"] == 2
+    assert respostas["sqlite"][2]["dados"] == ["Poetry", "Travel"]
+
+
+def test_versao_das_respostas_invalida_etag_e_cache(tmp_path, monkeypatch):
+    import importlib
+
+    from api import cache_respostas, utils
+    from src.api.main import create_app
+
+    destino = tmp_path / "books.csv"
+    destino.write_text(
+        "title,price,availability,rating,category\n"
+        "Book A,10.00,In stock,3,Poetry\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    cliente = create_app({
+        "TESTING": True, "CACHE_TYPE": "SimpleCache", "API_WARMUP_URLS": (),
+    }).test_client()
+    url = "/api/v1/categories/"
+    etag = cliente.get(url).headers["ETag"]
+
+    # Deploy que muda só o formato da resposta, com os mesmos dados
+    categorias = importlib.import_module("api.routers.categories")
+    original = categorias.resposta_sucesso
+    monkeypatch.setattr(
+        categorias, "resposta_sucesso",
+        lambda dados: original(dados={"nomes": dados})
+    )
+    assert cliente.get(url).get_json()["dados"] == ["Poetry"]
+    monkeypatch.setattr(
+        cache_respostas, "VERSAO_RESPOSTAS",
+        cache_respostas.VERSAO_RESPOSTAS + 1
+    )
+
+    nova = cliente.get(url, headers={"If-None-Match": etag})
+    assert nova.status_code == 200 and nova.headers["ETag"] != etag
+    assert nova.get_json()["dados"] == {"nomes": ["Poetry"]}
@@ -0,0 +1,207 @@
+import os
+
+from src.api.main import app  # ajusta o sys.path para src
+
+
+CSV_BASE = (
+    "title,price,availability,rating,category\n"
+    "Livro A,10.00,In stock,3,Poetry\n"
+    "Livro B,20.50,In stock,5,Travel\n"
+)
+
+
+def _escrever_csv(caminho, conteudo, mtime=None):
+    caminho.write_text(conteudo, encoding="utf-8")
+    if mtime is not None:
+        os.utime(caminho, (mtime, mtime))
+
+
+def test_catalogo_e_reutilizado_enquanto_arquivo_nao_muda(
+    tmp_path, monkeypatch
+):
+    from api import catalogo, utils
+
+    destino = tmp_path / "books.csv"
+    _escrever_csv(destino, CSV_BASE)
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    primeiro = catalogo.obter_catalogo()
+    segundo = catalogo.obter_catalogo()
+
+    assert primeiro is segundo
+    assert len(primeiro) == 2
+    assert primeiro.colunas.livro(1)["price"] == 20.5
+    assert primeiro.colunas.livro(1)["rating"] == 5
+
+
+def test_catalogo_recarrega_quando_arquivo_muda(tmp_path, monkeypatch):
+    from api import catalogo, utils
+
+    destino = tmp_path / "books.csv"
+    _escrever_csv(destino, CSV_BASE, mtime=1_000_000)
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+    antigo = catalogo.obter_catalogo()
+
+    _escrever_csv(
+        destino,
+        CSV_BASE + "Livro C,7.25,In stock,1,Poetry\n",
+        mtime=2_000_000,
+    )
+    novo = catalogo.obter_catalogo()
+
+    assert novo is not antigo
+    assert len(novo) == 3
+
+
+def test_catalogo_vazio_quando_arquivo_nao_existe(tmp_path, monkeypatch):
+    from api import catalogo, utils
+
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", tmp_path / "missing.csv")
+    assert len(catalogo.obter_catalogo()) == 0
+
+
+def test_resumo_confere_com_calculo_direto():
+    from api import utils
+    from api.estatisticas import ResumoEstatisticas
+    from core.colunas import ColunasLivros
+
+    colunas = ColunasLivros.de_csv(utils.Config.CSV_FILE)
+    livros = [colunas.livro(i) for i in range(len(colunas))]
+    precos = [livro["price"] for livro in livros]
+
+    resumo = ResumoEstatisticas(colunas)
+    assert resumo.geral() == {
+        "total_livros": len(livros),
+        "preco_medio": round(sum(precos) / len(precos), 2),
+        "preco_minimo": min(precos),
+        "preco_maximo": max(precos),
+    }
+    distribuicao = resumo.visao_geral()["distribuicao_ratings"]
+    assert distribuicao == {
+        str(r): sum(1 for livro in livros if livro["rating"] == r)
+        for r in range(1, 6)
+    }
+
+
+def test_stats_categoria_usa_colunas(tmp_path, monkeypatch):
+    from api import utils
+
+    destino = tmp_path / "books.csv"
+    _escrever_csv(destino, CSV_BASE)
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    client = app.test_client()
+    dados = client.get("/api/v1/stats/category/Travel").get_json()["dados"]
+    assert dados["total_livros"] == 1
+    assert dados["preco_medio"] == 20.5
+
+
+def test_catalogo_usa_snapshot_binario(tmp_path, monkeypatch):
+    from api import catalogo, utils
+    from core.snapshot import escrever_snapshot
+
+    destino = tmp_path / "books.csv"
+    _escrever_csv(destino, CSV_BASE)
+    escrever_snapshot(
+        [{"title": "Livro A", "price": 10.0, "availability": "In stock",
+          "rating": 3, "category": "Poetry"},
+         {"title": "Livro B", "price": 20.5, "availability": "In stock",
+          "rating": 5, "category": "Travel"}],
+        destino,
+    )
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    atual = catalogo.obter_catalogo()
+    assert isinstance(atual.colunas.precos, memoryview)
+    assert atual.resumo.geral()["preco_maximo"] == 20.5
+    assert atual.resumo.visao_geral()["distribuicao_ratings"]["5"] == 1
+
+
+def test_snapshot_corrompido_cai_no_csv(tmp_path, monkeypatch):
+    import struct
+
+    from api import utils
+    from api.estatisticas import ResumoEstatisticas
+    from core import snapshot
+
+    destino = tmp_path / "books.csv"
+    _escrever_csv(destino, CSV_BASE)
+    livros = [
+        {"title": "Livro A", "price": 10.0, "availability": "In stock",
+         "rating": 3, "category": "Poetry"},
+        {"title": "Livro B", "price": 20.5, "availability": "In stock",
+         "rating": 5, "category": "Travel"},
+    ]
+    bin_ = snapshot.escrever_snapshot(livros, destino)
+    original = bin_.read_bytes()
+    monkeypatch.setattr(utils, "CAMINHO_DADOS", destino)
+
+    def secao(i):
+        inicio = snapshot._CABECALHO.size + i * snapshot._SECAO.size
+        return inicio, snapshot._SECAO.unpack_from(original, inicio)
+
+    corrompidos = []
+    # Seção de ratings truncada (um rating a menos)
+    dados = bytearray(original)
+    inicio, (offset, tamanho) = secao(1)
+    snapshot._SECAO.pack_into(dados, inicio, offset, tamanho - 1)
+    corrompidos.append(bytes(dados))
+    # Código de categoria fora do dicionário
+    dados = bytearray(original)
+    inicio, (offset, _) = secao(2)
+    struct.pack_into("<I", dados, offset + 4, 7)
+    corrompidos.append(bytes(dados))
+    # Arquivo cortado no meio das seções
+    corrompidos.append(original[:secao(6)[1][0]])
+
+    for corrompido in corrompidos:
+        bin_.write_bytes(corrompido)
+        assert snapshot.abrir_snapshot(destino) is None
+        colunas = utils.carregar_colunas()
+        assert not isinstance(colunas.precos, memoryview)
+        assert [colunas.livro(i)["category"] for i in range(2)] == [
+            "Poetry", "Travel"
+        ]
+        resumo = ResumoEstatisticas(colunas)
+        assert resumo.geral()["total_livros"] == 2
+        assert resumo.geral()["preco_medio"] == 15.25
+
+
+def test_indice_trigramas_busca_substring():
+    from api.indices import IndiceTrigramas
+
+    indice = IndiceTrigramas(
+        ["A Light in the Attic", "Sapiens", "The Light Fantastic", "Li"]
+    )
+    assert indice.buscar("light") == [0, 2]
+    assert indice.buscar("LIGHT FAN") == [2]
+    assert indice.buscar("li") == [0, 2, 3]
+    assert indice.buscar("zzz") == []
+    # Todos os trigramas existem, mas não em sequência no mesmo título
+    assert indice.buscar("the attic light") == []
+
+
+def test_indice_categorias_e_resumo_por_categoria():
+    from api.estatisticas import ResumoEstatisticas
+    from api.indices import IndiceCategorias
+    from core.colunas import ColunasLivros
+
+    colunas = ColunasLivros.de_linhas([
+        {"title": "A", "price": "10", "rating": "1", "category": "Travel"},
+        {"title": "B", "price": "30", "rating": "2", "category": "Poetry"},
+        {"title": "C", "price": "20", "rating": "3", "category": "Travel"},
+        {"title": "D", "price": "5", "rating": "3", "category": "Art"},
+    ])
+    indice = IndiceCategorias(colunas)
+
+    assert indice.nomes() == ["Art", "Poetry", "Travel"]
+    assert indice.buscar("trav") == [0, 2]
+    assert indice.buscar("t") == [0, 1, 2, 3]
+
+    resumo = ResumoEstatisticas(colunas)
+    assert resumo.categoria("Travel")["preco_medio"] == 15.0
+    assert resumo.categoria("travel") is None
+    visao = resumo.visao_geral()
+    assert visao["total_categorias"] == 3
+    assert visao["distribuicao_ratings"]["3"] == 2
+    assert visao["preco_maximo"] == 30.0
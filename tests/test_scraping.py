@@ -1,6 +1,22 @@
+import threading
+
 from src.scraping import scraper
 
 
+def _processar(html, base_url=None, sessao=None, executor=None,
+               limitador=None, anteriores=None):
+    """Leva uma listagem pelas etapas de análise e de enriquecimento."""
+    pagina = {
+        'url': base_url,
+        'categoria': None,
+        'resposta': scraper.RespostaHttp(base_url, 200, html),
+    }
+    scraper._iniciar_analise(pagina, anteriores, None)
+    if sessao:
+        scraper._enriquecer_pagina(pagina, sessao, executor, limitador, None)
+    return pagina['livros']
+
+
 def test_parse_page_extracts_expected_fields():
     html = """
     <html>
@@ -12,8 +28,7 @@ def test_parse_page_extracts_expected_fields():
         </article>
     </html>
     """
-    soup = scraper.BeautifulSoup(html, 'html.parser')
-    itens = scraper._processar_pagina(soup)
+    itens = _processar(html)
     assert len(itens) == 1
     assert itens[0]['title'] == 'Example'
     assert itens[0]['price'] == 10.0
@@ -32,3 +47,541 @@ def test_salvar_csv_creates_file(tmp_path):
     assert destino.exists()
     content = destino.read_text(encoding='utf-8')
     assert 'Book' in content
+
+
+def test_id_livro_estavel_pela_url_de_detalhes(tmp_path):
+    from core.snapshot import abrir_snapshot
+
+    url = 'http://site/catalogue/a-light-in-the-attic_1000/index.html'
+    assert scraper.id_livro(url) == 1000
+    outra = 'http://site/catalogue/livro/index.html'
+    sem_numero = scraper.id_livro(outra)
+    assert sem_numero >= 1 << 48 and sem_numero == scraper.id_livro(outra)
+
+    livros = [
+        {'id': 1000, 'title': 'A', 'price': 1.0, 'availability': '',
+         'rating': 1, 'category': '', 'url': url},
+        {'id': sem_numero, 'title': 'B', 'price': 2.0, 'availability': '',
+         'rating': 2, 'category': '', 'url': ''},
+    ]
+    destino = tmp_path / 'books.csv'
+    scraper.salvar_csv(livros, str(destino))
+    scraper.salvar_snapshot(livros, str(destino))
+    assert list(abrir_snapshot(destino).ids) == [1000, sem_numero]
+
+
+def test_snapshot_rejeitado_fecha_o_mapeamento(tmp_path, monkeypatch):
+    import mmap
+    import struct
+    from core import snapshot
+
+    abertos = []
+
+    class MapaRegistrado(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            abertos.append(self)
+
+    monkeypatch.setattr(snapshot.mmap, 'mmap', MapaRegistrado)
+    livros = [{'title': 'A', 'price': 1.0, 'availability': '',
+               'rating': 1, 'category': ''}]
+    destino = tmp_path / 'books.csv'
+    scraper.salvar_csv(livros, str(destino))
+    scraper.salvar_snapshot(livros, str(destino))
+    assert snapshot.abrir_snapshot(destino) is not None
+    assert not abertos[-1].closed
+
+    # Seções inconsistentes com o cabeçalho
+    bin_ = snapshot.caminho_snapshot(destino)
+    dados = bytearray(bin_.read_bytes())
+    struct.pack_into('<I', dados, 12, 5)
+    bin_.write_bytes(bytes(dados))
+    assert snapshot.abrir_snapshot(destino) is None
+    assert abertos[-1].closed
+
+    # CSV mais novo que o snapshot
+    destino.write_text(destino.read_text(encoding='utf-8') + 'x,1,,1,\n')
+    assert snapshot.abrir_snapshot(destino) is None
+    assert abertos[-1].closed and len(abertos) == 3
+
+
+def test_salvar_snapshot_pode_ser_mapeado(tmp_path):
+    from core.snapshot import abrir_snapshot
+
+    livros = [
+        {'title': 'Ação', 'price': 5.5, 'availability': 'In stock',
+         'rating': 3, 'category': 'Poetry'},
+        {'title': 'Book 2', 'price': 7.0, 'availability': 'In stock',
+         'rating': 5, 'category': 'Travel'},
+    ]
+    destino = tmp_path / 'books.csv'
+    scraper.salvar_csv(livros, str(destino))
+    scraper.salvar_snapshot(livros, str(destino))
+
+    colunas = abrir_snapshot(destino)
+    assert colunas is not None
+    # Sem a coluna `id`, cada livro recebe a posição 1-indexada
+    assert [colunas.livro(i) for i in range(len(colunas))] == [
+        dict(livro, id=posicao) for posicao, livro in enumerate(livros, 1)
+    ]
+
+    # CSV alterado depois do snapshot invalida o snapshot
+    destino.write_text(destino.read_text(encoding='utf-8') + 'x,1,,1,\n')
+    assert abrir_snapshot(destino) is None
+
+
+class _RespostaFalsa:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise scraper.requests.HTTPError(str(self.status_code))
+
+
+class _SessaoFalsa:
+    """Devolve um breadcrumb com a categoria codificada na URL."""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        categoria = url.rsplit('/', 2)[-2]
+        return _RespostaFalsa(
+            '<ul class="breadcrumb"><li><a>Home</a></li><li><a>Books</a>'
+            f'</li><li><a>{categoria}</a></li></ul>'
+        )
+
+
+def _listagem(*hrefs):
+    artigos = ''.join(
+        f'<article class="product_pod"><h3><a title="{href}" href="{href}"/>'
+        '</h3><p class="price_color">£1.00</p>'
+        '<p class="instock availability">In stock</p>'
+        '<p class="star-rating One"></p></article>'
+        for href in hrefs
+    )
+    return f'<html>{artigos}</html>'
+
+
+def test_detalhes_buscados_em_paralelo_preservam_ordem():
+    from concurrent.futures import ThreadPoolExecutor
+
+    hrefs = [f'../{c}/index.html' for c in ('Poetry', 'Travel', 'Art')]
+    sessao = _SessaoFalsa()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        itens = _processar(
+            _listagem(*hrefs), 'http://site/catalogue/page-1.html', sessao,
+            executor=executor, limitador=scraper.LimitadorTaxa(1000)
+        )
+
+    assert [i['category'] for i in itens] == ['Poetry', 'Travel', 'Art']
+    assert len(sessao.urls) == 3
+
+
+class _SessaoSite:
+    """Serve páginas de um dicionário URL -> HTML, registrando as URLs."""
+
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.urls = []
+        self.nao_modificadas = 0
+
+    def get(self, url, timeout=None, headers=None):
+        self.urls.append(url)
+        if url not in self.paginas:
+            return _RespostaFalsa('', 404)
+        etag = f'"{hash(self.paginas[url])}"'
+        if (headers or {}).get('If-None-Match') == etag:
+            self.nao_modificadas += 1
+            return _RespostaFalsa('', 304)
+        return _RespostaFalsa(self.paginas[url], headers={'ETag': etag})
+
+
+def _site_categorias(base):
+    indice = (
+        '<div class="side_categories"><ul><li><a>Books</a><ul>'
+        '<li><a href="catalogue/category/books/travel_2/index.html">'
+        ' Travel </a></li>'
+        '<li><a href="catalogue/category/books/poetry_3/index.html">'
+        'Poetry</a></li></ul></li></ul></div>'
+    )
+    travel = base + 'catalogue/category/books/travel_2/'
+    poetry = base + 'catalogue/category/books/poetry_3/'
+    paginas = {
+        base + 'index.html': indice,
+        travel + 'index.html': (
+            '<div class="page-header"><h1>Travel</h1></div>'
+            + _listagem('../../../a_1/index.html', '../../../b_2/index.html')
+            + '<ul class="pager"><li class="next">'
+            '<a href="page-2.html">next</a></li></ul>'
+        ),
+        travel + 'page-2.html': (
+            '<div class="page-header"><h1>Travel</h1></div>'
+            + _listagem('../../../c_3/index.html')
+        ),
+        poetry + 'index.html': (
+            '<div class="page-header"><h1>Poetry</h1></div>'
+            + _listagem('../../../d_4/index.html')
+        ),
+    }
+    return paginas
+
+
+def _preparar_site(monkeypatch, paginas, base, cache_dir=''):
+    sessao = _SessaoSite(paginas)
+    monkeypatch.setattr(scraper.config, 'SITE_URL', base)
+    monkeypatch.setattr(scraper.config, 'SCRAPER_MAX_REQUESTS_PER_SECOND', 0)
+    monkeypatch.setattr(scraper.config, 'SCRAPER_HTTP_CACHE_DIR', cache_dir)
+    monkeypatch.setattr(scraper, '_criar_sessao', lambda *a: sessao)
+    monkeypatch.setattr(scraper, '_carregar_robots', lambda url: None)
+    return sessao
+
+
+def test_modo_categorias_dispensa_paginas_de_detalhe(monkeypatch):
+    base = 'http://site/'
+    sessao = _preparar_site(monkeypatch, _site_categorias(base), base)
+
+    livros = scraper.extrair_livros(modo=scraper.MODO_CATEGORIAS)
+
+    assert [livro['category'] for livro in livros] == [
+        'Travel', 'Travel', 'Travel', 'Poetry'
+    ]
+    assert len(sessao.urls) == 4
+
+
+def test_cache_http_reaproveita_paginas_nao_modificadas(monkeypatch, tmp_path):
+    base = 'http://site/'
+    sessao = _preparar_site(
+        monkeypatch, _site_categorias(base), base, str(tmp_path)
+    )
+    primeira = scraper.extrair_livros(modo=scraper.MODO_CATEGORIAS)
+
+    analisadas = []
+    original = scraper.analisar_listagem
+    monkeypatch.setattr(
+        scraper, 'analisar_listagem',
+        lambda html: analisadas.append(html) or original(html)
+    )
+    segunda = scraper.extrair_livros(modo=scraper.MODO_CATEGORIAS)
+
+    assert segunda == primeira
+    assert sessao.nao_modificadas == 4
+    assert analisadas == []
+
+
+def test_incremental_busca_detalhes_so_de_livros_novos_ou_alterados(
+    tmp_path
+):
+    base = 'http://site/catalogue/page-1.html'
+    hrefs = [f'{c}/index.html' for c in ('Poetry', 'Travel', 'Art')]
+    sessao = _SessaoFalsa()
+    html = _listagem(*hrefs)
+    anteriores_lista = _processar(html, base, sessao)
+    anteriores_lista[1]['price'] = 2.0
+
+    destino = tmp_path / 'books.csv'
+    scraper.salvar_csv(anteriores_lista, str(destino))
+    anteriores = scraper.carregar_livros_anteriores(str(destino))
+
+    sessao = _SessaoFalsa()
+    itens = _processar(html, base, sessao, anteriores=anteriores)
+
+    assert [i['category'] for i in itens] == ['Poetry', 'Travel', 'Art']
+    assert sessao.urls == ['http://site/catalogue/Travel/index.html']
+
+
+def test_analise_restrita_preserva_o_que_o_scraper_le():
+    from scraping import parser
+
+    listagem = parser.analisar_listagem(parser._listagem_exemplo())
+    assert len(listagem.select('article.product_pod')) == 20
+    assert listagem.select_one('div.page-header h1').text == 'All products'
+    assert listagem.select_one('li.next a')['href'] == 'page-2.html'
+    assert len(listagem.select('div.side_categories ul li ul li a')) == 50
+    assert listagem.select('header, footer') == []
+
+    detalhe = parser.analisar_detalhe(parser._detalhe_exemplo())
+    assert [a.text for a in detalhe.select('ul.breadcrumb li a')] == [
+        'Home', 'Books', 'Poetry'
+    ]
+    assert detalhe.select('p') == []
+
+
+def test_pipeline_retoma_do_checkpoint_apos_falha(monkeypatch, tmp_path):
+    from scraping import pipeline
+    from scraping import scraper as scraper_pipeline
+
+    base = 'http://site/'
+    paginas = _site_categorias(base)
+    faltando = base + 'catalogue/category/books/travel_2/page-2.html'
+    pagina_faltando = paginas.pop(faltando)
+    sessao = _SessaoSite(paginas)
+    monkeypatch.setattr(scraper_pipeline.config, 'SITE_URL', base)
+    monkeypatch.setattr(
+        scraper_pipeline.config, 'SCRAPER_CRAWL_MODE', 'categorias'
+    )
+    monkeypatch.setattr(
+        scraper_pipeline.config, 'SCRAPER_MAX_REQUESTS_PER_SECOND', 0
+    )
+    monkeypatch.setattr(scraper_pipeline.config, 'SCRAPER_HTTP_CACHE_DIR', '')
+    monkeypatch.setattr(scraper_pipeline, '_criar_sessao', lambda *a: sessao)
+    monkeypatch.setattr(scraper_pipeline, '_carregar_robots', lambda u: None)
+    destino = tmp_path / 'books.csv'
+
+    assert pipeline.executar_pipeline(False, str(destino)) is False
+    assert not destino.exists()
+    assert (tmp_path / 'books.csv.checkpoint.json').exists()
+
+    paginas[faltando] = pagina_faltando
+    sessao.urls.clear()
+    assert pipeline.executar_pipeline(False, str(destino)) is True
+
+    assert sessao.urls == [base + 'index.html', faltando]
+    linhas = destino.read_text(encoding='utf-8').splitlines()
+    assert linhas[0] == 'id,title,price,availability,rating,category,url'
+    # A página que falhou entra depois das já gravadas, e o ID de cada
+    # livro vem da URL de detalhes, não da posição
+    assert [linha.split(',')[:2] for linha in linhas[1:]] == [
+        ['1', '../../../a_1/index.html'], ['2', '../../../b_2/index.html'],
+        ['4', '../../../d_4/index.html'], ['3', '../../../c_3/index.html'],
+    ]
+    assert (tmp_path / 'books.bin').exists()
+    assert not (tmp_path / 'books.csv.checkpoint.json').exists()
+    assert not (tmp_path / 'books.csv.parcial').exists()
+
+
+def test_requisitar_tenta_de_novo_e_reduz_concorrencia(monkeypatch):
+    respostas = [
+        _RespostaFalsa('', 503, {'Retry-After': '0'}),
+        _RespostaFalsa('', 429, {'Retry-After': '0'}),
+        _RespostaFalsa('ok'),
+    ]
+
+    class _SessaoInstavel:
+        def get(self, url, timeout=None):
+            return respostas.pop(0)
+
+    monkeypatch.setattr(scraper.config, 'SCRAPER_MAX_RETRIES', 3)
+    limitador = scraper.LimitadorTaxa(0, concorrencia_maxima=8)
+    resposta = scraper._requisitar(
+        _SessaoInstavel(), 'http://site/', limitador
+    )
+
+    assert resposta.status_code == 200
+    assert resposta.text == 'ok'
+    # Um corte por rodada: o segundo erro veio antes de 4 respostas
+    assert limitador.limite == 4
+
+
+def test_retry_after_vale_para_quem_espera_na_fila(monkeypatch):
+    import time
+
+    dentro = threading.Event()
+    horarios = []
+
+    class _SessaoSobrecarregada:
+        def get(self, url, timeout=None):
+            horarios.append(time.monotonic())
+            if url == 'http://site/a':
+                dentro.set()
+                time.sleep(0.05)
+                return _RespostaFalsa('', 503, {'Retry-After': '0.3'})
+            return _RespostaFalsa('ok')
+
+    monkeypatch.setattr(scraper.config, 'SCRAPER_MAX_RETRIES', 0)
+    sessao = _SessaoSobrecarregada()
+    limitador = scraper.LimitadorTaxa(0, concorrencia_maxima=1)
+    primeira = threading.Thread(
+        target=scraper._requisitar, args=(sessao, 'http://site/a', limitador)
+    )
+    primeira.start()
+    dentro.wait()
+    # Chega enquanto a vaga está ocupada e sai da fila depois do 503
+    scraper._requisitar(sessao, 'http://site/b', limitador)
+    primeira.join()
+
+    assert horarios[1] - horarios[0] >= 0.3
+
+
+def test_limitador_respeita_crawl_delay_e_recupera_concorrencia():
+    from scraping.limitador import taxa_permitida
+
+    robots = scraper.RobotFileParser()
+    robots.parse(['User-agent: *', 'Crawl-delay: 2'])
+    assert taxa_permitida(robots, 5) == 0.5
+    assert taxa_permitida(None, 5) == 5
+
+    limitador = scraper.LimitadorTaxa(0, concorrencia_maxima=4)
+    limitador.registrar_sobrecarga()
+    assert limitador.limite == 2
+    for _ in range(2):
+        limitador.registrar_sucesso(0.01)
+    assert limitador.limite == 3
+
+
+def test_analise_em_processos_preserva_resultado_e_ordem(monkeypatch):
+    base = 'http://site/'
+    _preparar_site(monkeypatch, _site_categorias(base), base)
+
+    def extrair(processos):
+        return [
+            livro
+            for pagina in scraper.extrair_paginas(
+                modo=scraper.MODO_CATEGORIAS, processos_analise=processos
+            )
+            for livro in pagina['livros']
+        ]
+
+    assert extrair(2) == extrair(0)
+    assert [livro['category'] for livro in extrair(2)] == [
+        'Travel', 'Travel', 'Travel', 'Poetry'
+    ]
+
+
+def test_detalhes_tambem_analisados_em_processos(monkeypatch):
+    base = 'http://site/'
+    _preparar_site(monkeypatch, _site_catalogo(base, 3), base)
+    enviadas = []
+
+    class PoolEspiao(scraper.ProcessPoolExecutor):
+        def submit(self, funcao, *args, **kwargs):
+            enviadas.append(funcao.__name__)
+            return super().submit(funcao, *args, **kwargs)
+
+    monkeypatch.setattr(scraper, 'ProcessPoolExecutor', PoolEspiao)
+    livros = [
+        livro
+        for pagina in scraper.extrair_paginas(0, 2, processos_analise=2)
+        for livro in pagina['livros']
+    ]
+
+    assert [livro['category'] for livro in livros] == ['Poetry'] * 3
+    assert enviadas.count('_categoria_do_detalhe') == 3
+    assert enviadas.count('_extrair_listagem') == 3
+
+
+def test_benchmark_reproduz_corpus_gravado(tmp_path):
+    from src.scraping import replay
+
+    base = 'http://site/'
+    for url, html in _site_categorias(base).items():
+        destino = tmp_path / url[len(base):]
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(html, encoding='utf-8')
+
+    resultado = replay.executar_benchmark(
+        tmp_path, modo=scraper.MODO_CATEGORIAS
+    )
+
+    assert resultado['livros'] == 4
+    assert resultado['paginas'] == resultado['requisicoes'] == 4
+    assert resultado['paginas_por_segundo'] > 0
+
+    servidor = replay.ServidorReplay(tmp_path, taxa_erros=1.0, semente=1)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        resposta = scraper.requests.get(servidor.url + 'index.html')
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == '0'
+
+
+def _site_catalogo(base, total):
+    paginas = {}
+    for numero in range(1, total + 1):
+        pager = (
+            '<ul class="pager">'
+            f'<li class="current">Page {numero} of {total}</li>'
+        )
+        if numero < total:
+            pager += (
+                f'<li class="next"><a href="page-{numero + 1}.html">'
+                'next</a></li>'
+            )
+        paginas[f'{base}catalogue/page-{numero}.html'] = (
+            _listagem(f'livro_{numero}/index.html') + pager + '</ul>'
+        )
+        paginas[f'{base}catalogue/livro_{numero}/index.html'] = (
+            '<ul class="breadcrumb"><li><a>Home</a></li><li><a>Books</a>'
+            '</li><li><a>Poetry</a></li></ul>'
+        )
+    return paginas
+
+
+def test_catalogo_completo_descoberto_pela_paginacao(monkeypatch):
+    base = 'http://site/'
+    sessao = _preparar_site(monkeypatch, _site_catalogo(base, 7), base)
+
+    paginas = list(scraper.extrair_paginas(0, concorrencia=4))
+
+    assert [pagina['url'] for pagina in paginas] == [
+        f'{base}catalogue/page-{numero}.html' for numero in range(1, 8)
+    ]
+    assert [livro['category'] for pagina in paginas
+            for livro in pagina['livros']] == ['Poetry'] * 7
+    assert len(sessao.urls) == 14
+
+    livros = scraper.extrair_livros(3, concorrencia=4)
+    assert [livro['title'] for livro in livros] == [
+        f'livro_{numero}/index.html' for numero in (1, 2, 3)
+    ]
+
+
+def test_paginas_seguintes_exige_padrao_da_paginacao():
+    html = '<li class="current">\n  Page 2 of 5\n</li>'
+    proxima = 'http://site/catalogue/page-3.html'
+
+    assert scraper._paginas_seguintes(html, proxima, None) == [
+        f'http://site/catalogue/page-{numero}.html' for numero in (3, 4, 5)
+    ]
+    assert scraper._paginas_seguintes(html, proxima, 4) == [
+        'http://site/catalogue/page-3.html',
+        'http://site/catalogue/page-4.html',
+    ]
+    assert scraper._paginas_seguintes(html, 'http://site/?p=3', None) is None
+    assert scraper._paginas_seguintes('<ul></ul>', proxima, None) is None
+
+
+def test_paginas_bloqueadas_pelo_robots_nunca_sao_requisitadas(
+    monkeypatch, tmp_path
+):
+    from src.scraping import replay
+
+    base = 'http://site/'
+    for url, html in _site_catalogo(base, 6).items():
+        destino = tmp_path / url[len(base):]
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(html, encoding='utf-8')
+    (tmp_path / 'robots.txt').write_text(
+        'User-agent: *\nDisallow: /catalogue/page-3.html\n'
+    )
+
+    recebidos = []
+
+    class Registrador(replay._ManipuladorReplay):
+        def do_GET(self):
+            recebidos.append(self.path)
+            super().do_GET()
+
+    servidor = replay.ServidorReplay(tmp_path)
+    servidor.RequestHandlerClass = Registrador
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(scraper.config, 'SITE_URL', servidor.url)
+    monkeypatch.setattr(scraper.config, 'SCRAPER_MAX_REQUESTS_PER_SECOND', 0)
+    monkeypatch.setattr(scraper.config, 'SCRAPER_HTTP_CACHE_DIR', '')
+    try:
+        paginas = list(scraper.extrair_paginas(0, concorrencia=4))
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    assert [pagina['url'][len(servidor.url):] for pagina in paginas] == [
+        f'catalogue/page-{numero}.html' for numero in (1, 2, 4, 5, 6)
+    ]
+    assert '/robots.txt' in recebidos
+    assert '/catalogue/page-3.html' not in recebidos